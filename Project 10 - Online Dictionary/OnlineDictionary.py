@@ -3,15 +3,48 @@ Online Dictionary
 Jimmy Tran
 """
 
+import argparse
+import asyncio
+import functools
 import json
+import os
 import requests
+import signal
+import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from datalist import *
+from bloomfilter import BloomFilter
+from cachepolicy import *
+from compileddict import CompiledDictionary, compile_dictionary
+from dictserver import DictionaryClient, DictionaryServer
+from diskcache import DiskCache
+from entrystore import EntryStore
+from jsonstream import OffsetIndex, iter_entries
+from metrics import Metrics
+from negativecache import NegativeCache
+from ratelimit import AIMDLimiter, AsyncAIMDLimiter, TokenBucket
+from singleflight import AsyncSingleFlight, SingleFlight
+from symspell import SymSpell
+from textindex import InvertedIndex, entry_terms
+from trie import Trie
+
+try:
+    import aiohttp
+except ImportError:
+    # Only needed for the asyncio lookup path (AsyncOxfordDictionary)
+    aiohttp = None
 
 
 class DictionaryEntry:
+    # No per-instance __dict__: entries are small and there can be millions of them
+    __slots__ = ("word", "part_of_speech", "definition", "example")
+
     def __init__(self, word, part_of_speech, definition, example=None):
         self.word = word
         self.part_of_speech = part_of_speech
@@ -25,16 +58,218 @@ class DictionaryEntry:
                f"Example       : {self.example}"
 
 
+class WordNotFoundError(KeyError):
+    """
+    The dictionary answered, and the word isn't in it.  Unlike a plain KeyError
+    (which may come from a network error or throttling), it's safe to remember.
+    """
+
+
+class LoadMode(Enum):
+    EAGER = 1           # json.load the whole file, one DictionaryEntry per word
+    STREAM = 2          # same dict, but parsed entry by entry, never holding the whole document
+    OFFSET_INDEX = 3    # only keep word -> byte offset, decode entries when they're looked up
+    MMAP = 4            # binary search a compiled dictionary file (see compileddict.py) through mmap
+    COLUMNAR = 5        # everything in memory, but in columns (see entrystore.py) instead of one object per word
+
+
 class LocalDictionary:
-    def __init__(self, dictionary_json_name="dictionary.json"):
-        with open(dictionary_json_name) as file:
-            self.dictionary = {}
-            data = json.load(file, object_hook=self.dictionary_entry_decoder)
-            for d in data["entries"]:
-                if isinstance(d, DictionaryEntry):
-                    # If entry doesn't have all the required fields, it's not
-                    # converted to DictionaryEntry, so we don't add it to dict.
-                    self.dictionary[d.word] = d
+    REQUIRED_FIELDS = ("word", "part_of_speech", "definition")
+
+    def __init__(self, dictionary_json_name="dictionary.json", mode=LoadMode.EAGER, prefix_index_name=None,
+                 bloom_fp_rate=None):
+        """
+        prefix_index_name is where the search_prefix() trie is saved, so later
+        runs load it instead of rebuilding it; None keeps it in memory only.
+        With bloom_fp_rate set, search() first checks a Bloom filter of all the
+        words, saved as a .bloom file next to the dictionary, so most misses
+        never touch the (possibly on-disk) index.
+        """
+        self.dictionary_json_name = dictionary_json_name
+        self.mode = mode
+        self.prefix_index_name = prefix_index_name
+        self.prefix_index = None
+        self.fuzzy_index = None
+        self.text_index = None
+        # Entries are only ever replaced as a whole, see reload(); the indexes are
+        # updated in place, so they're only used while holding index_lock
+        self.reload_lock = threading.Lock()
+        self.index_lock = threading.Lock()
+        self.file_signature = file_signature(dictionary_json_name)
+        self.dictionary = self.load_entries()
+        self.bloom_filter = self.load_bloom_filter(bloom_fp_rate) if bloom_fp_rate is not None else None
+
+    def load_entries(self):
+        """A new word -> entry mapping of everything in the dictionary file, stored the way mode says"""
+        if self.mode == LoadMode.EAGER:
+            with open(self.dictionary_json_name) as file:
+                dictionary = {}
+                data = json.load(file, object_hook=self.dictionary_entry_decoder)
+                for d in data["entries"]:
+                    if isinstance(d, DictionaryEntry):
+                        # If entry doesn't have all the required fields, it's not
+                        # converted to DictionaryEntry, so we don't add it to dict.
+                        dictionary[d.word] = d
+        elif self.mode == LoadMode.STREAM:
+            with open(self.dictionary_json_name, "rb") as file:
+                dictionary = {}
+                for offset, length, o in iter_entries(file):
+                    d = self.dictionary_entry_decoder(o)
+                    if isinstance(d, DictionaryEntry):
+                        dictionary[d.word] = d
+        elif self.mode == LoadMode.OFFSET_INDEX:
+            dictionary = OffsetIndex(self.dictionary_json_name, self.dictionary_entry_decoder,
+                                     self.REQUIRED_FIELDS)
+        elif self.mode == LoadMode.COLUMNAR:
+            dictionary = EntryStore(lambda fields: DictionaryEntry(*fields))
+            with open(self.dictionary_json_name) as file:
+                # Entries go straight into the store as they're parsed, so the
+                # parsed document is only ever a list of Nones
+                json.load(file, object_hook=functools.partial(self.columnar_decoder, dictionary))
+        elif self.mode == LoadMode.MMAP:
+            dictionary = CompiledDictionary(self.compiled_name(self.dictionary_json_name),
+                                            lambda fields: DictionaryEntry(*fields))
+        else:
+            raise ValueError(f"Unknown load mode {self.mode}")
+        return dictionary
+
+    def reload(self):
+        """
+        Re-reads the dictionary file without stopping lookups: the new entries
+        are loaded on the side and swapped in with one assignment, so searches
+        see either the old dictionary or the new one, never a mix of them.
+        The indexes are then updated for the changed words only.
+        Returns the words that were added, removed or changed.
+        OFFSET_INDEX entries are read from the file when they're looked up, so
+        in that mode the file has to be replaced (written to another file that's
+        then renamed over it), not rewritten in place.
+        """
+        with self.reload_lock:
+            signature = file_signature(self.dictionary_json_name)
+            old = self.dictionary
+            new = self.load_entries()
+            changed = changed_words(old, new)
+            if self.bloom_filter is not None:
+                # Removed words can't be taken out, but they only cost a false positive.
+                # Added ones have to be in before they're searchable
+                added = [word for word in changed if word in new and word not in old]
+                if self.bloom_filter.count + len(added) > self.bloom_filter.capacity:
+                    self.bloom_filter = BloomFilter.from_words(new, self.bloom_filter.fp_rate)
+                else:
+                    for word in added:
+                        self.bloom_filter.add(word)
+            self.dictionary = new
+            self.file_signature = signature
+            with self.index_lock:
+                self.update_indexes(old, new, changed)
+            return changed
+
+    def reload_if_changed(self):
+        """reload() if the dictionary file was modified since it was loaded, otherwise returns no words"""
+        if file_signature(self.dictionary_json_name) == self.file_signature:
+            return set()
+        return self.reload()
+
+    def update_indexes(self, old, new, changed):
+        for word in changed:
+            if word in old:
+                if self.prefix_index is not None and word not in new:
+                    self.prefix_index.discard(word)
+                if self.fuzzy_index is not None and word not in new:
+                    self.fuzzy_index.discard(word)
+                if self.text_index is not None:
+                    self.text_index.discard(word, entry_terms(old[word]))
+            if word in new:
+                if self.prefix_index is not None:
+                    self.prefix_index.insert(word)
+                if self.fuzzy_index is not None:
+                    self.fuzzy_index.add(word)
+                if self.text_index is not None:
+                    self.text_index.add(word, entry_terms(new[word]))
+
+    def load_bloom_filter(self, fp_rate):
+        bloom_name = os.path.splitext(self.dictionary_json_name)[0] + ".bloom"
+        if is_up_to_date(bloom_name, self.dictionary_json_name):
+            bloom = BloomFilter.load(bloom_name)
+            if bloom.fp_rate == fp_rate and bloom.count == len(self.dictionary):
+                return bloom
+        bloom = BloomFilter.from_words(self.dictionary, fp_rate)
+        bloom.save(bloom_name)
+        return bloom
+
+    @staticmethod
+    def compiled_name(dictionary_json_name):
+        """
+        Name of the compiled dictionary for dictionary_json_name.  Given a .json
+        file, (re)compiles it to the .bin file next to it if that's missing or older.
+        """
+        root, extension = os.path.splitext(dictionary_json_name)
+        if extension != ".json":
+            return dictionary_json_name
+        binary_name = root + ".bin"
+        if not is_up_to_date(binary_name, dictionary_json_name):
+            compile_dictionary(dictionary_json_name, binary_name)
+        return binary_name
+
+    def search_prefix(self, prefix, limit=10):
+        """Up to limit words starting with prefix, in alphabetical order, for type-ahead"""
+        with self.index_lock:
+            if self.prefix_index is None:
+                self.prefix_index = self.load_prefix_index()
+            return self.prefix_index.search_prefix(prefix, limit)
+
+    def suggest(self, word, k=5, max_distance=2):
+        """
+        "Did you mean": up to k words within max_distance edits (insert, delete,
+        substitute or swap adjacent letters) of word, closest first.
+        The SymSpell index is built on first use, and rebuilt when a larger
+        max_distance is asked for than it was built with.
+        """
+        with self.index_lock:
+            if self.fuzzy_index is None or max_distance > self.fuzzy_index.max_distance:
+                self.fuzzy_index = SymSpell.from_words(self.dictionary, max_distance=max(max_distance, 2))
+            return [suggestion for suggestion, distance in self.fuzzy_index.lookup(word, max_distance, k)]
+
+    def search_text(self, query, operator="and", limit=10):
+        """
+        Up to limit entries whose definition or example contains all (operator
+        "and") or any ("or") of the words in query, most relevant first.
+        """
+        with self.index_lock:
+            if self.text_index is None:
+                self.text_index = self.load_text_index()
+            words = [word for word, score in self.text_index.search(query, operator, limit)]
+        dictionary = self.dictionary
+        # A word can be removed by a reload() between the search and here
+        return [dictionary[word] for word in words if word in dictionary]
+
+    def load_text_index(self):
+        """The full-text index, saved as a .fulltext file next to the dictionary"""
+        index_name = os.path.splitext(self.dictionary_json_name)[0] + ".fulltext"
+        if is_up_to_date(index_name, self.dictionary_json_name):
+            index = InvertedIndex.load(index_name)
+            if len(index) == len(self.dictionary):
+                return index
+        index = InvertedIndex.from_entries(self.dictionary.values())
+        index.save(index_name)
+        return index
+
+    def load_prefix_index(self):
+        name = self.prefix_index_name
+        if name is not None and is_up_to_date(name, self.dictionary_json_name):
+            trie = Trie.load(name)
+            if len(trie) == len(self.dictionary):
+                return trie
+        trie = Trie.from_words(self.dictionary)
+        if name is not None:
+            trie.save(name)
+        return trie
+
+    def columnar_decoder(self, store, o):
+        if all(field in o for field in self.REQUIRED_FIELDS):
+            store.add(o["word"], o["part_of_speech"], o["definition"], o.get("example"))
+            return None
+        return o
 
     def dictionary_entry_decoder(self, o):
         try:
@@ -55,7 +290,28 @@ class LocalDictionary:
             return o
 
     def search(self, word):
-        return self.dictionary[word]
+        if self.bloom_filter is not None and word not in self.bloom_filter:
+            raise WordNotFoundError(word)
+        try:
+            return self.dictionary[word]
+        except KeyError:
+            raise WordNotFoundError(word) from None
+
+    def search_many(self, words):
+        """
+        ({word: entry} for the words in words that are in the dictionary, [words
+        that couldn't be looked up]), which for a local file is always empty
+        """
+        dictionary = self.dictionary
+        bloom_filter = self.bloom_filter
+        found = {}
+        for word in words:
+            if bloom_filter is not None and word not in bloom_filter:
+                continue
+            entry = dictionary.get(word)
+            if entry is not None:
+                found[word] = entry
+        return found, []
 
 
 class DictionaryEntryCache(DataList):
@@ -76,43 +332,252 @@ class DictionaryEntryCache(DataList):
             self.remove_tail()
 
     def remove_tail(self):
-        self.reset_current()
-        current = self.iterate()
-        # While we typically shouldn't mix iteration with modification to the list being
-        # iterated, we stop iteration as soon as we remove the last node, so that's ok.
-        while current:
-            if not current.next:
+        for node in self:
+            if not node.next:
                 # If this is true, there's only 1 data node, which should never happen
                 # because we ensure capacity is at least 1, and we call remove_tail()
                 # only after adding another entry, so there are always at least 2.
                 raise RuntimeError("Something's very wrong")
 
-            if not current.next.next:
-                # current.next is the last (oldest) one, remove it
-                current.remove_after()
+            if not node.next.next:
+                # node.next is the last (oldest) one, remove it.  We stop iterating
+                # as soon as we've changed the list, so that's ok.
+                self.remove_after(node)
                 break
-            current = self.iterate()
         self.count -= 1
 
     def search(self, word):
-        self.reset_current()
-        current = self.iterate()
-        while current:
-            if current.data.word == word:
+        for node in self:
+            if node.data.word == word:
                 # Found the entry with the right word, remove it from the list,
                 # and insert it at the head.  Return it.
-                entry = current.data
+                entry = node.data
                 self.remove(entry)
                 self.add_to_head(entry)
                 return entry
-            current = self.iterate()
         raise KeyError(f"Cannot find {word}")
 
+    def invalidate(self, word):
+        """Drops the entry for word, if it's cached"""
+        for node in self:
+            if node.data.word == word:
+                self.remove(node.data)
+                self.count -= 1
+                return
+
+
+class PolicyDictionaryEntryCache:
+    """
+    Drop-in replacement for DictionaryEntryCache: same add/search/KeyError contract,
+    but the bookkeeping is delegated to a CachePolicy (see cachepolicy.py), so hit,
+    promote, insert and evict are O(1) and the eviction strategy is pluggable.
+    With a ttl (in seconds), search() treats entries older than that as missing;
+    search_with_age() still returns them, for callers that can use stale entries.
+    """
+    def __init__(self, policy, ttl=None, clock=time.monotonic):
+        if ttl is not None and ttl <= 0:
+            raise ValueError("ttl should be positive or None")
+        self.policy = policy
+        self.ttl = ttl
+        self.clock = clock
+
+    @property
+    def capacity(self):
+        return self.policy.capacity
+
+    @property
+    def count(self):
+        return len(self.policy)
+
+    @property
+    def stats(self):
+        return self.policy.stats
+
+    def add(self, entry, age=0.0):
+        """Adds entry as if it had been added age seconds ago, e.g. when it comes from an older cache"""
+        if not isinstance(entry, DictionaryEntry):
+            raise TypeError("entry should be DictionaryEntry")
+        self.policy.put(entry.word, (entry, self.clock() - age))
+
+    def search_with_age(self, word):
+        """(entry, seconds since it was added), however old it is"""
+        try:
+            entry, added_at = self.policy.get(word)
+        except KeyError:
+            raise KeyError(f"Cannot find {word}") from None
+        return entry, self.clock() - added_at
+
+    def search(self, word):
+        entry, age = self.search_with_age(word)
+        if self.ttl is not None and age > self.ttl:
+            raise KeyError(f"{word} has expired")
+        return entry
+
+    def search_many(self, words):
+        """{word: entry} for the words in words that are cached and not expired"""
+        get = self.policy.get
+        oldest = self.clock() - self.ttl if self.ttl is not None else None
+        found = {}
+        for word in words:
+            try:
+                entry, added_at = get(word)
+            except KeyError:
+                continue
+            if oldest is None or added_at >= oldest:
+                found[word] = entry
+        return found
+
+    def search_many_with_age(self, words):
+        """{word: (entry, seconds since it was added)} for the words in words that are cached, however old"""
+        get = self.policy.get
+        now = self.clock()
+        found = {}
+        for word in words:
+            try:
+                entry, added_at = get(word)
+            except KeyError:
+                continue
+            found[word] = (entry, now - added_at)
+        return found
+
+    def invalidate(self, word):
+        return self.policy.discard(word)
+
+
+class LRUDictionaryEntryCache(PolicyDictionaryEntryCache):
+    def __init__(self, capacity=1):
+        super().__init__(LRUPolicy(capacity))
+
+
+class ShardedDictionaryEntryCache:
+    """
+    Thread-safe PolicyDictionaryEntryCache.  Words are spread over shards by hash,
+    each shard being its own policy with its own lock, so threads only contend
+    when they look up words in the same shard.  capacity is split as evenly as
+    it goes, never over more shards than it has room for, so the shards hold
+    exactly capacity entries between them.  policy_factory builds a shard's
+    policy from its capacity, e.g. LRUPolicy or some_policy.with_capacity.
+    Each shard evicts on its own, so a small cache wants few shards.
+    """
+    def __init__(self, capacity=1, shards=16, policy_factory=LRUPolicy, ttl=None, clock=time.monotonic):
+        if capacity < 1:
+            raise ValueError("Capacity should be at least 1")
+        if shards < 1:
+            raise ValueError("There should be at least 1 shard")
+        shards = min(shards, capacity)
+        shard_capacity, remainder = divmod(capacity, shards)
+        self.shards = [PolicyDictionaryEntryCache(policy_factory(shard_capacity + (i < remainder)), ttl, clock)
+                       for i in range(shards)]
+        self.locks = [threading.Lock() for _ in range(shards)]
+
+    def shard_for(self, word):
+        i = hash(word) % len(self.shards)
+        return self.shards[i], self.locks[i]
+
+    @property
+    def capacity(self):
+        return sum(shard.capacity for shard in self.shards)
+
+    @property
+    def count(self):
+        return sum(shard.count for shard in self.shards)
+
+    @property
+    def stats(self):
+        stats = CacheStats()
+        for shard in self.shards:
+            stats.hits += shard.stats.hits
+            stats.misses += shard.stats.misses
+            stats.evictions += shard.stats.evictions
+            stats.rejections += shard.stats.rejections
+        return stats
+
+    def add(self, entry, age=0.0):
+        if not isinstance(entry, DictionaryEntry):
+            raise TypeError("entry should be DictionaryEntry")
+        shard, lock = self.shard_for(entry.word)
+        with lock:
+            shard.add(entry, age)
+
+    def search(self, word):
+        shard, lock = self.shard_for(word)
+        with lock:
+            return shard.search(word)
+
+    def search_with_age(self, word):
+        shard, lock = self.shard_for(word)
+        with lock:
+            return shard.search_with_age(word)
+
+    def search_many(self, words):
+        """{word: entry} for the words in words that are cached, taking each shard's lock once"""
+        return self.search_shards(words, PolicyDictionaryEntryCache.search_many)
+
+    def search_many_with_age(self, words):
+        return self.search_shards(words, PolicyDictionaryEntryCache.search_many_with_age)
+
+    def search_shards(self, words, search):
+        """Merges search(shard, its words) over the shards words fall in, under each shard's lock"""
+        by_shard = [[] for _ in self.shards]
+        for word in words:
+            by_shard[hash(word) % len(self.shards)].append(word)
+        found = {}
+        for shard, lock, shard_words in zip(self.shards, self.locks, by_shard):
+            if shard_words:
+                with lock:
+                    found.update(search(shard, shard_words))
+        return found
+
+    def invalidate(self, word):
+        shard, lock = self.shard_for(word)
+        with lock:
+            return shard.invalidate(word)
+
+
+class DiskDictionaryEntryCache:
+    """
+    Second cache tier, between the in-memory cache and the upstream dictionary.
+    Same add/search/KeyError contract, but entries persist across restarts in a
+    SQLite file and expire after ttl seconds.
+    """
+    def __init__(self, filename="dictionary_cache.db", ttl=7 * 24 * 60 * 60):
+        self.disk_cache = DiskCache(filename, ttl)
+
+    def add(self, entry):
+        if not isinstance(entry, DictionaryEntry):
+            raise TypeError("entry should be DictionaryEntry")
+        self.disk_cache.put(entry.word, entry.part_of_speech, entry.definition, entry.example)
+
+    def search(self, word):
+        return self.search_with_age(word)[0]
+
+    def search_with_age(self, word):
+        """(entry, seconds since it was fetched), raises KeyError if absent or expired"""
+        fields, fetched_at = self.disk_cache.get(word)
+        return DictionaryEntry(*fields), self.disk_cache.clock() - fetched_at
+
+    def search_many(self, words):
+        """{word: entry} for the words in words that are cached and not expired"""
+        return {word: entry for word, (entry, age) in self.search_many_with_age(words).items()}
+
+    def search_many_with_age(self, words):
+        """{word: (entry, seconds since it was fetched)} for the words in words that are cached and not expired"""
+        now = self.disk_cache.clock()
+        return {word: (DictionaryEntry(*fields), now - fetched_at)
+                for word, (fields, fetched_at) in self.disk_cache.get_many(words).items()}
+
+    def invalidate(self, word):
+        return self.disk_cache.discard(word)
+
+    def close(self):
+        self.disk_cache.close()
+
 
 class DictionarySource(Enum):
     LOCAL = 1
     CACHE = 2
     OXFORD_ONLINE = 3
+    DISK_CACHE = 4
 
     def __str__(self):
         return self.name
@@ -121,17 +586,111 @@ class DictionarySource(Enum):
 class OxfordDictionary:
     APP_ID = '4a6a07be'
     APP_KEY = 'e08939ece6e20e69a447521e2ea1c504'
+    BASE_URL = 'https://od-api.oxforddictionaries.com:443/api/v2/entries/'
+    SOURCE_LANG = 'en-us'
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, base_url=None, pool_size=10, timeout=(3.05, 10), retries=3, backoff_factor=0.5,
+                 pooled=True, rate_limit=None, burst=None, max_concurrency=None):
+        """
+        With pooled=True (the default) lookups go through one requests.Session, which
+        keeps up to pool_size keep-alive connections open, so only the first lookup
+        on each connection pays for the TCP+TLS handshake.  GETs answered with
+        429/5xx are retried up to retries times with exponential backoff
+        (honoring Retry-After).  timeout is (connect, read) in seconds.
+
+        rate_limit (requests per second, in bursts of up to burst) and
+        max_concurrency shape traffic to the API quota, see ratelimit.py.  With
+        max_concurrency, the number of requests in flight adapts between 1 and
+        max_concurrency: it creeps up while requests succeed and halves on a 429.
+        """
+        self.base_url = base_url or self.BASE_URL
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.headers = {'app_id': self.APP_ID, 'app_key': self.APP_KEY}
+        self.rate_limiter = TokenBucket(rate_limit, burst) if rate_limit is not None else None
+        self.concurrency_limiter = None
+        if max_concurrency is not None:
+            self.concurrency_limiter = self.make_concurrency_limiter(max_concurrency)
+        self.session = self.make_session(pool_size, retries, backoff_factor) if pooled else None
+
+    @property
+    def shapes_traffic(self):
+        """True if 429s are handled here (so the limiters see them) rather than inside requests"""
+        return self.rate_limiter is not None or self.concurrency_limiter is not None
+
+    def make_concurrency_limiter(self, max_concurrency):
+        return AIMDLimiter(max_concurrency)
+
+    def make_session(self, pool_size, retries, backoff_factor):
+        statuses = self.RETRY_STATUSES
+        if self.shapes_traffic:
+            statuses = tuple(status for status in statuses if status != 429)
+        # respect_retry_after_header would also make requests retry 429s itself
+        retry = Retry(total=retries, backoff_factor=backoff_factor, status_forcelist=statuses,
+                      allowed_methods=frozenset(["GET"]), respect_retry_after_header=not self.shapes_traffic,
+                      raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update(self.headers)
+        return session
+
+    def url_for(self, word):
+        return self.base_url + self.SOURCE_LANG + '/' + word.lower()
+
+    def retry_delay(self, retry_after, attempt):
+        """Seconds to wait before retrying a throttled request: Retry-After if the server said, else backoff"""
+        try:
+            return max(0.0, float(retry_after))
+        except (TypeError, ValueError):
+            return self.backoff_factor * (2 ** attempt)
+
+    def get(self, url):
+        """One GET, let through by the rate and concurrency limiters if there are any"""
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        if self.concurrency_limiter is not None:
+            started = self.concurrency_limiter.acquire()
+        throttled = False
+        try:
+            if self.session is not None:
+                r = self.session.get(url, timeout=self.timeout)
+            else:
+                r = requests.get(url, headers=self.headers, timeout=self.timeout)
+            throttled = r.status_code == 429
+            return r
+        finally:
+            if self.concurrency_limiter is not None:
+                self.concurrency_limiter.release(throttled, started)
 
     def search(self, word):
-        source_lang = 'en-us'
-        url = 'https://od-api.oxforddictionaries.com:443/api/v2/entries/' + source_lang + '/' + word.lower()
+        url = self.url_for(word)
         try:
-            r = requests.get(url, headers={'app_id': self.APP_ID, 'app_key': self.APP_KEY})
+            r = self.get(url)
+            attempt = 0
+            while r.status_code == 429 and self.shapes_traffic and attempt < self.retries:
+                delay = self.retry_delay(r.headers.get("Retry-After"), attempt)
+                if self.rate_limiter is not None:
+                    # Everyone sharing the limiter waits, not just this request
+                    self.rate_limiter.pause(delay)
+                else:
+                    time.sleep(delay)
+                attempt += 1
+                r = self.get(url)
         except requests.exceptions.RequestException as e:
             raise KeyError(f"Error: {e}")
+        if r.status_code == 404:
+            raise WordNotFoundError(f"Status Code: {r.status_code}")
         if r.status_code != 200:
             raise KeyError(f"Status Code: {r.status_code}")
-        json_resp = r.json()
+        return self.entry_from_json(r.json())
+
+    @staticmethod
+    def entry_from_json(json_resp):
         if "examples" in json_resp["results"][0]["lexicalEntries"][0]["entries"][0]["senses"][0]:
             example = json_resp["results"][0]["lexicalEntries"][0]["entries"][0]["senses"][0]["examples"][0]["text"]
         else:
@@ -142,38 +701,651 @@ class OxfordDictionary:
                                ["definitions"][0],
                                example=example)
 
+    def close(self):
+        if self.session is not None:
+            self.session.close()
+
+
+class AsyncOxfordDictionary(OxfordDictionary):
+    """
+    asyncio variant of OxfordDictionary, on top of aiohttp.
+    The aiohttp session (and its keep-alive connection pool) is created on the
+    first search, inside the running event loop; close it with aclose().
+    """
+    def __init__(self, base_url=None, pool_size=10, timeout=(3.05, 10), retries=3, backoff_factor=0.5,
+                 rate_limit=None, burst=None, max_concurrency=None):
+        if aiohttp is None:
+            raise ImportError("AsyncOxfordDictionary needs aiohttp (pip install aiohttp)")
+        # pooled=False: the aiohttp session takes the place of the requests one
+        super().__init__(base_url, pool_size, timeout, retries, backoff_factor, pooled=False,
+                         rate_limit=rate_limit, burst=burst, max_concurrency=max_concurrency)
+
+    @classmethod
+    def from_client(cls, client):
+        """
+        An async client with the same settings as the sync OxfordDictionary client,
+        drawing on the same TokenBucket, so sync and async lookups share one API quota.
+        """
+        limiter = client.concurrency_limiter
+        async_client = cls(client.base_url, client.pool_size, client.timeout, client.retries, client.backoff_factor,
+                           max_concurrency=limiter.max_limit if limiter is not None else None)
+        async_client.rate_limiter = client.rate_limiter
+        return async_client
+
+    def make_concurrency_limiter(self, max_concurrency):
+        return AsyncAIMDLimiter(max_concurrency)
+
+    def make_async_session(self):
+        connect, read = self.timeout
+        return aiohttp.ClientSession(headers=self.headers,
+                                     connector=aiohttp.TCPConnector(limit=self.pool_size),
+                                     timeout=aiohttp.ClientTimeout(sock_connect=connect, sock_read=read))
+
+    async def search(self, word):
+        if self.session is None:
+            self.session = self.make_async_session()
+        url = self.url_for(word)
+        for attempt in range(self.retries + 1):
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire_async()
+            if self.concurrency_limiter is not None:
+                started = await self.concurrency_limiter.acquire()
+            status = None
+            try:
+                async with self.session.get(url) as r:
+                    status = r.status
+                    retry_after = r.headers.get("Retry-After")
+                    if status == 200:
+                        return self.entry_from_json(await r.json())
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                raise KeyError(f"Error: {e}")
+            finally:
+                if self.concurrency_limiter is not None:
+                    await self.concurrency_limiter.release(status == 429, started)
+            if status not in self.RETRY_STATUSES or attempt == self.retries:
+                break
+            delay = self.retry_delay(retry_after if status == 429 else None, attempt)
+            if status == 429 and self.rate_limiter is not None:
+                # Everyone sharing the limiter waits, not just this request
+                self.rate_limiter.pause(delay)
+            else:
+                await asyncio.sleep(delay)
+        if status == 404:
+            raise WordNotFoundError(f"Status Code: {status}")
+        raise KeyError(f"Status Code: {status}")
+
+    async def aclose(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def close(self):
+        # The aiohttp session can only be closed from the event loop
+        pass
+
 
 class Dictionary:
-    def __init__(self, source=DictionarySource.OXFORD_ONLINE):
+    def __init__(self, source=DictionarySource.OXFORD_ONLINE, cache_policy=None, disk_cache=None,
+                 async_dictionary=None, thread_safe=False, shards=16, negative_cache=True, metrics=False,
+                 ttl=None, stale_ttl=0, refresh_ahead=None, refresh_workers=2, clock=time.monotonic,
+                 local_server=None):
+        """
+        local_server is the socket path of a running serve(): LOCAL lookups then
+        go to that process instead of loading dictionary.json into this one.
+
+        metrics=True (or a Metrics instance) records per-source latency histograms
+        and error counts, see metrics.py; with the default False nothing is recorded.
+
+        With a ttl (in seconds), memory cache entries older than that are refetched.
+        For stale_ttl more seconds, an expired entry is still returned straight away,
+        while it's refetched in the background (stale-while-revalidate).
+        With refresh_ahead (a fraction of ttl, like 0.8), entries looked up when
+        they're older than that are refetched in the background before they expire.
+        At most refresh_workers background refetches run at a time.
+        """
+        if ttl is not None and stale_ttl < 0:
+            raise ValueError("stale_ttl should be at least 0")
+        if refresh_ahead is not None and not 0 < refresh_ahead < 1:
+            raise ValueError("refresh_ahead should be between 0 and 1")
         self.dictionary_source = source
-        self.dictionary_entry_cache = DictionaryEntryCache(3)
-        if source == DictionarySource.LOCAL:
-            self.dictionary = OxfordDictionary()
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.refresh_ahead = refresh_ahead
+        self.refresh_workers = refresh_workers
+        # Background refreshes are started on first use; refreshing holds the words queued or running
+        self.refresher = None
+        self.refresh_lock = threading.Lock()
+        self.refreshing = set()
+        # Refreshes started by asearch() run as tasks on its event loop; held here until they finish
+        self.refresh_tasks = set()
+        # Thread started by watch(), and the event that stops it
+        self.watcher = None
+        self.stop_watching = threading.Event()
+        if cache_policy is None:
+            cache_policy = LRUPolicy(3)
+        if thread_safe or (ttl is not None and (stale_ttl or refresh_ahead)):
+            # Background refreshes fill the cache from other threads, so it has to be thread safe.
+            # cache_policy gives the policy, its settings and the total capacity, spread over the shards
+            self.dictionary_entry_cache = ShardedDictionaryEntryCache(cache_policy.capacity, shards,
+                                                                      cache_policy.with_capacity, ttl, clock)
+        else:
+            self.dictionary_entry_cache = PolicyDictionaryEntryCache(cache_policy, ttl, clock)
+        # Optional DiskDictionaryEntryCache, searched after the memory cache
+        self.disk_cache = disk_cache
+        if source == DictionarySource.LOCAL and local_server is not None:
+            self.dictionary = DictionaryClient(local_server, lambda fields: DictionaryEntry(*fields),
+                                               WordNotFoundError)
+        elif source == DictionarySource.LOCAL:
+            self.dictionary = LocalDictionary()
         elif source == DictionarySource.OXFORD_ONLINE:
             self.dictionary = OxfordDictionary()
         else:
             raise ValueError("You need to pick LOCAL or OXFORD_ONLINE")
+        # Upstream used by asearch(); created on first use if not given
+        self.async_dictionary = async_dictionary
+        # Concurrent misses on the same word share one upstream lookup
+        self.single_flight = SingleFlight()
+        self.async_single_flight = AsyncSingleFlight()
+        # Words upstream said don't exist: a NegativeCache, True for the default one, or False/None
+        if negative_cache is True:
+            negative_cache = NegativeCache()
+        self.negative_cache = negative_cache if negative_cache is not False else None
+        self.hits = 0
+        self.misses = 0
+        # += isn't atomic, and searches may come from many threads
+        self.lookup_lock = threading.Lock()
+        if metrics is True:
+            metrics = Metrics()
+        self.metrics = metrics if metrics is not False else None
+        if self.metrics is not None:
+            self.add_gauges(self.metrics)
+
+    def add_gauges(self, metrics):
+        for name in self.lookup_stats():
+            metrics.add_gauge(name, lambda name=name: self.lookup_stats()[name])
+        metrics.add_gauge("hit_ratio", self.hit_ratio)
+        metrics.add_gauge("cache_entries", lambda: self.dictionary_entry_cache.count)
+        metrics.add_gauge("cache_evictions", lambda: self.dictionary_entry_cache.stats.evictions)
+
+    def search_caches(self, word):
+        """Searches the cache tiers only, raises KeyError if none of them has word"""
+        try:
+            return self.search_memory_tier(word)
+        except Exception:
+            pass
+        if self.disk_cache is not None:
+            try:
+                return self.disk_cache_hit(*measure(self.disk_cache.search_with_age, word))
+            except KeyError:
+                pass
+        self.count_lookups(misses=1)
+        raise KeyError(f"Cannot find {word}")
+
+    def count_lookups(self, hits=0, misses=0):
+        with self.lookup_lock:
+            self.hits += hits
+            self.misses += misses
+
+    def hit_ratio(self):
+        with self.lookup_lock:
+            return self.hits / (self.hits + self.misses) if self.hits else 0.0
+
+    def search_memory_tier(self, word, refresh=None):
+        entry, elapsed = measure(self.search_memory_cache, word, refresh)
+        self.count_lookups(hits=1)
+        if self.metrics is not None:
+            self.metrics.observe(DictionarySource.CACHE, elapsed)
+        return entry, DictionarySource.CACHE, round(elapsed, 6)
+
+    def disk_cache_hit(self, found, elapsed):
+        """
+        Copies an (entry, age) found in the disk cache into the memory cache, keeping
+        its age so the memory ttl counts from when it was fetched, not from now
+        """
+        entry, age = found
+        self.dictionary_entry_cache.add(entry, age)
+        self.count_lookups(hits=1)
+        if self.metrics is not None:
+            self.metrics.observe(DictionarySource.DISK_CACHE, elapsed)
+        return entry, DictionarySource.DISK_CACHE, round(elapsed, 6)
+
+    def search_memory_cache(self, word, refresh=None):
+        if self.ttl is None:
+            return self.dictionary_entry_cache.search(word)
+        entry, age = self.dictionary_entry_cache.search_with_age(word)
+        return self.check_age(word, entry, age, refresh)
+
+    def check_age(self, word, entry, age, refresh=None):
+        """
+        entry, if at age it can still be served, raises KeyError if not.  An entry
+        that is stale or due a refresh ahead is refetched in the background with
+        refresh(word), refresh_in_background by default.
+        """
+        if refresh is None:
+            refresh = self.refresh_in_background
+        if age > self.ttl:
+            if age > self.ttl + self.stale_ttl:
+                self.dictionary_entry_cache.invalidate(word)
+                raise KeyError(f"{word} has expired")
+            # Stale, but recent enough to serve while it's refetched
+            if self.metrics is not None:
+                self.metrics.increment("stale_hits")
+            refresh(word)
+        elif self.refresh_ahead is not None and age > self.ttl * self.refresh_ahead:
+            refresh(word)
+        return entry
+
+    def refresh_in_background(self, word):
+        """Queues a refetch of word, unless one is already queued or running"""
+        with self.refresh_lock:
+            if word in self.refreshing:
+                return
+            self.refreshing.add(word)
+            if self.refresher is None:
+                self.refresher = ThreadPoolExecutor(max_workers=self.refresh_workers,
+                                                    thread_name_prefix="dictionary-refresh")
+            self.refresher.submit(self.refresh, word)
+
+    def refresh(self, word):
+        try:
+            self.single_flight.do(word, self.fetch, word)
+            if self.metrics is not None:
+                self.metrics.increment("refreshes")
+        except WordNotFoundError:
+            # Upstream doesn't have it any more
+            self.dictionary_entry_cache.invalidate(word)
+        except KeyError:
+            # Upstream is unavailable: keep serving what we have, a later lookup will try again
+            pass
+        except Exception:
+            # Nothing is waiting on a background refresh to see this, so make sure it shows up somewhere
+            if self.metrics is not None:
+                self.metrics.increment("refresh_errors")
+        finally:
+            with self.refresh_lock:
+                self.refreshing.discard(word)
+
+    def arefresh_in_background(self, word):
+        """refresh_in_background() for asearch(): refetches with the async upstream, as a task on the running loop"""
+        with self.refresh_lock:
+            if word in self.refreshing:
+                return
+            self.refreshing.add(word)
+        task = asyncio.get_running_loop().create_task(self.arefresh(word))
+        self.refresh_tasks.add(task)
+        task.add_done_callback(self.refresh_tasks.discard)
+
+    async def arefresh(self, word):
+        try:
+            await self.async_single_flight.do(word, self.afetch, word)
+            if self.metrics is not None:
+                self.metrics.increment("refreshes")
+        except WordNotFoundError:
+            self.dictionary_entry_cache.invalidate(word)
+        except KeyError:
+            pass
+        except Exception:
+            if self.metrics is not None:
+                self.metrics.increment("refresh_errors")
+        finally:
+            with self.refresh_lock:
+                self.refreshing.discard(word)
+
+    def store(self, entry):
+        """Fills the cache tiers with an entry found upstream"""
+        self.dictionary_entry_cache.add(entry)
+        if self.disk_cache is not None:
+            self.disk_cache.add(entry)
+        if self.negative_cache is not None:
+            self.negative_cache.discard(entry.word)
+
+    def check_negative_cache(self, word):
+        """Raises WordNotFoundError if upstream recently said word doesn't exist"""
+        if self.negative_cache is not None and word in self.negative_cache:
+            raise WordNotFoundError(f"{word} was recently not found")
+
+    def remember_not_found(self, word):
+        if self.metrics is not None:
+            self.metrics.increment("not_found")
+        if self.negative_cache is not None:
+            self.negative_cache.add(word)
+
+    def count_upstream_error(self):
+        """Counts a lookup upstream couldn't answer (network error, throttling...), as opposed to a miss"""
+        if self.metrics is not None:
+            self.metrics.increment("upstream_errors")
 
     def search(self, word):
         try:
-            entry, duration = time_func(self.dictionary_entry_cache.search, word)
-            return entry, DictionarySource.CACHE, duration
+            return self.search_caches(word)
+        except KeyError:
+            pass
+        self.check_negative_cache(word)
+        # If there's a KeyError, we'll search in local dictionary.
+        # This may also fail to find the word, at which point we give up
+        # (so allow the exception to be raised)
+        entry, elapsed = measure(self.single_flight.do, word, self.fetch, word)
+        if self.metrics is not None:
+            self.metrics.observe(self.dictionary_source, elapsed)
+        return entry, self.dictionary_source, round(elapsed, 6)
+
+    def fetch(self, word):
+        try:
+            entry = self.dictionary.search(word)
+        except WordNotFoundError:
+            self.remember_not_found(word)
+            raise
+        except KeyError:
+            self.count_upstream_error()
+            raise
+        self.store(entry)
+        return entry
+
+    def search_many(self, words, concurrency=10):
+        """
+        Looks up all words at once, tier by tier: the memory cache, then the disk
+        cache, then the upstream dictionary for whatever is left.  Each distinct
+        word is looked up once, however often it appears.  Upstream lookups that
+        can't be batched run on up to concurrency threads.
+        Returns one (entry, source) pair per input word, in input order,
+        with (None, None) for words that can't be found.
+        """
+        results = {}
+        remaining = list(dict.fromkeys(words))
+        start = time.perf_counter()
+        if self.ttl is None:
+            found = self.dictionary_entry_cache.search_many(remaining)
+        else:
+            # Stale entries are served and refreshed in the background, as search() does
+            found = {}
+            for word, (entry, age) in self.dictionary_entry_cache.search_many_with_age(remaining).items():
+                try:
+                    found[word] = self.check_age(word, entry, age)
+                except KeyError:
+                    pass
+        self.observe_batch(DictionarySource.CACHE, start, len(found))
+        for word, entry in found.items():
+            results[word] = (entry, DictionarySource.CACHE)
+        remaining = [word for word in remaining if word not in results]
+        if remaining and self.disk_cache is not None:
+            start = time.perf_counter()
+            found = self.disk_cache.search_many_with_age(remaining)
+            self.observe_batch(DictionarySource.DISK_CACHE, start, len(found))
+            for word, (entry, age) in found.items():
+                self.dictionary_entry_cache.add(entry, age)
+                results[word] = (entry, DictionarySource.DISK_CACHE)
+            remaining = [word for word in remaining if word not in results]
+        self.count_lookups(len(results), len(remaining))
+        if self.negative_cache is not None:
+            remaining = [word for word in remaining if word not in self.negative_cache]
+        if remaining:
+            start = time.perf_counter()
+            found = self.fetch_many(remaining, concurrency)
+            self.observe_batch(self.dictionary_source, start, len(found))
+            for word, entry in found.items():
+                results[word] = (entry, self.dictionary_source)
+        return [results.get(word, (None, None)) for word in words]
+
+    def observe_batch(self, source, start, count):
+        """Records count lookups answered by source since start, all taking the batch's average time"""
+        if self.metrics is not None and count:
+            self.metrics.observe(source, (time.perf_counter() - start) / count, count)
+
+    def fetch_many(self, words, concurrency):
+        """
+        {word: entry} for the words upstream has, filling the cache tiers with them.
+        Only the words upstream confirmed it doesn't have go in the negative cache,
+        never ones whose lookup failed.
+        """
+        if hasattr(self.dictionary, "search_many"):
+            # Upstreams that look words up in bulk say which lookups failed, as opposed to finding nothing
+            found, failed = self.dictionary.search_many(words)
+            failed = set(failed)
+            for _ in failed:
+                self.count_upstream_error()
+            not_found = [word for word in words if word not in found and word not in failed]
+        else:
+            def lookup(word):
+                try:
+                    return self.single_flight.do(word, self.dictionary.search, word)
+                except KeyError as e:
+                    return e
+
+            found = {}
+            not_found = []
+            with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(words)))) as executor:
+                for word, result in zip(words, executor.map(lookup, words)):
+                    if isinstance(result, WordNotFoundError):
+                        not_found.append(word)
+                    elif isinstance(result, KeyError):
+                        self.count_upstream_error()
+                    else:
+                        found[word] = result
+        # The cache tiers aren't necessarily thread safe, so they're only filled from this thread
+        for entry in found.values():
+            self.store(entry)
+        for word in not_found:
+            self.remember_not_found(word)
+        return found
+
+    async def asearch(self, word):
+        """asyncio version of search(), sharing the same cache tiers"""
+        try:
+            return self.search_memory_tier(word, self.arefresh_in_background)
         except Exception:
-            # If there's a KeyError, we'll search in local dictionary.
-            # This may also fail to find the word, at which point we give up
-            # (so allow the exception to be raised)
-            entry, duration = time_func(self.dictionary.search, word)
-            self.dictionary_entry_cache.add(entry)
-            return entry, self.dictionary_source, duration
+            pass
+        if self.disk_cache is not None:
+            # SQLite reads block, so keep them off the event loop; the memory cache is only touched from it
+            try:
+                return self.disk_cache_hit(*await asyncio.to_thread(measure, self.disk_cache.search_with_age, word))
+            except KeyError:
+                pass
+        self.count_lookups(misses=1)
+        self.check_negative_cache(word)
+        start = time.perf_counter()
+        entry = await self.async_single_flight.do(word, self.afetch, word)
+        elapsed = time.perf_counter() - start
+        if self.metrics is not None:
+            self.metrics.observe(self.dictionary_source, elapsed)
+        return entry, self.dictionary_source, round(elapsed, 6)
 
+    async def afetch(self, word):
+        try:
+            if isinstance(self.dictionary, OxfordDictionary):
+                if self.async_dictionary is None:
+                    self.async_dictionary = AsyncOxfordDictionary.from_client(self.dictionary)
+                entry = await self.async_dictionary.search(word)
+            else:
+                # No async client for this upstream, so keep it off the event loop
+                entry = await asyncio.to_thread(self.dictionary.search, word)
+        except WordNotFoundError:
+            self.remember_not_found(word)
+            raise
+        except KeyError:
+            self.count_upstream_error()
+            raise
+        self.store(entry)
+        return entry
 
-def time_func(func, *args , **kwargs):
+    def suggest(self, word, k=5):
+        """Spelling suggestions for a word that couldn't be found, if the upstream can make them"""
+        if hasattr(self.dictionary, "suggest"):
+            return self.dictionary.suggest(word, k)
+        return []
+
+    def search_text(self, query, operator="and", limit=10):
+        """Entries whose definitions mention the words in query, if the upstream can search them"""
+        if hasattr(self.dictionary, "search_text"):
+            return self.dictionary.search_text(query, operator, limit)
+        return []
+
+    def reload(self, only_if_changed=False):
+        """
+        Reloads a LOCAL dictionary's file (see LocalDictionary.reload), and drops
+        what the caches hold for the words that changed; everything else stays
+        cached.  Returns those words.  Other upstreams have nothing to reload.
+        """
+        if not hasattr(self.dictionary, "reload"):
+            return set()
+        if only_if_changed:
+            changed = self.dictionary.reload_if_changed()
+        else:
+            changed = self.dictionary.reload()
+        for word in changed:
+            self.dictionary_entry_cache.invalidate(word)
+            if self.disk_cache is not None:
+                self.disk_cache.invalidate(word)
+            if self.negative_cache is not None:
+                self.negative_cache.discard(word)
+        if self.metrics is not None and changed:
+            self.metrics.increment("reloads")
+            self.metrics.increment("reloaded_words", len(changed))
+        return changed
+
+    def watch(self, interval=1.0):
+        """Checks the dictionary file every interval seconds in the background, reloading it when it changes"""
+        if self.watcher is not None:
+            return
+        self.stop_watching.clear()
+        self.watcher = threading.Thread(target=self.watch_file, args=(interval,), name="dictionary-watch",
+                                        daemon=True)
+        self.watcher.start()
+
+    def watch_file(self, interval):
+        while not self.stop_watching.wait(interval):
+            try:
+                self.reload(only_if_changed=True)
+            except Exception:
+                # Missing, half written, invalid or not shaped like a dictionary: keep the entries we have,
+                # and try again next time rather than letting the watcher die
+                if self.metrics is not None:
+                    self.metrics.increment("reload_errors")
+
+    def lookup_stats(self):
+        """
+        Cache hits, cache misses, misses that piggybacked on an in-flight lookup,
+        and misses answered by the negative cache (upstream calls saved)
+        """
+        with self.lookup_lock:
+            hits, misses = self.hits, self.misses
+        return {"hits": hits,
+                "misses": misses,
+                "coalesced": self.single_flight.coalesced + self.async_single_flight.coalesced,
+                "negative_hits": self.negative_cache.hits if self.negative_cache is not None else 0}
+
+    async def asearch_many(self, words, concurrency=10):
+        """
+        Looks up all words, with at most concurrency upstream lookups in flight.
+        Each distinct word is looked up once, however often it appears.
+        Returns one (entry, source) pair per input word, in input order,
+        with (None, None) for words that can't be found.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def lookup(word):
+            async with semaphore:
+                try:
+                    entry, source, duration = await self.asearch(word)
+                    return entry, source
+                except KeyError:
+                    return None, None
+
+        distinct = list(dict.fromkeys(words))
+        results = dict(zip(distinct, await asyncio.gather(*(lookup(word) for word in distinct))))
+        return [results[word] for word in words]
+
+    def close(self):
+        """Waits for background refreshes to finish, and stops their threads and the watch() one"""
+        if self.watcher is not None:
+            self.stop_watching.set()
+            self.watcher.join()
+            self.watcher = None
+        with self.refresh_lock:
+            refresher, self.refresher = self.refresher, None
+        if refresher is not None:
+            refresher.shutdown(wait=True)
+
+    async def aclose(self):
+        """Waits for refreshes started by asearch(), then closes the async upstream"""
+        if self.refresh_tasks:
+            await asyncio.gather(*self.refresh_tasks)
+        if self.async_dictionary is not None:
+            await self.async_dictionary.aclose()
+
+
+DEFAULT_SOCKET = "/tmp/dictionary.sock"
+
+
+def is_up_to_date(derived_name, source_name):
+    """True if the file derived_name exists and isn't older than source_name"""
+    return os.path.exists(derived_name) and os.path.getmtime(derived_name) >= os.path.getmtime(source_name)
+
+
+def file_signature(filename):
+    """Changes whenever the file is rewritten"""
+    stat = os.stat(filename)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def changed_words(old, new):
+    """Words added, removed, or whose entry is different, between two word -> entry mappings"""
+    if isinstance(old, CompiledDictionary) and isinstance(new, CompiledDictionary):
+        return old.changed_words(new)
+    changed = {word for word in old if word not in new}
+    old_fields, new_fields = stored_fields(old), stored_fields(new)
+    for word in new:
+        if word not in old or old_fields(word) != new_fields(word):
+            changed.add(word)
+    return changed
+
+
+def stored_fields(dictionary):
+    """Function returning the comparable contents of an entry of dictionary, without decoding it if possible"""
+    if isinstance(dictionary, OffsetIndex):
+        return dictionary.raw
+    if isinstance(dictionary, EntryStore):
+        return dictionary.fields
+    return lambda word: entry_fields(dictionary[word])
+
+
+def measure(func, *args, **kwargs):
+    """(result, seconds taken) of calling func, unrounded so sub-microsecond calls still register"""
     start = time.perf_counter()
     result = func(*args, **kwargs)
-    duration = round(time.perf_counter() - start, 6)  # duration is in seconds.
+    return result, time.perf_counter() - start
+
+
+def time_func(func, *args , **kwargs):
+    result, duration = measure(func, *args, **kwargs)
+    duration = round(duration, 6)  # duration is in seconds.
     return result, duration
 
 
+def entry_fields(entry):
+    return entry.word, entry.part_of_speech, entry.definition, entry.example
+
+
+def serve(socket_path=DEFAULT_SOCKET, workers=1, dictionary_json_name="dictionary.json", mode=LoadMode.EAGER):
+    """
+    Loads the local dictionary once and answers lookups from other processes on
+    a Unix socket (see dictserver.py), until interrupted.  Clients use
+    Dictionary(source=DictionarySource.LOCAL, local_server=socket_path).
+    With workers > 1 the server pre-forks; LoadMode.MMAP shares the most
+    memory between workers, since reading Python objects writes their refcounts.
+    """
+    local_dict = LocalDictionary(dictionary_json_name, mode=mode)
+    server = DictionaryServer(socket_path, lambda word: entry_fields(local_dict.search(word)), workers)
+    print(f"Serving {len(local_dict.dictionary)} words on {socket_path} with {workers} worker(s)")
+    # Stop cleanly on kill as well as Ctrl-C, so the workers and the socket file don't outlive us
+    signal.signal(signal.SIGTERM, lambda signal_number, frame: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
 def main():
     dictionary = Dictionary()
     while True:
@@ -182,8 +1354,23 @@ def main():
             entry, source, duration = dictionary.search(word)
             print(f"{entry}\n(Found in {source} in {duration} seconds)\n")
         except KeyError as e:
-            print(f"Error when searching: {str(e)}\n")
+            print(f"Error when searching: {str(e)}")
+            suggestions = dictionary.suggest(word)
+            if suggestions:
+                print(f"Did you mean: {', '.join(suggestions)}?")
+            print()
 
 
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser(description="Online Dictionary")
+    subparsers = parser.add_subparsers(dest="command")
+    serve_parser = subparsers.add_parser("serve", help=serve.__doc__.strip().splitlines()[0])
+    serve_parser.add_argument("--socket", default=DEFAULT_SOCKET)
+    serve_parser.add_argument("--workers", type=int, default=1)
+    serve_parser.add_argument("--dictionary", default="dictionary.json")
+    serve_parser.add_argument("--mode", choices=[mode.name for mode in LoadMode], default=LoadMode.EAGER.name)
+    args = parser.parse_args()
+    if args.command == "serve":
+        serve(args.socket, args.workers, args.dictionary, LoadMode[args.mode])
+    else:
+        main()
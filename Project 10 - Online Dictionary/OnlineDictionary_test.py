@@ -4,8 +4,760 @@ Jimmy Tran
 Testing
 """
 
+import json
+import os
+import tempfile
+import threading
+import time
 import unittest
 from OnlineDictionary import *
+from metrics import Metrics
+from stubserver import StubDictionary, StubOxfordServer
+
+
+class LocalDictionaryTest(unittest.TestCase):
+    def testLoadModes(self):
+        eager = LocalDictionary()
+        self.assertEqual(eager.search("jolly").definition, "full of high spirits")
+        for mode in (LoadMode.STREAM, LoadMode.OFFSET_INDEX, LoadMode.COLUMNAR):
+            local_dict = LocalDictionary(mode=mode)
+            self.assertEqual(len(local_dict.dictionary), len(eager.dictionary))
+            for word in eager.dictionary:
+                self.assertEqual(str(local_dict.search(word)), str(eager.search(word)))
+            self.assertRaises(KeyError, lambda: local_dict.search("potato"))
+        self.assertRaises(ValueError, lambda: LocalDictionary(mode=None))
+
+    def testSearchPrefix(self):
+        local_dict = LocalDictionary()
+        self.assertEqual(local_dict.search_prefix("f"), ["facetious", "fly", "foothill"])
+        self.assertEqual(local_dict.search_prefix("f", limit=1), ["facetious"])
+        self.assertEqual(local_dict.search_prefix("z"), [])
+        with tempfile.TemporaryDirectory() as directory:
+            index_name = os.path.join(directory, "dictionary.trie")
+            LocalDictionary(prefix_index_name=index_name).search_prefix("a")
+            self.assertTrue(os.path.exists(index_name))
+            local_dict = LocalDictionary(prefix_index_name=index_name)
+            self.assertEqual(local_dict.search_prefix("p"), ["prodigal", "python"])
+            # A saved trie that doesn't match the dictionary is rebuilt, however new it is
+            Trie.from_words(["pzazz"]).save(index_name)
+            local_dict = LocalDictionary(prefix_index_name=index_name)
+            self.assertEqual(local_dict.search_prefix("p"), ["prodigal", "python"])
+            self.assertEqual(len(Trie.load(index_name)), len(local_dict.dictionary))
+
+    def testSuggest(self):
+        local_dict = LocalDictionary()
+        self.assertEqual(local_dict.suggest("pyhton"), ["python"])
+        self.assertEqual(local_dict.suggest("jely"), ["fly", "jolly"])
+        self.assertEqual(local_dict.suggest("jely", max_distance=1), [])
+        self.assertEqual(local_dict.suggest("potato"), [])
+        # Further than the index was built for, so it has to be rebuilt
+        self.assertEqual(local_dict.suggest("fothi"), [])
+        self.assertEqual(local_dict.suggest("fothi", max_distance=3), ["foothill"])
+        self.assertEqual(local_dict.suggest("fothi"), [])
+
+        dictionary = Dictionary(source=DictionarySource.LOCAL)
+        self.assertRaises(KeyError, lambda: dictionary.search("foothil"))
+        self.assertEqual(dictionary.suggest("foothil"), ["foothill"])
+        self.assertEqual(Dictionary().suggest("foothil"), [])
+
+    def testSearchText(self):
+        with tempfile.TemporaryDirectory() as directory:
+            json_name = os.path.join(directory, "dictionary.json")
+            with open("dictionary.json") as source, open(json_name, "w") as target:
+                target.write(source.read())
+            for mode in LoadMode:
+                local_dict = LocalDictionary(json_name, mode=mode)
+                self.assertEqual([entry.word for entry in local_dict.search_text("snake")], ["python"])
+                self.assertEqual([entry.word for entry in local_dict.search_text("he was")], ["facetious", "fly"])
+                self.assertEqual(len(local_dict.search_text("mountain jolly")), 0)
+                self.assertEqual({entry.word for entry in local_dict.search_text("mountain jolly", "or")},
+                                 {"foothill", "jolly"})
+            self.assertTrue(os.path.exists(os.path.join(directory, "dictionary.fulltext")))
+            dictionary = Dictionary(source=DictionarySource.LOCAL)
+            dictionary.dictionary = LocalDictionary(json_name)
+            self.assertEqual(dictionary.search_text("card")[0].word, "ace")
+        self.assertEqual(Dictionary().search_text("card"), [])
+
+    def testBloomFilter(self):
+        with tempfile.TemporaryDirectory() as directory:
+            json_name = os.path.join(directory, "dictionary.json")
+            with open("dictionary.json") as source, open(json_name, "w") as target:
+                target.write(source.read())
+            for mode in LoadMode:
+                local_dict = LocalDictionary(json_name, mode=mode, bloom_fp_rate=0.01)
+                self.assertEqual(len(local_dict.bloom_filter), 7)
+                self.assertEqual(local_dict.search("jolly").definition, "full of high spirits")
+                self.assertRaises(WordNotFoundError, lambda: local_dict.search("potato"))
+            self.assertTrue(os.path.exists(os.path.join(directory, "dictionary.bloom")))
+        self.assertIsNone(LocalDictionary().bloom_filter)
+
+    def testMmapCompilesOnDemand(self):
+        eager = LocalDictionary()
+        with tempfile.TemporaryDirectory() as directory:
+            json_name = os.path.join(directory, "dictionary.json")
+            with open("dictionary.json") as source, open(json_name, "w") as target:
+                target.write(source.read())
+            local_dict = LocalDictionary(json_name, mode=LoadMode.MMAP)
+            self.assertTrue(os.path.exists(os.path.join(directory, "dictionary.bin")))
+            self.assertEqual(sorted(local_dict.dictionary), sorted(eager.dictionary))
+            for word in eager.dictionary:
+                self.assertEqual(str(local_dict.search(word)), str(eager.search(word)))
+            self.assertRaises(KeyError, lambda: local_dict.search("potato"))
+            local_dict.dictionary.close()
+
+
+class LRUDictionaryEntryCacheTest(unittest.TestCase):
+    def testAddSearch(self):
+        cache = LRUDictionaryEntryCache(2)
+        self.assertRaises(TypeError, lambda: cache.add("ace"))
+        ace = DictionaryEntry("ace", "noun", "a playing card")
+        fly = DictionaryEntry("fly", "verb", "move through the air")
+        jolly = DictionaryEntry("jolly", "adjective", "full of high spirits")
+        cache.add(ace)
+        cache.add(fly)
+        self.assertIs(cache.search("ace"), ace)
+        # fly is now the least recently used, so it's the one evicted
+        cache.add(jolly)
+        self.assertEqual(cache.count, 2)
+        self.assertRaises(KeyError, lambda: cache.search("fly"))
+        self.assertIs(cache.search("jolly"), jolly)
+        self.assertEqual(cache.stats.hits, 2)
+        self.assertEqual(cache.stats.evictions, 1)
+
+    def testInvalidate(self):
+        ace = DictionaryEntry("ace", "noun", "a playing card")
+        fly = DictionaryEntry("fly", "verb", "move through the air")
+        for cache in (DictionaryEntryCache(2), LRUDictionaryEntryCache(2)):
+            cache.add(ace)
+            cache.add(fly)
+            cache.invalidate("ace")
+            cache.invalidate("potato")
+            self.assertEqual(cache.count, 1)
+            self.assertRaises(KeyError, lambda: cache.search("ace"))
+            self.assertIs(cache.search("fly"), fly)
+
+    def testDictionaryTakesPolicy(self):
+        dictionary = Dictionary(cache_policy=ARCPolicy(10))
+        self.assertIsInstance(dictionary.dictionary_entry_cache.policy, ARCPolicy)
+        self.assertEqual(dictionary.dictionary_entry_cache.capacity, 10)
+
+
+class DiskCacheTierTest(unittest.TestCase):
+    def testSurvivesRestart(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "cache.db")
+            upstream = StubDictionary("ace")
+
+            dictionary = Dictionary(disk_cache=DiskDictionaryEntryCache(filename))
+            dictionary.dictionary = upstream
+            self.assertEqual(dictionary.search("ace")[1], DictionarySource.OXFORD_ONLINE)
+            self.assertEqual(dictionary.search("ace")[1], DictionarySource.CACHE)
+            dictionary.disk_cache.close()
+
+            # A new process: empty memory cache, but the disk tier remembers
+            dictionary = Dictionary(disk_cache=DiskDictionaryEntryCache(filename))
+            dictionary.dictionary = upstream
+            entry, source, duration = dictionary.search("ace")
+            self.assertEqual(source, DictionarySource.DISK_CACHE)
+            self.assertEqual(entry.definition, "definition of ace")
+            self.assertEqual(dictionary.search("ace")[1], DictionarySource.CACHE)
+            self.assertEqual(upstream.calls, 1)
+            self.assertRaises(KeyError, lambda: dictionary.search("potato"))
+            dictionary.disk_cache.close()
+
+    def testKeepsAge(self):
+        with tempfile.TemporaryDirectory() as directory:
+            now = [1000.0]
+            dictionary = Dictionary(disk_cache=DiskDictionaryEntryCache(os.path.join(directory, "cache.db")),
+                                    ttl=60, clock=lambda: now[0])
+            dictionary.disk_cache.disk_cache.clock = lambda: now[0]
+            dictionary.dictionary = StubDictionary("ace")
+            dictionary.disk_cache.add(DictionaryEntry("ace", "noun", "a playing card"))
+            now[0] += 50
+            self.assertEqual(dictionary.search("ace")[1], DictionarySource.DISK_CACHE)
+            # Promoted to memory 50s into its 60s, so it expires there 10s later rather than 60s
+            self.assertEqual(dictionary.dictionary_entry_cache.search_with_age("ace")[1], 50)
+            now[0] += 11
+            self.assertEqual(dictionary.search("ace")[1], DictionarySource.DISK_CACHE)
+            self.assertEqual(dictionary.dictionary.calls, 0)
+            dictionary.disk_cache.close()
+
+
+class OxfordDictionaryStubTest(unittest.TestCase):
+    ENTRIES = {"ace": ("noun", "a playing card", "the ace of diamonds"),
+               "python": ("noun", "a large snake", None)}
+
+    def testPooledSessionReusesConnection(self):
+        with StubOxfordServer(self.ENTRIES) as server:
+            oxford = OxfordDictionary(base_url=server.url)
+            for _ in range(5):
+                entry = oxford.search("ace")
+            self.assertEqual(entry.example, "the ace of diamonds")
+            self.assertIsNone(oxford.search("Python").example)
+            self.assertRaises(KeyError, lambda: oxford.search("potato"))
+            oxford.close()
+            self.assertEqual(server.requests, 7)
+            self.assertEqual(server.connections, 1)
+
+    def testRetriesThrottling(self):
+        with StubOxfordServer(self.ENTRIES, statuses=[429, 503]) as server:
+            oxford = OxfordDictionary(base_url=server.url, backoff_factor=0)
+            self.assertEqual(oxford.search("ace").word, "ace")
+            self.assertEqual(server.requests, 3)
+            oxford.close()
+
+        with StubOxfordServer(self.ENTRIES, statuses=[503] * 3) as server:
+            oxford = OxfordDictionary(base_url=server.url, retries=1, backoff_factor=0)
+            with self.assertRaises(KeyError) as context:
+                oxford.search("ace")
+            self.assertIn("503", str(context.exception))
+            oxford.close()
+
+        # Queued statuses can include a 200, even for a word the stub doesn't have
+        with StubOxfordServer(self.ENTRIES, statuses=[200, 200]) as server:
+            oxford = OxfordDictionary(base_url=server.url)
+            self.assertEqual(oxford.search("ace").definition, "a playing card")
+            self.assertEqual(oxford.search("potato").definition, "definition of potato")
+            self.assertRaises(WordNotFoundError, lambda: oxford.search("potato"))
+            oxford.close()
+
+
+class RateLimitTest(unittest.TestCase):
+    def testBacksOffOn429(self):
+        with StubOxfordServer(OxfordDictionaryStubTest.ENTRIES, statuses=[429, 429]) as server:
+            oxford = OxfordDictionary(base_url=server.url, max_concurrency=4)
+            self.assertEqual(oxford.search("ace").word, "ace")
+            self.assertEqual(server.requests, 3)
+            self.assertEqual(oxford.concurrency_limiter.throttled, 2)
+            # Halved twice, then one success
+            self.assertEqual(oxford.concurrency_limiter.limit, 2)
+            oxford.close()
+
+    def testStaysUnderQuota(self):
+        words = [f"word{i}" for i in range(40)]
+        with StubOxfordServer(quota=200, burst=5) as server:
+            dictionary = Dictionary(cache_policy=LRUPolicy(100))
+            dictionary.dictionary = OxfordDictionary(base_url=server.url, retries=0)
+            results = dictionary.search_many(words, concurrency=8)
+            self.assertIn((None, None), results)
+            self.assertGreater(server.throttled, 0)
+
+        with StubOxfordServer(quota=200, burst=5) as server:
+            dictionary = Dictionary(cache_policy=LRUPolicy(100))
+            dictionary.dictionary = OxfordDictionary(base_url=server.url, retries=3, rate_limit=180, burst=5,
+                                                     max_concurrency=8)
+            results = dictionary.search_many(words, concurrency=8)
+            self.assertEqual([entry.word for entry, source in results], words)
+            dictionary.dictionary.close()
+
+
+class AsyncDictionaryTest(unittest.IsolatedAsyncioTestCase):
+    async def testAsearchSharesCache(self):
+        with StubOxfordServer(OxfordDictionaryStubTest.ENTRIES) as server:
+            dictionary = Dictionary()
+            dictionary.dictionary = OxfordDictionary(base_url=server.url)
+            entry, source, duration = await dictionary.asearch("ace")
+            self.assertEqual(entry.example, "the ace of diamonds")
+            self.assertEqual(source, DictionarySource.OXFORD_ONLINE)
+            self.assertEqual(dictionary.search("ace")[1], DictionarySource.CACHE)
+            self.assertEqual((await dictionary.asearch("ace"))[1], DictionarySource.CACHE)
+            with self.assertRaises(KeyError):
+                await dictionary.asearch("potato")
+            await dictionary.aclose()
+            self.assertEqual(server.requests, 2)
+
+    async def testAsearchRefreshesAsync(self):
+        now = [1000.0]
+        with StubOxfordServer(OxfordDictionaryStubTest.ENTRIES) as server:
+            dictionary = Dictionary(ttl=10, stale_ttl=60, clock=lambda: now[0], metrics=True)
+            dictionary.dictionary = OxfordDictionary(base_url=server.url)
+            await dictionary.asearch("ace")
+            # A stale hit from asearch is refetched on the event loop, not through the sync client
+            dictionary.fetch = lambda word: self.fail("refreshed with the sync client")
+            now[0] += 30
+            self.assertEqual((await dictionary.asearch("ace"))[1], DictionarySource.CACHE)
+            await dictionary.aclose()
+            self.assertEqual(server.requests, 2)
+            self.assertEqual(dictionary.metrics.snapshot()["counters"], {"stale_hits": 1, "refreshes": 1})
+            self.assertEqual(dictionary.dictionary_entry_cache.search_with_age("ace")[1], 0)
+
+    async def testAsearchDiskCache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            dictionary = Dictionary(disk_cache=DiskDictionaryEntryCache(os.path.join(directory, "cache.db")))
+            dictionary.dictionary = StubDictionary("potato")
+            dictionary.disk_cache.add(DictionaryEntry("ace", "noun", "a playing card"))
+            threads = []
+            search = dictionary.disk_cache.search
+            dictionary.disk_cache.search = lambda word: threads.append(threading.get_ident()) or search(word)
+            entry, source, duration = await dictionary.asearch("ace")
+            self.assertEqual((entry.definition, source), ("a playing card", DictionarySource.DISK_CACHE))
+            self.assertNotEqual(threads, [threading.get_ident()])
+            self.assertEqual((await dictionary.asearch("ace"))[1], DictionarySource.CACHE)
+            self.assertEqual((await dictionary.asearch("potato"))[1], DictionarySource.OXFORD_ONLINE)
+            self.assertEqual(dictionary.lookup_stats()["misses"], 1)
+            dictionary.disk_cache.close()
+
+    async def testAsearchMany(self):
+        with StubOxfordServer(latency=0.05) as server:
+            dictionary = Dictionary(cache_policy=LRUPolicy(100))
+            dictionary.async_dictionary = AsyncOxfordDictionary(base_url=server.url)
+            words = [f"word{i % 20}" for i in range(60)]
+            start = time.perf_counter()
+            results = await dictionary.asearch_many(words, concurrency=20)
+            elapsed = time.perf_counter() - start
+            await dictionary.aclose()
+        self.assertEqual([entry.word for entry, source in results], words)
+        # Duplicates inside the batch are only fetched once, and concurrently
+        self.assertEqual(server.requests, 20)
+        self.assertLess(elapsed, 20 * 0.05)
+
+    async def testAsearchManyRateLimited(self):
+        words = [f"word{i}" for i in range(40)]
+        with StubOxfordServer(quota=200, burst=5) as server:
+            dictionary = Dictionary(cache_policy=LRUPolicy(100))
+            # A little under the quota, so network jitter doesn't push requests over it
+            dictionary.dictionary = OxfordDictionary(base_url=server.url, rate_limit=180, burst=5, max_concurrency=8)
+            results = await dictionary.asearch_many(words, concurrency=20)
+            await dictionary.aclose()
+        self.assertEqual([entry.word for entry, source in results], words)
+        self.assertIs(dictionary.async_dictionary.rate_limiter, dictionary.dictionary.rate_limiter)
+
+    async def testAsyncClientKeepsSettings(self):
+        with StubOxfordServer() as server:
+            dictionary = Dictionary()
+            dictionary.dictionary = OxfordDictionary(base_url=server.url, pool_size=3, timeout=(1, 2), retries=1,
+                                                     backoff_factor=0.1, max_concurrency=4)
+            await dictionary.asearch("ace")
+            await dictionary.aclose()
+        async_dictionary = dictionary.async_dictionary
+        self.assertEqual((async_dictionary.base_url, async_dictionary.pool_size, async_dictionary.timeout,
+                          async_dictionary.retries, async_dictionary.backoff_factor),
+                         (server.url, 3, (1, 2), 1, 0.1))
+        self.assertIsInstance(async_dictionary.concurrency_limiter, AsyncAIMDLimiter)
+        self.assertEqual(async_dictionary.concurrency_limiter.max_limit, 4)
+        self.assertIsNone(async_dictionary.session)
+
+    async def testAsearchManyMissing(self):
+        with StubOxfordServer(OxfordDictionaryStubTest.ENTRIES) as server:
+            dictionary = Dictionary()
+            dictionary.async_dictionary = AsyncOxfordDictionary(base_url=server.url, retries=0)
+            results = await dictionary.asearch_many(["python", "potato", "python"])
+            await dictionary.aclose()
+        self.assertEqual(results[0][0].word, "python")
+        self.assertEqual(results[1], (None, None))
+        self.assertIs(results[0][0], results[2][0])
+
+
+class CoalescingTest(unittest.TestCase):
+    def testConcurrentMissesShareOneFetch(self):
+        dictionary = Dictionary()
+        dictionary.dictionary = StubDictionary("ace", latency=0.1)
+        barrier = threading.Barrier(10)
+        results = []
+
+        def worker():
+            barrier.wait()
+            results.append(dictionary.search("ace"))
+
+        threads = [threading.Thread(target=worker) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(results), 10)
+        self.assertEqual(dictionary.dictionary.calls, 1)
+        self.assertEqual(dictionary.lookup_stats(), {"hits": 0, "misses": 10, "coalesced": 9,
+                                                     "negative_hits": 0})
+        dictionary.search("ace")
+        self.assertEqual(dictionary.lookup_stats()["hits"], 1)
+
+
+class ShardedDictionaryEntryCacheTest(unittest.TestCase):
+    def testAddSearch(self):
+        cache = ShardedDictionaryEntryCache(capacity=8, shards=4)
+        self.assertEqual(cache.capacity, 8)
+        self.assertRaises(TypeError, lambda: cache.add("ace"))
+        self.assertRaises(ValueError, lambda: ShardedDictionaryEntryCache(capacity=8, shards=0))
+        self.assertEqual([shard.policy.capacity for shard in ShardedDictionaryEntryCache(10, 4).shards],
+                         [3, 3, 2, 2])
+        ace = DictionaryEntry("ace", "noun", "a playing card")
+        cache.add(ace)
+        self.assertIs(cache.search("ace"), ace)
+        self.assertTrue(cache.invalidate("ace"))
+        self.assertRaises(KeyError, lambda: cache.search("ace"))
+        self.assertEqual((cache.stats.hits, cache.stats.misses), (1, 1))
+
+    def testCapacity(self):
+        for capacity in (1, 3, 10, 17, 100):
+            dictionary = Dictionary(cache_policy=LRUPolicy(capacity), thread_safe=True)
+            self.assertEqual(dictionary.dictionary_entry_cache.capacity, capacity)
+            self.assertEqual(len(dictionary.dictionary_entry_cache.shards), min(16, capacity))
+        dictionary = Dictionary(cache_policy=TinyLFUPolicy(1000, window_ratio=0.2), thread_safe=True)
+        for shard in dictionary.dictionary_entry_cache.shards:
+            self.assertIsInstance(shard.policy, TinyLFUPolicy)
+            self.assertEqual(shard.policy.window_ratio, 0.2)
+
+    def testStress(self):
+        dictionary = Dictionary(cache_policy=LFUPolicy(50), thread_safe=True, shards=8)
+        dictionary.dictionary = StubDictionary(*(f"word{i}" for i in range(200)))
+        errors = []
+
+        def worker(seed):
+            try:
+                for i in range(2000):
+                    entry, source, duration = dictionary.search(f"word{(i * seed) % 200}")
+                    self.assertEqual(entry.word, f"word{(i * seed) % 200}")
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(1, 9)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertLessEqual(dictionary.dictionary_entry_cache.count, dictionary.dictionary_entry_cache.capacity)
+        stats = dictionary.lookup_stats()
+        self.assertEqual(stats["hits"] + stats["misses"], 8 * 2000)
+
+
+class NegativeCacheTest(unittest.TestCase):
+    def testUnknownWordsSkipUpstream(self):
+        with StubOxfordServer(OxfordDictionaryStubTest.ENTRIES) as server:
+            dictionary = Dictionary()
+            dictionary.dictionary = OxfordDictionary(base_url=server.url)
+            for _ in range(5):
+                self.assertRaises(WordNotFoundError, lambda: dictionary.search("asdfgh"))
+            self.assertEqual(server.requests, 1)
+            self.assertEqual(dictionary.lookup_stats()["negative_hits"], 4)
+            self.assertEqual(dictionary.negative_cache.stats()["upstream_calls_saved"], 4)
+
+        # Errors other than "not found" mustn't be remembered
+        with StubOxfordServer(OxfordDictionaryStubTest.ENTRIES, statuses=[503]) as server:
+            dictionary = Dictionary()
+            dictionary.dictionary = OxfordDictionary(base_url=server.url, retries=0)
+            self.assertRaises(KeyError, lambda: dictionary.search("ace"))
+            self.assertEqual(dictionary.search("ace")[1], DictionarySource.OXFORD_ONLINE)
+            self.assertEqual(len(dictionary.negative_cache), 0)
+
+    def testLocalMisses(self):
+        dictionary = Dictionary(source=DictionarySource.LOCAL, negative_cache=False)
+        self.assertIsNone(dictionary.negative_cache)
+        self.assertRaises(WordNotFoundError, lambda: dictionary.search("potato"))
+        dictionary = Dictionary(source=DictionarySource.LOCAL)
+        self.assertRaises(WordNotFoundError, lambda: dictionary.search("potato"))
+        self.assertRaises(WordNotFoundError, lambda: dictionary.search("potato"))
+        self.assertEqual(dictionary.lookup_stats()["negative_hits"], 1)
+
+
+class SearchManyTest(unittest.TestCase):
+    def testTiers(self):
+        with tempfile.TemporaryDirectory() as directory:
+            disk_cache = DiskDictionaryEntryCache(os.path.join(directory, "cache.db"))
+            disk_cache.add(DictionaryEntry("fly", "verb", "move through the air"))
+            dictionary = Dictionary(cache_policy=LRUPolicy(10), disk_cache=disk_cache)
+            dictionary.dictionary = StubDictionary("ace", "python", "fly", latency=0.05)
+            dictionary.search("ace")
+            start = time.perf_counter()
+            results = dictionary.search_many(["ace", "fly", "python", "potato", "python", "ace"])
+            elapsed = time.perf_counter() - start
+            self.assertEqual([source for entry, source in results],
+                             [DictionarySource.CACHE, DictionarySource.DISK_CACHE, DictionarySource.OXFORD_ONLINE,
+                              None, DictionarySource.OXFORD_ONLINE, DictionarySource.CACHE])
+            self.assertEqual(results[2][0].word, "python")
+            self.assertIs(results[2][0], results[4][0])
+            self.assertEqual(results[3], (None, None))
+            # Only python and potato went upstream, at the same time
+            self.assertEqual(dictionary.dictionary.calls, 3)
+            self.assertLess(elapsed, 2 * 0.05)
+            self.assertEqual(dictionary.lookup_stats()["misses"], 3)
+            self.assertEqual(dictionary.search("python")[1], DictionarySource.CACHE)
+            self.assertEqual(disk_cache.search("python").word, "python")
+            disk_cache.close()
+
+    def testLocal(self):
+        dictionary = Dictionary(source=DictionarySource.LOCAL, cache_policy=LRUPolicy(10), thread_safe=True,
+                                shards=2)
+        words = ["jolly", "potato", "python", "jolly"]
+        results = dictionary.search_many(words)
+        self.assertEqual([entry and entry.word for entry, source in results], ["jolly", None, "python", "jolly"])
+        self.assertEqual(results[0][1], DictionarySource.LOCAL)
+        results = dictionary.search_many(words)
+        self.assertEqual(results[0][1], DictionarySource.CACHE)
+        self.assertEqual(dictionary.lookup_stats()["negative_hits"], 1)
+        self.assertRaises(WordNotFoundError, lambda: dictionary.search("potato"))
+
+    def testFailingBatch(self):
+        class FailingUpstream:
+            """Bulk upstream whose every lookup fails"""
+            def search(self, word):
+                raise KeyError("Error: unavailable")
+
+            def search_many(self, words):
+                return {}, list(words)
+
+        dictionary = Dictionary(metrics=True)
+        dictionary.dictionary = FailingUpstream()
+        self.assertEqual(dictionary.search_many(["ace", "potato"]), [(None, None), (None, None)])
+        self.assertEqual(len(dictionary.negative_cache), 0)
+        self.assertEqual(dictionary.metrics.counters, {"upstream_errors": 2})
+
+
+class MetricsTest(unittest.TestCase):
+    def testPerSourceLatency(self):
+        dictionary = Dictionary(metrics=True)
+        dictionary.dictionary = StubDictionary("ace", "python")
+        dictionary.search("ace")
+        dictionary.search("ace")
+        dictionary.search_many(["ace", "python", "potato"])
+        self.assertRaises(WordNotFoundError, lambda: dictionary.search("potato"))
+        snapshot = dictionary.metrics.snapshot()
+        self.assertEqual(snapshot["latency_seconds"]["CACHE"]["count"], 2)
+        self.assertEqual(snapshot["latency_seconds"]["OXFORD_ONLINE"]["count"], 2)
+        # The stub says 404, so potato doesn't exist rather than upstream failing; the second
+        # lookup is answered by the negative cache
+        self.assertEqual(snapshot["counters"], {"not_found": 1})
+        self.assertEqual(snapshot["gauges"]["negative_hits"], 1)
+        # Memory cache hits take well under a microsecond, which rounding would have turned into 0
+        self.assertGreater(dictionary.metrics.latencies[DictionarySource.CACHE].sum, 0)
+        self.assertEqual(snapshot["gauges"]["hits"], 2)
+        self.assertEqual(snapshot["gauges"]["hit_ratio"], 2 / 6)
+        self.assertEqual(snapshot["gauges"]["cache_entries"], 2)
+        self.assertIn('dictionary_lookup_seconds_count{source="CACHE"} 2', dictionary.metrics.export())
+
+    def testNotFound(self):
+        dictionary = Dictionary(source=DictionarySource.LOCAL, metrics=Metrics())
+        self.assertRaises(WordNotFoundError, lambda: dictionary.search("potato"))
+        self.assertEqual(dictionary.metrics.snapshot()["counters"], {"not_found": 1})
+        self.assertIsNone(Dictionary(source=DictionarySource.LOCAL).metrics)
+
+
+class StaleWhileRevalidateTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+
+    def make_dictionary(self, **kwargs):
+        # Few shards, so ace and fly never have to share a 1 entry one
+        dictionary = Dictionary(cache_policy=LRUPolicy(10), clock=lambda: self.now, shards=2, **kwargs)
+        dictionary.dictionary = StubDictionary("ace", "fly", latency=0.2)
+        dictionary.search("ace")
+        return dictionary
+
+    def testExpiry(self):
+        dictionary = self.make_dictionary(ttl=10)
+        self.now += 5
+        self.assertEqual(dictionary.search("ace")[1], DictionarySource.CACHE)
+        self.assertEqual(dictionary.search_many(["ace"])[0][1], DictionarySource.CACHE)
+        self.now += 10
+        self.assertEqual(dictionary.search_many(["ace"])[0][1], DictionarySource.OXFORD_ONLINE)
+        self.now += 11
+        self.assertEqual(dictionary.search("ace")[1], DictionarySource.OXFORD_ONLINE)
+        self.assertEqual(dictionary.dictionary.calls, 3)
+        self.assertIsNone(dictionary.refresher)
+        self.assertRaises(ValueError, lambda: Dictionary(ttl=10, refresh_ahead=1.5))
+
+    def testServesStaleWhileRefreshing(self):
+        dictionary = self.make_dictionary(ttl=10, stale_ttl=60, metrics=True)
+        self.now += 30
+        start = time.perf_counter()
+        for _ in range(5):
+            self.assertEqual(dictionary.search("ace")[1], DictionarySource.CACHE)
+        self.assertLess(time.perf_counter() - start, 0.2)
+        dictionary.close()
+        # One refetch for all five stale hits, and the entry is fresh again
+        self.assertEqual(dictionary.dictionary.calls, 2)
+        self.assertEqual(dictionary.metrics.snapshot()["counters"], {"stale_hits": 5, "refreshes": 1})
+        self.now += 9
+        self.assertEqual(dictionary.search("ace")[1], DictionarySource.CACHE)
+        self.now += 100
+        self.assertEqual(dictionary.search("ace")[1], DictionarySource.OXFORD_ONLINE)
+        dictionary.close()
+
+    def testSearchManyServesStale(self):
+        dictionary = self.make_dictionary(ttl=10, stale_ttl=60, metrics=True)
+        self.now += 30
+        start = time.perf_counter()
+        self.assertEqual(dictionary.search_many(["ace"])[0][1], DictionarySource.CACHE)
+        self.assertLess(time.perf_counter() - start, 0.2)
+        dictionary.close()
+        self.assertEqual(dictionary.dictionary.calls, 2)
+        self.assertEqual(dictionary.metrics.snapshot()["counters"], {"stale_hits": 1, "refreshes": 1})
+        self.now += 100
+        self.assertEqual(dictionary.search_many(["ace"])[0][1], DictionarySource.OXFORD_ONLINE)
+
+    def testRefreshErrors(self):
+        dictionary = self.make_dictionary(ttl=10, stale_ttl=60, metrics=True)
+        dictionary.dictionary.search = lambda word: 1 / 0
+        self.now += 30
+        self.assertEqual(dictionary.search("ace")[1], DictionarySource.CACHE)
+        dictionary.close()
+        self.assertEqual(dictionary.metrics.snapshot()["counters"], {"stale_hits": 1, "refresh_errors": 1})
+
+    def testRefreshAhead(self):
+        dictionary = self.make_dictionary(ttl=10, refresh_ahead=0.5, refresh_workers=1)
+        dictionary.search("fly")
+        self.now += 6
+        self.assertEqual(dictionary.search("ace")[1], DictionarySource.CACHE)
+        self.assertEqual(dictionary.search("fly")[1], DictionarySource.CACHE)
+        dictionary.close()
+        self.assertEqual(dictionary.dictionary.calls, 4)
+        # Refreshed at 1006, so still fresh at 1015
+        self.now += 9
+        self.assertEqual(dictionary.search("ace")[1], DictionarySource.CACHE)
+        dictionary.close()
+
+
+class LocalServerTest(unittest.TestCase):
+    def testDictionaryUsesServer(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "dictionary.sock")
+            local_dict = LocalDictionary()
+            server = DictionaryServer(path, lambda word: entry_fields(local_dict.search(word)))
+            thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05})
+            thread.start()
+            try:
+                dictionary = Dictionary(source=DictionarySource.LOCAL, local_server=path)
+                entry, source, duration = dictionary.search("jolly")
+                self.assertEqual(str(entry), str(local_dict.search("jolly")))
+                self.assertEqual(source, DictionarySource.LOCAL)
+                self.assertEqual(dictionary.search("jolly")[1], DictionarySource.CACHE)
+                self.assertRaises(WordNotFoundError, lambda: dictionary.search("potato"))
+                results = dictionary.search_many(["python", "potato", "fly"])
+                self.assertEqual([entry and entry.word for entry, source in results], ["python", None, "fly"])
+                dictionary.dictionary.close()
+            finally:
+                server.shutdown()
+                thread.join()
+                server.server_close()
+
+    def testServerErrorsAreNotNegativeCached(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "dictionary.sock")
+            local_dict = LocalDictionary()
+
+            def search(word):
+                if word == "boom":
+                    raise RuntimeError("the server fell over")
+                return entry_fields(local_dict.search(word))
+
+            server = DictionaryServer(path, search)
+            thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05})
+            thread.start()
+            try:
+                dictionary = Dictionary(source=DictionarySource.LOCAL, local_server=path, metrics=True)
+                results = dictionary.search_many(["boom", "jolly", "potato"])
+                self.assertEqual([entry and entry.word for entry, source in results], [None, "jolly", None])
+                # Only the confirmed miss is remembered, the failed lookup is an error
+                self.assertEqual(len(dictionary.negative_cache), 1)
+                self.assertNotIn("boom", dictionary.negative_cache)
+                self.assertEqual(dictionary.metrics.counters["upstream_errors"], 1)
+                with self.assertRaises(KeyError) as context:
+                    dictionary.search("boom")
+                self.assertNotIsInstance(context.exception, WordNotFoundError)
+                dictionary.dictionary.close()
+            finally:
+                server.shutdown()
+                thread.join()
+                server.server_close()
+
+
+class HotReloadTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.json_name = os.path.join(self.directory.name, "dictionary.json")
+        with open("dictionary.json") as file:
+            self.data = json.load(file)
+        self.write(self.data["entries"])
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, entries):
+        self.write_document({"entries": entries})
+
+    def write_document(self, document):
+        # Replaced rather than rewritten in place, as reload() asks
+        with open(self.json_name + ".tmp", "w") as file:
+            json.dump(document, file)
+        os.replace(self.json_name + ".tmp", self.json_name)
+        # Make sure the rewrite shows, however coarse the file system's timestamps are
+        self.modified = getattr(self, "modified", time.time_ns()) + 10 ** 9
+        os.utime(self.json_name, ns=(self.modified, self.modified))
+
+    def edit(self):
+        """Changes jolly, removes fly and adds gecko"""
+        entries = [dict(e, definition="cheerful") if e["word"] == "jolly" else e
+                   for e in self.data["entries"] if e["word"] != "fly"]
+        entries.append({"word": "gecko", "part_of_speech": "noun", "definition": "a nocturnal lizard"})
+        self.write(entries)
+
+    def testLocalDictionaryReload(self):
+        for mode in LoadMode:
+            self.write(self.data["entries"])
+            local_dict = LocalDictionary(self.json_name, mode=mode, bloom_fp_rate=0.01)
+            python = local_dict.search("python")
+            self.assertEqual(local_dict.search_prefix("f"), ["facetious", "fly", "foothill"])
+            self.assertEqual(local_dict.suggest("gekco"), [])
+            self.assertEqual(local_dict.search_text("lizard"), [])
+            self.assertEqual(local_dict.reload_if_changed(), set())
+            self.edit()
+            self.assertEqual(local_dict.reload_if_changed(), {"jolly", "fly", "gecko"}, mode)
+            self.assertEqual(local_dict.reload_if_changed(), set())
+            self.assertEqual(local_dict.search("jolly").definition, "cheerful")
+            self.assertEqual(local_dict.search("gecko").definition, "a nocturnal lizard")
+            self.assertRaises(WordNotFoundError, lambda: local_dict.search("fly"))
+            self.assertEqual(str(local_dict.search("python")), str(python))
+            self.assertEqual(local_dict.search_prefix("f"), ["facetious", "foothill"])
+            self.assertEqual(local_dict.suggest("gekco"), ["gecko"])
+            self.assertEqual([entry.word for entry in local_dict.search_text("lizard")], ["gecko"])
+            self.assertEqual(local_dict.search_text("air wings"), [])
+
+    def testDictionaryInvalidatesChangedWords(self):
+        dictionary = Dictionary(source=DictionarySource.LOCAL)
+        dictionary.dictionary = LocalDictionary(self.json_name)
+        for word in ("ace", "jolly", "fly"):
+            dictionary.search(word)
+        self.assertRaises(WordNotFoundError, lambda: dictionary.search("gecko"))
+        self.edit()
+        self.assertEqual(dictionary.reload(), {"jolly", "fly", "gecko"})
+        self.assertEqual(dictionary.search("ace")[1], DictionarySource.CACHE)
+        entry, source, duration = dictionary.search("jolly")
+        self.assertEqual((entry.definition, source), ("cheerful", DictionarySource.LOCAL))
+        self.assertRaises(WordNotFoundError, lambda: dictionary.search("fly"))
+        self.assertEqual(dictionary.search("gecko")[0].definition, "a nocturnal lizard")
+        self.assertEqual(Dictionary().reload(), set())
+
+    def testWatch(self):
+        dictionary = Dictionary(source=DictionarySource.LOCAL, metrics=True)
+        dictionary.dictionary = LocalDictionary(self.json_name)
+        dictionary.watch(interval=0.01)
+        with open(self.json_name, "w") as file:
+            file.write('{"entries": [')
+        self.edit()
+        deadline = time.monotonic() + 5
+        while "gecko" not in dictionary.dictionary.dictionary and time.monotonic() < deadline:
+            time.sleep(0.01)
+        dictionary.close()
+        self.assertEqual(dictionary.search("gecko")[0].definition, "a nocturnal lizard")
+        self.assertEqual(dictionary.metrics.counters["reloaded_words"], 3)
+
+    def testWatchSurvivesBadDocuments(self):
+        dictionary = Dictionary(source=DictionarySource.LOCAL, metrics=True)
+        dictionary.dictionary = LocalDictionary(self.json_name)
+        dictionary.watch(interval=0.01)
+        for errors, document in enumerate(({"words": []}, [1, 2], "entries"), 1):
+            self.write_document(document)
+            deadline = time.monotonic() + 5
+            while dictionary.metrics.counters.get("reload_errors", 0) < errors and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(dictionary.search("fly")[0].word, "fly")
+        self.edit()
+        deadline = time.monotonic() + 5
+        while "gecko" not in dictionary.dictionary.dictionary and time.monotonic() < deadline:
+            time.sleep(0.01)
+        dictionary.close()
+        self.assertGreaterEqual(dictionary.metrics.counters["reload_errors"], 3)
+        self.assertEqual(dictionary.search("gecko")[0].definition, "a nocturnal lizard")
 
 
 class TimeFuncTest(unittest.TestCase):
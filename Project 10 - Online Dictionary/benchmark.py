@@ -0,0 +1,704 @@
+"""
+Online Dictionary
+Jimmy Tran
+Benchmarks, run as: python benchmark.py <name> [options]
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from OnlineDictionary import *
+from stubserver import StubDictionary, StubOxfordServer
+from symspell import SymSpell
+from textindex import InvertedIndex, entry_terms, tokenize
+from trie import Trie
+
+
+def percentile(samples, p):
+    """p-th percentile (0-100) of samples, nearest-rank"""
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, round(p / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def report(name, samples):
+    """Prints one line of per-call latencies, samples being in seconds"""
+    print(f"{name:<28} n={len(samples):<7} "
+          f"mean={statistics.fmean(samples) * 1e6:9.1f}us "
+          f"p50={percentile(samples, 50) * 1e6:9.1f}us "
+          f"p99={percentile(samples, 99) * 1e6:9.1f}us")
+
+
+def zipf_words(count, vocabulary, s=1.0, seed=0):
+    """count words drawn from vocabulary distinct words, word i having weight 1 / i**s"""
+    rng = random.Random(seed)
+    words = [f"word{i}" for i in range(vocabulary)]
+    weights = [1 / (i + 1) ** s for i in range(vocabulary)]
+    return rng.choices(words, weights, k=count)
+
+
+def bench_pooling(args):
+    """Per-lookup latency of OxfordDictionary against a local stub, with and without a pooled session"""
+    with StubOxfordServer(latency=args.latency) as server:
+        for pooled in (False, True):
+            oxford = OxfordDictionary(base_url=server.url, pooled=pooled)
+            connections = server.connections
+            samples = []
+            for i in range(args.lookups):
+                start = time.perf_counter()
+                oxford.search(f"word{i}")
+                samples.append(time.perf_counter() - start)
+            oxford.close()
+            report("pooled" if pooled else "unpooled", samples)
+            print(f"{'':<28} connections opened: {server.connections - connections}")
+
+
+def bench_threads(args):
+    """Dictionary.search throughput from many threads: one global lock (1 shard) vs sharded locking"""
+    trace = zipf_words(args.lookups, args.vocabulary)
+    for shards in (1, args.shards):
+        for workers in args.workers:
+            dictionary = Dictionary(cache_policy=LRUPolicy(args.capacity), thread_safe=True, shards=shards)
+            dictionary.dictionary = StubDictionary(latency=args.latency)
+            errors = []
+
+            def worker(words):
+                try:
+                    for word in words:
+                        dictionary.search(word)
+                except Exception as e:
+                    errors.append(e)
+
+            threads = [threading.Thread(target=worker, args=(trace[i::workers],)) for i in range(workers)]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+            print(f"shards={shards:<3} workers={workers:<3} {args.lookups / elapsed:10.0f} lookups/s  "
+                  f"upstream calls={dictionary.dictionary.calls:<6} errors={len(errors)}")
+
+
+def bench_ratelimit(args):
+    """Bulk lookups against a stub API with a quota: no shaping vs token bucket vs AIMD concurrency vs both"""
+    words = [f"word{i}" for i in range(args.lookups)]
+    # Just under the quota, with no burst of its own.  A bucket matching the server's exactly leaves the server
+    # no tokens to spare, so a little scheduling jitter bunches two requests into a 429, and under a shared
+    # bucket that 429 pauses every thread for a whole Retry-After, where without one only a thread waits
+    shaping = {"rate_limit": args.quota * 0.95, "burst": 1}
+    configs = {"none": {},
+               "bucket": shaping,
+               "aimd": {"max_concurrency": args.concurrency},
+               "both": dict(shaping, max_concurrency=args.concurrency)}
+    print(f"{args.lookups} lookups, quota {args.quota:g}/s (burst {args.burst}), {args.concurrency} threads, "
+          f"bucket {shaping['rate_limit']:g}/s (burst {shaping['burst']})")
+    for name, limits in configs.items():
+        with StubOxfordServer(latency=args.latency, quota=args.quota, burst=args.burst,
+                              retry_after=args.retry_after) as server:
+            dictionary = Dictionary(cache_policy=LRUPolicy(args.lookups))
+            dictionary.dictionary = OxfordDictionary(base_url=server.url, pool_size=args.concurrency, **limits)
+            start = time.perf_counter()
+            results = dictionary.search_many(words, concurrency=args.concurrency)
+            elapsed = time.perf_counter() - start
+            dictionary.dictionary.close()
+            found = sum(entry is not None for entry, source in results)
+            print(f"{name:<8} {found / elapsed:8.1f} found/s  found={found:<6} failed={len(words) - found:<6} "
+                  f"requests={server.requests:<6} throttled={server.throttled}")
+    print(f"A throttled request costs bucket and both a {args.retry_after}s pause for every thread, which is "
+          f"what can make them slower than none when scheduling jitter gets one throttled")
+
+
+def load_trace(args):
+    """The words to replay: every whitespace-separated token of --trace, or a Zipf sample"""
+    if args.trace:
+        with open(args.trace, encoding="utf-8") as file:
+            return file.read().split()
+    return zipf_words(args.lookups, args.vocabulary, args.skew)
+
+
+def replay(dictionary, trace, workers):
+    """Looks up every word of trace (split over workers threads), returns the per-lookup latencies"""
+    samples = [[] for _ in range(workers)]
+
+    def worker(words, latencies):
+        for word in words:
+            start = time.perf_counter()
+            try:
+                dictionary.search(word)
+            except KeyError:
+                pass
+            latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=worker, args=(trace[i::workers], samples[i])) for i in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return [latency for latencies in samples for latency in latencies]
+
+
+def bench_replay(args):
+    """Replays a word trace against Dictionary for every cache capacity x policy x backend, upstream stubbed"""
+    trace = load_trace(args)
+    warmup = int(len(trace) * args.warmup)
+    print(f"{len(trace)} lookups, {len(set(trace))} distinct words, first {warmup} not measured, "
+          f"upstream latency {args.latency * 1e3:g}ms, {args.workers} worker(s)")
+    print(f"{'backend':<8} {'policy':<8} {'capacity':>8} {'lookups/s':>10} {'hit ratio':>9} {'upstream':>8} "
+          f"{'p50':>9} {'p99':>9} {'p99.9':>9}")
+    for backend in args.backends:
+        for policy in args.policies:
+            for capacity in args.capacities:
+                with tempfile.TemporaryDirectory() as directory:
+                    disk_cache = None
+                    if backend == "disk":
+                        disk_cache = DiskDictionaryEntryCache(os.path.join(directory, "cache.db"))
+                    dictionary = Dictionary(cache_policy=make_policy(policy, capacity), disk_cache=disk_cache,
+                                            thread_safe=backend == "sharded" or args.workers > 1)
+                    dictionary.dictionary = StubDictionary(latency=args.latency)
+                    replay(dictionary, trace[:warmup], args.workers)
+                    hits, misses, calls = dictionary.hits, dictionary.misses, dictionary.dictionary.calls
+                    start = time.perf_counter()
+                    samples = replay(dictionary, trace[warmup:], args.workers)
+                    elapsed = time.perf_counter() - start
+                    if disk_cache is not None:
+                        disk_cache.close()
+                hits, misses = dictionary.hits - hits, dictionary.misses - misses
+                print(f"{backend:<8} {policy:<8} {capacity:>8} {len(samples) / elapsed:>10.0f} "
+                      f"{hits / max(1, hits + misses):>9.4f} {dictionary.dictionary.calls - calls:>8} "
+                      f"{percentile(samples, 50) * 1e6:>7.1f}us {percentile(samples, 99) * 1e6:>7.1f}us "
+                      f"{percentile(samples, 99.9) * 1e6:>7.1f}us")
+
+
+def write_dictionary_json(filename, entries):
+    """Writes a made-up dictionary.json with entries words"""
+    with open(filename, "w") as file:
+        file.write('{"purpose": "benchmark", "entries": [\n')
+        for i in range(entries):
+            entry = {"word": f"word{i}", "part_of_speech": "noun",
+                     "definition": f"the definition of word number {i}, long enough to look like a real one"}
+            if i % 2:
+                entry["example"] = f"an example using word{i}"
+            file.write(("," if i else "") + json.dumps(entry) + "\n")
+        file.write("]}\n")
+
+
+def bench_load(args):
+    """LocalDictionary startup time and peak Python memory for each LoadMode"""
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "dictionary.json")
+        write_dictionary_json(filename, args.entries)
+        print(f"{args.entries} entries, {os.path.getsize(filename) / 2 ** 20:.1f} MiB")
+        # Compile ahead of time, as a deploy step would
+        start = time.perf_counter()
+        compile_dictionary(filename, os.path.join(directory, "dictionary.bin"))
+        print(f"compiled to dictionary.bin in {time.perf_counter() - start:.2f}s")
+        for mode in LoadMode:
+            tracemalloc.start()
+            start = time.perf_counter()
+            local_dict = LocalDictionary(filename, mode=mode, bloom_fp_rate=args.bloom)
+            elapsed = time.perf_counter() - start
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            samples = []
+            for word in zipf_words(args.lookups, args.entries):
+                lookup_start = time.perf_counter()
+                local_dict.search(word)
+                samples.append(time.perf_counter() - lookup_start)
+            misses = []
+            for i in range(args.lookups):
+                lookup_start = time.perf_counter()
+                try:
+                    local_dict.search(f"missing{i}")
+                except KeyError:
+                    pass
+                misses.append(time.perf_counter() - lookup_start)
+            print(f"{mode.name:<14} load={elapsed:7.2f}s resident={current / 2 ** 20:8.1f} MiB "
+                  f"peak={peak / 2 ** 20:8.1f} MiB")
+            report(f"  {mode.name} search", samples)
+            report(f"  {mode.name} miss", misses)
+
+
+def bench_reload(args):
+    """Applying an edit to dictionary.json: restarting (reload everything, cold cache) vs Dictionary.reload()"""
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "dictionary.json")
+        edited_name = os.path.join(directory, "edited.json")
+        write_dictionary_json(filename, args.entries)
+        with open(filename) as file:
+            data = json.load(file)
+        for entry in random.Random(0).sample(data["entries"], args.changes):
+            entry["definition"] += " (revised)"
+        warm_up = zipf_words(args.lookups, args.entries)
+        # Lookups right after the edit, to see how warm the cache still is
+        trace = zipf_words(args.lookups // 10, args.entries, seed=1)
+        for mode in LoadMode:
+            write_dictionary_json(filename, args.entries)
+            dictionary = Dictionary(source=DictionarySource.LOCAL, cache_policy=LRUPolicy(args.capacity))
+            dictionary.dictionary = LocalDictionary(filename, mode=mode)
+            for word in warm_up:
+                dictionary.search(word)
+            with open(edited_name, "w") as file:
+                json.dump(data, file)
+            os.replace(edited_name, filename)
+
+            # A lookup a millisecond carries on while the reload runs; the longest gap between two of
+            # them (waiting for the GIL included) is how long lookups stalled
+            stalls = []
+            done = threading.Event()
+
+            def reader():
+                longest = 0.0
+                previous = time.perf_counter()
+                while not done.is_set():
+                    dictionary.dictionary.search("word1")
+                    now = time.perf_counter()
+                    longest = max(longest, now - previous)
+                    previous = now
+                    time.sleep(0.001)
+                stalls.append(longest)
+
+            thread = threading.Thread(target=reader)
+            thread.start()
+            start = time.perf_counter()
+            changed = dictionary.reload()
+            reload_time = time.perf_counter() - start
+            done.set()
+            thread.join()
+            hits = dictionary.hits
+            for word in trace:
+                dictionary.search(word)
+            reload_hits = (dictionary.hits - hits) / len(trace)
+
+            start = time.perf_counter()
+            restarted = Dictionary(source=DictionarySource.LOCAL, cache_policy=LRUPolicy(args.capacity))
+            restarted.dictionary = LocalDictionary(filename, mode=mode)
+            restart_time = time.perf_counter() - start
+            for word in trace:
+                restarted.search(word)
+            print(f"{mode.name:<12} {len(changed)} changed: reload {reload_time:5.2f}s, "
+                  f"lookups stalled up to {stalls[0] * 1e3:6.1f}ms, hit ratio after {reload_hits:.1%} | "
+                  f"restart {restart_time:5.2f}s, hit ratio after {restarted.hits / len(trace):.1%}")
+
+
+def bench_bulk(args):
+    """Per-word cost of Dictionary.search in a loop vs one Dictionary.search_many call, over a local dictionary"""
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "dictionary.json")
+        write_dictionary_json(filename, args.entries)
+        local_dict = LocalDictionary(filename)
+    # Some tokens aren't words, like in real text
+    trace = zipf_words(args.tokens, args.entries * 11 // 10)
+    for name in ("search", "search_many"):
+        dictionary = Dictionary(source=DictionarySource.LOCAL, cache_policy=LRUPolicy(args.capacity))
+        dictionary.dictionary = local_dict
+        start = time.perf_counter()
+        if name == "search":
+            for word in trace:
+                try:
+                    dictionary.search(word)
+                except KeyError:
+                    pass
+        else:
+            dictionary.search_many(trace)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<12} {elapsed / len(trace) * 1e6:7.2f}us per word  {len(trace) / elapsed:10.0f} words/s")
+
+
+class UnslottedDictionaryEntry:
+    """DictionaryEntry as it was before __slots__, with an instance __dict__"""
+    def __init__(self, word, part_of_speech, definition, example=None):
+        self.word = word
+        self.part_of_speech = part_of_speech
+        self.definition = definition
+        self.example = example
+
+
+def bench_memory(args):
+    """Python memory held by a loaded dictionary: one object per entry (with and without __slots__) vs columns"""
+    parts_of_speech = ["noun", "verb", "adjective", "adverb", "preposition"]
+
+    def rows():
+        # Fresh strings for every entry, the way a JSON parser hands them out
+        for i in range(args.entries):
+            yield (f"word{i}", "".join(parts_of_speech[i % 5]),
+                   f"the definition of word number {i}, long enough to look like a real one",
+                   f"an example using word{i}" if i % 2 else None)
+
+    def unslotted():
+        return {row[0]: UnslottedDictionaryEntry(*row) for row in rows()}
+
+    def slotted():
+        return {row[0]: DictionaryEntry(*row) for row in rows()}
+
+    def columnar():
+        store = EntryStore(lambda fields: DictionaryEntry(*fields))
+        for row in rows():
+            store.add(*row)
+        return store
+
+    baseline = None
+    for name, build in (("__dict__", unslotted), ("__slots__", slotted), ("columnar", columnar)):
+        tracemalloc.start()
+        dictionary = build()
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        baseline = baseline or current
+        samples = []
+        for word in zipf_words(args.lookups, args.entries):
+            start = time.perf_counter()
+            dictionary[word]
+            samples.append(time.perf_counter() - start)
+        print(f"{name:<10} {current / 2 ** 20:8.1f} MiB  {current / args.entries:6.1f} bytes per entry "
+              f"({current / baseline:.0%})")
+        report(f"  {name} lookup", samples)
+        del dictionary
+
+
+def bench_metrics(args):
+    """Dictionary.search cost with metrics off and on, over a cache-friendly trace"""
+    trace = zipf_words(args.lookups, args.vocabulary)
+    for metrics in (False, True):
+        dictionary = Dictionary(cache_policy=LRUPolicy(args.capacity), metrics=metrics)
+        dictionary.dictionary = StubDictionary()
+        start = time.perf_counter()
+        for word in trace:
+            dictionary.search(word)
+        elapsed = time.perf_counter() - start
+        print(f"metrics={str(metrics):<6} {elapsed / len(trace) * 1e6:6.2f}us per lookup")
+    for source, summary in dictionary.metrics.snapshot()["latency_seconds"].items():
+        print(f"  {source:<14} n={summary['count']:<7} p50={summary['p50'] * 1e6:8.1f}us "
+              f"p95={summary['p95'] * 1e6:8.1f}us p99={summary['p99'] * 1e6:8.1f}us")
+
+
+def bench_server(args):
+    """What each worker process pays: loading its own LocalDictionary vs connecting to a serve() process"""
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "dictionary.json")
+        socket_path = os.path.join(directory, "dictionary.sock")
+        write_dictionary_json(filename, args.entries)
+        trace = zipf_words(args.lookups, args.entries)
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        local_dict = LocalDictionary(filename)
+        elapsed = time.perf_counter() - start
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print(f"{'in-process':<12} startup={elapsed * 1e3:9.1f}ms memory={current / 2 ** 20:8.1f} MiB")
+        samples = []
+        for word in trace:
+            start = time.perf_counter()
+            local_dict.search(word)
+            samples.append(time.perf_counter() - start)
+        report("  in-process search", samples)
+        del local_dict
+
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "OnlineDictionary.py")
+        server = subprocess.Popen([sys.executable, script, "serve", "--socket", socket_path,
+                                   "--dictionary", filename, "--workers", str(args.workers)],
+                                  stdout=subprocess.DEVNULL)
+        try:
+            deadline = time.monotonic() + args.startup_timeout
+            while not os.path.exists(socket_path):
+                if server.poll() is not None:
+                    sys.exit(f"The dictionary server exited with status {server.returncode} before it started")
+                if time.monotonic() > deadline:
+                    sys.exit(f"The dictionary server didn't start within {args.startup_timeout:g}s")
+                time.sleep(0.01)
+            tracemalloc.start()
+            start = time.perf_counter()
+            client = DictionaryClient(socket_path, lambda fields: DictionaryEntry(*fields), WordNotFoundError)
+            elapsed = time.perf_counter() - start
+            current = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            print(f"{'client':<12} startup={elapsed * 1e3:9.1f}ms memory={current / 2 ** 20:8.1f} MiB")
+            samples = []
+            for word in trace:
+                start = time.perf_counter()
+                client.search(word)
+                samples.append(time.perf_counter() - start)
+            report("  client search", samples)
+            start = time.perf_counter()
+            client.search_many(trace)
+            print(f"  client search_many        {(time.perf_counter() - start) / len(trace) * 1e6:9.1f}us per word")
+            client.close()
+        finally:
+            server.terminate()
+            server.wait()
+
+
+def random_words(count, seed=0):
+    """count distinct made-up words of 3 to 12 letters, English-ish letter frequencies"""
+    rng = random.Random(seed)
+    letters = "etaoinshrdlcumwfgypbvkjxqz"
+    weights = [1 / (i + 2) for i in range(len(letters))]
+    words = set()
+    while len(words) < count:
+        words.add("".join(rng.choices(letters, weights, k=rng.randint(3, 12))))
+    return sorted(words)
+
+
+def bench_prefix(args):
+    """search_prefix latency per keystroke, typing words out one letter at a time"""
+    words = random_words(args.words)
+    start = time.perf_counter()
+    trie = Trie.from_words(words)
+    print(f"built trie of {len(trie)} words in {time.perf_counter() - start:.2f}s")
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "dictionary.trie")
+        start = time.perf_counter()
+        trie.save(filename)
+        saved = time.perf_counter() - start
+        start = time.perf_counter()
+        trie = Trie.load(filename)
+        print(f"saved in {saved:.2f}s, loaded in {time.perf_counter() - start:.2f}s, "
+              f"{os.path.getsize(filename) / 2 ** 20:.1f} MiB on disk")
+    samples = []
+    for word in random.Random(1).sample(words, args.typed):
+        for i in range(1, len(word) + 1):
+            start = time.perf_counter()
+            trie.search_prefix(word[:i], args.limit)
+            samples.append(time.perf_counter() - start)
+    report("search_prefix per keystroke", samples)
+
+
+def bench_fuzzy(args):
+    """SymSpell "did you mean" latency for one-typo misspellings"""
+    words = random_words(args.words)
+    start = time.perf_counter()
+    index = SymSpell.from_words(words, max_distance=args.distance)
+    print(f"indexed {len(index)} words ({len(index.deletes)} deletes) in {time.perf_counter() - start:.2f}s")
+    rng = random.Random(1)
+    samples = []
+    for word in rng.sample(words, args.lookups):
+        i = rng.randrange(len(word))
+        typo = word[:i] + rng.choice("abcdefghijklmnopqrstuvwxyz") + word[i + 1:]
+        start = time.perf_counter()
+        index.lookup(typo, args.distance, args.k)
+        samples.append(time.perf_counter() - start)
+    report(f"lookup k={args.k} d={args.distance}", samples)
+
+
+def bench_fulltext(args):
+    """Full-text definition search: the inverted index vs scanning every entry"""
+    rng = random.Random(0)
+    vocabulary = random_words(args.vocabulary)
+    # Zipf-distributed terms, like real text: a few very common words, a long tail of rare ones
+    weights = [1 / (i + 1) for i in range(len(vocabulary))]
+    entries = [DictionaryEntry(f"word{i}", "noun", " ".join(rng.choices(vocabulary, weights, k=rng.randint(5, 25))),
+                               " ".join(rng.choices(vocabulary, weights, k=10)) if i % 2 else None)
+               for i in range(args.entries)]
+    start = time.perf_counter()
+    index = InvertedIndex.from_entries(entries)
+    print(f"indexed {len(index)} entries ({len(index.postings)} terms) in {time.perf_counter() - start:.2f}s")
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "dictionary.fulltext")
+        index.save(filename)
+        start = time.perf_counter()
+        InvertedIndex.load(filename)
+        print(f"saved to {os.path.getsize(filename) / 2 ** 20:.1f} MiB, loaded in {time.perf_counter() - start:.2f}s")
+
+    queries = [" ".join(rng.choices(vocabulary, weights, k=rng.randint(1, 3))) for _ in range(args.queries)]
+    for operator, test in (("and", all), ("or", any)):
+        samples = []
+        for query in queries:
+            start = time.perf_counter()
+            index.search(query, operator, args.limit)
+            samples.append(time.perf_counter() - start)
+        report(f"index {operator}", samples)
+        samples = []
+        for query in queries[:args.scans]:
+            terms = set(tokenize(query))
+            start = time.perf_counter()
+            found = []
+            for entry in entries:
+                indexed = set(entry_terms(entry))
+                if test(term in indexed for term in terms):
+                    found.append(entry)
+            samples.append(time.perf_counter() - start)
+        report(f"linear scan {operator}", samples)
+
+
+def bench_datalist(args):
+    """DataList (one DataNode per item) vs ArrayDataList (parallel arrays with a free list) at args.nodes nodes"""
+    for list_class in (DataList, ArrayDataList):
+        tracemalloc.start()
+        lst = list_class()
+        for i in range(args.nodes):
+            lst.add_to_head(i)
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del lst
+        gc.collect()
+        tracked = len(gc.get_objects())
+        collections = sum(stats["collections"] for stats in gc.get_stats())
+        start = time.perf_counter()
+        lst = list_class()
+        for i in range(args.nodes):
+            lst.add_to_head(i)
+        build_time = time.perf_counter() - start
+        collections = sum(stats["collections"] for stats in gc.get_stats()) - collections
+        tracked = len(gc.get_objects()) - tracked
+        start = time.perf_counter()
+        gc.collect()
+        collect_time = time.perf_counter() - start
+        start = time.perf_counter()
+        lst.reset_current()
+        while lst.iterate() is not None:
+            pass
+        iterate_time = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(args.nodes):
+            lst.remove_from_head()
+        drain_time = time.perf_counter() - start
+        # Refilled: ArrayDataList reuses its slots, DataList allocates again
+        start = time.perf_counter()
+        for i in range(args.nodes):
+            lst.add_to_head(i)
+        refill_time = time.perf_counter() - start
+        print(f"{list_class.__name__:<14} build={build_time:5.2f}s memory={current / 2 ** 20:6.1f} MiB "
+              f"gc tracked +{tracked:<8} gc runs during build={collections:<5} full gc={collect_time * 1e3:6.1f}ms "
+              f"iterate={iterate_time:5.2f}s drain={drain_time:5.2f}s refill={refill_time:5.2f}s")
+        del lst
+
+
+def bench_sorted(args):
+    """Building a sorted list with insert_sorted, then membership and remove: DataList vs SortedDataList"""
+    for list_class in (DataList, SortedDataList):
+        for size in args.sizes:
+            if list_class is DataList and size > args.linear_limit:
+                continue
+            items = random_words(size)
+            random.Random(0).shuffle(items)
+            lst = list_class()
+            start = time.perf_counter()
+            for item in items:
+                lst.insert_sorted(item)
+            build_time = time.perf_counter() - start
+            probes = random.Random(1).sample(items, min(args.probes, size))
+            if list_class is DataList:
+                def contains(item):
+                    return any(node.data == item for node in lst)
+            else:
+                def contains(item):
+                    return item in lst
+            start = time.perf_counter()
+            for item in probes:
+                contains(item)
+            search_time = time.perf_counter() - start
+            start = time.perf_counter()
+            for item in probes:
+                lst.remove(item)
+            remove_time = time.perf_counter() - start
+            print(f"{list_class.__name__:<15} n={size:<8} build={build_time:8.2f}s "
+                  f"({build_time / size * 1e6:7.1f}us per insert) "
+                  f"contains={search_time / len(probes) * 1e6:8.1f}us remove={remove_time / len(probes) * 1e6:8.1f}us")
+
+
+BENCHMARKS = {
+    "pooling": (bench_pooling, lambda parser: (
+        parser.add_argument("--lookups", type=int, default=500),
+        parser.add_argument("--latency", type=float, default=0.0, help="stub server latency in seconds"))),
+    "threads": (bench_threads, lambda parser: (
+        parser.add_argument("--lookups", type=int, default=200000),
+        parser.add_argument("--vocabulary", type=int, default=20000),
+        parser.add_argument("--capacity", type=int, default=2000),
+        parser.add_argument("--shards", type=int, default=16),
+        parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16]),
+        parser.add_argument("--latency", type=float, default=0.001, help="upstream latency in seconds"))),
+    "ratelimit": (bench_ratelimit, lambda parser: (
+        parser.add_argument("--lookups", type=int, default=1000),
+        parser.add_argument("--quota", type=float, default=200, help="stub server requests per second"),
+        parser.add_argument("--burst", type=int, default=10),
+        parser.add_argument("--retry-after", type=int, default=1, help="stub server Retry-After, in seconds"),
+        parser.add_argument("--concurrency", type=int, default=16),
+        parser.add_argument("--latency", type=float, default=0.01, help="stub server latency in seconds"))),
+    "replay": (bench_replay, lambda parser: (
+        parser.add_argument("--trace", help="text file whose whitespace-separated words are replayed, "
+                                            "instead of a Zipf sample"),
+        parser.add_argument("--lookups", type=int, default=200000),
+        parser.add_argument("--vocabulary", type=int, default=50000),
+        parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent"),
+        parser.add_argument("--warmup", type=float, default=0.1, help="fraction of the trace replayed first, "
+                                                                       "to fill the cache, and not measured"),
+        parser.add_argument("--capacities", type=int, nargs="+", default=[500, 2000, 8000]),
+        parser.add_argument("--policies", nargs="+", default=list(POLICIES), choices=list(POLICIES)),
+        parser.add_argument("--backends", nargs="+", default=["memory", "sharded", "disk"],
+                            choices=["memory", "sharded", "disk"]),
+        parser.add_argument("--workers", type=int, default=1),
+        parser.add_argument("--latency", type=float, default=0.0005, help="upstream latency in seconds"))),
+    "load": (bench_load, lambda parser: (
+        parser.add_argument("--entries", type=int, default=200000),
+        parser.add_argument("--lookups", type=int, default=10000),
+        parser.add_argument("--bloom", type=float, default=None, help="Bloom filter false positive rate"))),
+    "reload": (bench_reload, lambda parser: (
+        parser.add_argument("--entries", type=int, default=200000),
+        parser.add_argument("--changes", type=int, default=100, help="entries edited between the two versions"),
+        parser.add_argument("--lookups", type=int, default=50000),
+        parser.add_argument("--capacity", type=int, default=5000))),
+    "bulk": (bench_bulk, lambda parser: (
+        parser.add_argument("--entries", type=int, default=100000),
+        parser.add_argument("--tokens", type=int, default=1000000),
+        parser.add_argument("--capacity", type=int, default=10000))),
+    "memory": (bench_memory, lambda parser: (
+        parser.add_argument("--entries", type=int, default=1000000),
+        parser.add_argument("--lookups", type=int, default=100000))),
+    "metrics": (bench_metrics, lambda parser: (
+        parser.add_argument("--lookups", type=int, default=200000),
+        parser.add_argument("--vocabulary", type=int, default=20000),
+        parser.add_argument("--capacity", type=int, default=2000))),
+    "server": (bench_server, lambda parser: (
+        parser.add_argument("--entries", type=int, default=200000),
+        parser.add_argument("--lookups", type=int, default=20000),
+        parser.add_argument("--workers", type=int, default=1, help="server processes (pre-forked)"),
+        parser.add_argument("--startup-timeout", type=float, default=60,
+                            help="seconds to wait for the server to start listening"))),
+    "fulltext": (bench_fulltext, lambda parser: (
+        parser.add_argument("--entries", type=int, default=100000),
+        parser.add_argument("--vocabulary", type=int, default=20000),
+        parser.add_argument("--queries", type=int, default=1000),
+        parser.add_argument("--scans", type=int, default=10, help="queries to time the linear scan on"),
+        parser.add_argument("--limit", type=int, default=10))),
+    "datalist": (bench_datalist, lambda parser: (
+        parser.add_argument("--nodes", type=int, default=1000000),)),
+    "sorted": (bench_sorted, lambda parser: (
+        parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000]),
+        parser.add_argument("--linear-limit", type=int, default=10000,
+                            help="largest size to build a plain DataList for, insert_sorted being O(n)"),
+        parser.add_argument("--probes", type=int, default=1000))),
+    "prefix": (bench_prefix, lambda parser: (
+        parser.add_argument("--words", type=int, default=200000),
+        parser.add_argument("--typed", type=int, default=2000, help="how many words to type out"),
+        parser.add_argument("--limit", type=int, default=10))),
+    "fuzzy": (bench_fuzzy, lambda parser: (
+        parser.add_argument("--words", type=int, default=500000),
+        parser.add_argument("--lookups", type=int, default=2000),
+        parser.add_argument("--distance", type=int, default=2),
+        parser.add_argument("-k", type=int, default=5))),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Online Dictionary benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+    for name, (func, add_arguments) in BENCHMARKS.items():
+        add_arguments(subparsers.add_parser(name, help=func.__doc__))
+    args = parser.parse_args()
+    BENCHMARKS[args.benchmark][0](args)
+
+
+if __name__ == '__main__':
+    main()
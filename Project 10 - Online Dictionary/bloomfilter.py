@@ -0,0 +1,94 @@
+"""
+Bloom filter for definite-miss membership checks
+Jimmy Tran
+"""
+
+import hashlib
+import math
+import os
+import struct
+import tempfile
+
+MAGIC = b"BLOOM001"
+HEADER = struct.Struct("<8sQQQd")
+
+
+class BloomFilter:
+    """
+    Set membership with no false negatives: "word not in bloom" is always right,
+    "word in bloom" is wrong at most about fp_rate of the time once capacity
+    words were added.  Needs about 1.2 bytes per word at a 1% rate.
+    Hashes are computed with blake2b, not hash(), so a saved filter is valid in
+    other processes.
+    """
+
+    def __init__(self, capacity, fp_rate=0.01):
+        if capacity < 1:
+            capacity = 1
+        if not 0 < fp_rate < 1:
+            raise ValueError("fp_rate should be between 0 and 1")
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        self.bit_count = max(8, math.ceil(-capacity * math.log(fp_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.bit_count / capacity * math.log(2)))
+        self.bits = bytearray((self.bit_count + 7) // 8)
+        self.count = 0
+
+    @classmethod
+    def from_words(cls, words, fp_rate=0.01):
+        words = list(words)
+        bloom = cls(len(words), fp_rate)
+        for word in words:
+            bloom.add(word)
+        return bloom
+
+    def positions(self, word):
+        digest = hashlib.blake2b(word.encode("utf-8"), digest_size=16).digest()
+        h1, h2 = struct.unpack("<QQ", digest)
+        # Double hashing: k positions out of two independent hashes
+        h2 |= 1
+        return [(h1 + i * h2) % self.bit_count for i in range(self.hash_count)]
+
+    def add(self, word):
+        for position in self.positions(word):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, word):
+        bits = self.bits
+        for position in self.positions(word):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def __len__(self):
+        return self.count
+
+    def save(self, filename):
+        # A temporary file of its own, so processes saving at the same time don't write over each other
+        fd, temp_name = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(filename) or ".")
+        try:
+            with open(fd, "wb") as file:
+                file.write(HEADER.pack(MAGIC, self.bit_count, self.hash_count, self.count, self.fp_rate))
+                file.write(self.bits)
+            os.replace(temp_name, filename)
+        except BaseException:
+            os.unlink(temp_name)
+            raise
+
+    @classmethod
+    def load(cls, filename):
+        with open(filename, "rb") as file:
+            magic, bit_count, hash_count, count, fp_rate = HEADER.unpack(file.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{filename} is not a saved BloomFilter")
+            bloom = cls.__new__(cls)
+            bloom.capacity = count
+            bloom.fp_rate = fp_rate
+            bloom.bit_count = bit_count
+            bloom.hash_count = hash_count
+            bloom.count = count
+            bloom.bits = bytearray(file.read())
+        if len(bloom.bits) != (bit_count + 7) // 8:
+            raise ValueError(f"{filename} is truncated")
+        return bloom
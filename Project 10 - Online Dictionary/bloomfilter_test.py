@@ -0,0 +1,58 @@
+"""
+Bloom filter
+Jimmy Tran
+Testing
+"""
+
+import os
+import tempfile
+import threading
+import unittest
+from bloomfilter import *
+
+
+class BloomFilterTest(unittest.TestCase):
+    def testNoFalseNegatives(self):
+        words = [f"word{i}" for i in range(5000)]
+        bloom = BloomFilter.from_words(words, fp_rate=0.01)
+        self.assertEqual(len(bloom), 5000)
+        for word in words:
+            self.assertIn(word, bloom)
+        false_positives = sum(f"other{i}" in bloom for i in range(20000))
+        self.assertLess(false_positives / 20000, 0.02)
+        self.assertRaises(ValueError, lambda: BloomFilter(10, fp_rate=1))
+
+    def testSaveLoad(self):
+        bloom = BloomFilter.from_words(["ace", "python", "café"], fp_rate=0.001)
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "dictionary.bloom")
+            bloom.save(filename)
+            loaded = BloomFilter.load(filename)
+            with open(filename, "r+b") as file:
+                file.truncate(os.path.getsize(filename) - 1)
+            self.assertRaises(ValueError, lambda: BloomFilter.load(filename))
+        self.assertEqual(loaded.bits, bloom.bits)
+        self.assertEqual((loaded.hash_count, loaded.fp_rate, len(loaded)), (bloom.hash_count, 0.001, 3))
+        self.assertIn("café", loaded)
+
+    def testConcurrentSaves(self):
+        bloom = BloomFilter.from_words(["ace", "python"], fp_rate=0.01)
+        errors = []
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "dictionary.bloom")
+
+            def worker():
+                try:
+                    for _ in range(50):
+                        bloom.save(filename)
+                except Exception as e:
+                    errors.append(e)
+
+            threads = [threading.Thread(target=worker) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(errors, [])
+            self.assertEqual(os.listdir(directory), ["dictionary.bloom"])
+            self.assertIn("ace", BloomFilter.load(filename))
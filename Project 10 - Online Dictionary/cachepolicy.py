@@ -0,0 +1,402 @@
+"""
+Pluggable eviction policies for the dictionary entry cache
+Jimmy Tran
+"""
+
+from collections import OrderedDict
+
+from lrucache import LRUCache
+
+
+class CacheStats:
+    """Per-policy counters, used to compare policies on replayed traces"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rejections = 0
+
+    @property
+    def lookups(self):
+        return self.hits + self.misses
+
+    @property
+    def hit_ratio(self):
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    def as_dict(self):
+        return {"hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "rejections": self.rejections,
+                "hit_ratio": self.hit_ratio}
+
+    def __str__(self):
+        return f"hits={self.hits} misses={self.misses} evictions={self.evictions} " \
+               f"rejections={self.rejections} hit_ratio={self.hit_ratio:.4f}"
+
+
+class CachePolicy:
+    """
+    CachePolicy is the base class for a bounded key -> value store.
+    Subclasses implement _get, _put, discard, __len__ and __contains__;
+    get and put take care of the stats.
+    """
+    name = "base"
+
+    def __init__(self, capacity=1):
+        if capacity < 1:
+            raise ValueError("Capacity should be at least 1")
+        self.capacity = capacity
+        self.stats = CacheStats()
+
+    def with_capacity(self, capacity):
+        """A new, empty policy of the same kind and settings as this one, holding capacity keys"""
+        return type(self)(capacity)
+
+    def get(self, key):
+        """Returns the value for key, raises KeyError if absent"""
+        try:
+            value = self._get(key)
+        except KeyError:
+            self.stats.misses += 1
+            raise
+        self.stats.hits += 1
+        return value
+
+    def put(self, key, value):
+        """
+        Inserts or updates key.  Returns the (key, value) pair that had to leave
+        the cache, or None.  A policy may refuse to admit key, in which case
+        the pair returned is key's own.
+        """
+        evicted = self._put(key, value)
+        if evicted is not None:
+            if evicted[0] == key:
+                self.stats.rejections += 1
+            else:
+                self.stats.evictions += 1
+        return evicted
+
+    def _get(self, key):
+        raise NotImplementedError
+
+    def _put(self, key, value):
+        raise NotImplementedError
+
+    def discard(self, key):
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def __contains__(self, key):
+        raise NotImplementedError
+
+
+class LRUPolicy(CachePolicy):
+    """Evicts the least recently used key"""
+    name = "lru"
+
+    def __init__(self, capacity=1):
+        super().__init__(capacity)
+        self.lru = LRUCache(capacity)
+
+    def _get(self, key):
+        return self.lru.get(key)
+
+    def _put(self, key, value):
+        return self.lru.put(key, value)
+
+    def discard(self, key):
+        return self.lru.discard(key)
+
+    def __len__(self):
+        return len(self.lru)
+
+    def __contains__(self, key):
+        return key in self.lru
+
+
+class LFUPolicy(CachePolicy):
+    """
+    Evicts the least frequently used key, breaking ties by recency.
+    Keys are bucketed by use count, so every operation is O(1).
+    """
+    name = "lfu"
+
+    def __init__(self, capacity=1):
+        super().__init__(capacity)
+        self.values = {}
+        self.freqs = {}
+        # freq -> keys with that freq, least recently used first
+        self.buckets = {}
+        self.min_freq = 0
+
+    def _touch(self, key):
+        freq = self.freqs[key]
+        bucket = self.buckets[freq]
+        del bucket[key]
+        if not bucket:
+            del self.buckets[freq]
+            if self.min_freq == freq:
+                self.min_freq = freq + 1
+        self.freqs[key] = freq + 1
+        self.buckets.setdefault(freq + 1, OrderedDict())[key] = None
+
+    def _get(self, key):
+        value = self.values[key]
+        self._touch(key)
+        return value
+
+    def _put(self, key, value):
+        if key in self.values:
+            self.values[key] = value
+            self._touch(key)
+            return None
+        evicted = None
+        if len(self.values) >= self.capacity:
+            bucket = self.buckets[self.min_freq]
+            old_key, _ = bucket.popitem(last=False)
+            if not bucket:
+                del self.buckets[self.min_freq]
+            del self.freqs[old_key]
+            evicted = old_key, self.values.pop(old_key)
+        self.values[key] = value
+        self.freqs[key] = 1
+        self.buckets.setdefault(1, OrderedDict())[key] = None
+        self.min_freq = 1
+        return evicted
+
+    def discard(self, key):
+        if key not in self.values:
+            return False
+        freq = self.freqs.pop(key)
+        bucket = self.buckets[freq]
+        del bucket[key]
+        if not bucket:
+            del self.buckets[freq]
+            if self.min_freq == freq:
+                self.min_freq = min(self.buckets, default=0)
+        del self.values[key]
+        return True
+
+    def __len__(self):
+        return len(self.values)
+
+    def __contains__(self, key):
+        return key in self.values
+
+
+class ARCPolicy(CachePolicy):
+    """
+    Adaptive Replacement Cache (Megiddo & Modha).
+    t1 holds keys seen once recently, t2 keys seen at least twice; b1 and b2 are
+    "ghost" lists of keys recently evicted from each.  A ghost hit tells us which
+    side deserved more room, and the target size p of t1 adapts accordingly,
+    so a long scan can't flush the frequently used keys out of t2.
+    All four lists are kept least recently used first.
+    """
+    name = "arc"
+
+    def __init__(self, capacity=1):
+        super().__init__(capacity)
+        self.p = 0
+        self.t1 = OrderedDict()
+        self.t2 = OrderedDict()
+        self.b1 = OrderedDict()
+        self.b2 = OrderedDict()
+
+    def _replace(self, key):
+        if self.t1 and (len(self.t1) > self.p or (key in self.b2 and len(self.t1) == self.p) or not self.t2):
+            old_key, old_value = self.t1.popitem(last=False)
+            self.b1[old_key] = None
+        else:
+            old_key, old_value = self.t2.popitem(last=False)
+            self.b2[old_key] = None
+        return old_key, old_value
+
+    def _is_full(self):
+        return len(self.t1) + len(self.t2) >= self.capacity
+
+    def _get(self, key):
+        if key in self.t1:
+            value = self.t1.pop(key)
+            self.t2[key] = value
+            return value
+        value = self.t2[key]
+        self.t2.move_to_end(key)
+        return value
+
+    def _put(self, key, value):
+        if key in self.t1:
+            del self.t1[key]
+            self.t2[key] = value
+            return None
+        if key in self.t2:
+            self.t2[key] = value
+            self.t2.move_to_end(key)
+            return None
+
+        capacity = self.capacity
+        evicted = None
+        if key in self.b1:
+            self.p = min(capacity, self.p + max(len(self.b2) // len(self.b1), 1))
+            if self._is_full():
+                evicted = self._replace(key)
+            del self.b1[key]
+            self.t2[key] = value
+            return evicted
+        if key in self.b2:
+            self.p = max(0, self.p - max(len(self.b1) // len(self.b2), 1))
+            if self._is_full():
+                evicted = self._replace(key)
+            del self.b2[key]
+            self.t2[key] = value
+            return evicted
+
+        l1 = len(self.t1) + len(self.b1)
+        total = l1 + len(self.t2) + len(self.b2)
+        if l1 >= capacity:
+            if len(self.t1) < capacity:
+                self.b1.popitem(last=False)
+                if self._is_full():
+                    evicted = self._replace(key)
+            else:
+                evicted = self.t1.popitem(last=False)
+        elif total >= capacity:
+            if total >= 2 * capacity:
+                self.b2.popitem(last=False)
+            if self._is_full():
+                evicted = self._replace(key)
+        self.t1[key] = value
+        return evicted
+
+    def discard(self, key):
+        self.b1.pop(key, None)
+        self.b2.pop(key, None)
+        for lst in (self.t1, self.t2):
+            if key in lst:
+                del lst[key]
+                return True
+        return False
+
+    def __len__(self):
+        return len(self.t1) + len(self.t2)
+
+    def __contains__(self, key):
+        return key in self.t1 or key in self.t2
+
+
+class CountMinSketch:
+    """
+    Approximate frequency counter for TinyLFU.
+    Counters are halved every sample_size increments, so old popularity fades.
+    """
+
+    def __init__(self, width, depth=4, sample_size=None):
+        self.width = max(width, 16)
+        self.depth = depth
+        self.rows = [[0] * self.width for _ in range(depth)]
+        self.sample_size = sample_size or 10 * self.width
+        self.additions = 0
+
+    def _indexes(self, key):
+        h = hash(key)
+        for i in range(self.depth):
+            # Cheap double hashing to derive one index per row
+            yield (h + i * ((h >> 16) | 1)) % self.width
+
+    def increment(self, key):
+        for row, i in zip(self.rows, self._indexes(key)):
+            row[i] += 1
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self.age()
+
+    def estimate(self, key):
+        return min(row[i] for row, i in zip(self.rows, self._indexes(key)))
+
+    def age(self):
+        for row in self.rows:
+            for i in range(self.width):
+                row[i] >>= 1
+        self.additions //= 2
+
+
+class TinyLFUPolicy(CachePolicy):
+    """
+    W-TinyLFU: new keys land in a small LRU window.  A key falling out of the
+    window only gets into the main LRU if the frequency sketch says it is used
+    more often than the main cache's eviction victim, so one-off lookups from
+    a batch scan never push out the hot words.
+    """
+    name = "tinylfu"
+
+    def __init__(self, capacity=1, window_ratio=0.01):
+        super().__init__(capacity)
+        self.window_ratio = window_ratio
+        window_capacity = max(1, int(capacity * window_ratio))
+        self.window = LRUCache(window_capacity)
+        main_capacity = capacity - window_capacity
+        self.main = LRUCache(main_capacity) if main_capacity > 0 else None
+        self.sketch = CountMinSketch(width=4 * capacity)
+
+    def with_capacity(self, capacity):
+        return type(self)(capacity, self.window_ratio)
+
+    def _get(self, key):
+        self.sketch.increment(key)
+        if key in self.window:
+            return self.window.get(key)
+        if self.main is None:
+            raise KeyError(key)
+        return self.main.get(key)
+
+    def _put(self, key, value):
+        if key in self.window:
+            self.window.put(key, value)
+            return None
+        if self.main is not None and key in self.main:
+            self.main.put(key, value)
+            return None
+
+        candidate = self.window.put(key, value)
+        if candidate is None or self.main is None:
+            return candidate
+        if len(self.main) < self.main.capacity:
+            self.main.put(*candidate)
+            return None
+        victim_key = self.main.head.prev.key
+        if self.sketch.estimate(candidate[0]) > self.sketch.estimate(victim_key):
+            evicted = self.main.pop_lru()
+            self.main.put(*candidate)
+            return evicted
+        # The window's victim loses to main's and leaves; put() counts it as the one eviction it is
+        return candidate
+
+    def discard(self, key):
+        if self.window.discard(key):
+            return True
+        return self.main is not None and self.main.discard(key)
+
+    def __len__(self):
+        return len(self.window) + (len(self.main) if self.main is not None else 0)
+
+    def __contains__(self, key):
+        return key in self.window or (self.main is not None and key in self.main)
+
+
+POLICIES = {policy.name: policy for policy in (LRUPolicy, LFUPolicy, ARCPolicy, TinyLFUPolicy)}
+
+
+def make_policy(name, capacity):
+    """Builds a policy by name, e.g. make_policy("arc", 1000)"""
+    try:
+        return POLICIES[name.lower()](capacity)
+    except KeyError:
+        raise ValueError(f"Unknown cache policy {name}, pick one of {', '.join(POLICIES)}") from None
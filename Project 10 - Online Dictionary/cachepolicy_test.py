@@ -0,0 +1,82 @@
+"""
+Pluggable eviction policies
+Jimmy Tran
+Testing
+"""
+
+import random
+import unittest
+from cachepolicy import *
+
+
+class CachePolicyTest(unittest.TestCase):
+    def testContractAllPolicies(self):
+        for name in POLICIES:
+            policy = make_policy(name, 50)
+            for i in range(500):
+                key = i % 80
+                try:
+                    self.assertEqual(policy.get(key), key * 2)
+                except KeyError:
+                    policy.put(key, key * 2)
+                self.assertLessEqual(len(policy), 50, name)
+            self.assertEqual(policy.stats.lookups, 500, name)
+            self.assertEqual(policy.stats.hits + policy.stats.misses, 500, name)
+            # Every key still in the cache must be reachable
+            for key in range(80):
+                if key in policy:
+                    self.assertEqual(policy.get(key), key * 2)
+            self.assertRaises(ValueError, lambda: make_policy(name, 0))
+        self.assertRaises(ValueError, lambda: make_policy("random", 10))
+
+    def testDiscard(self):
+        for name in POLICIES:
+            policy = make_policy(name, 4)
+            policy.put("a", 1)
+            self.assertTrue(policy.discard("a"), name)
+            self.assertFalse(policy.discard("a"), name)
+            self.assertNotIn("a", policy)
+            self.assertRaises(KeyError, lambda: policy.get("a"))
+
+    def testLFUKeepsFrequent(self):
+        policy = LFUPolicy(2)
+        policy.put("hot", 1)
+        policy.get("hot")
+        policy.get("hot")
+        policy.put("cold", 2)
+        self.assertEqual(policy.put("new", 3), ("cold", 2))
+        self.assertIn("hot", policy)
+        self.assertEqual(policy.stats.evictions, 1)
+
+    def testTinyLFUCountsEachDepartureOnce(self):
+        policy = TinyLFUPolicy(3, window_ratio=0.34)
+        for key in ("hot", "warm"):
+            policy.put(key, key)
+            policy.get(key)
+            policy.get(key)
+        policy.put("cold", "cold")
+        # cold falls out of the window but loses to main's victim, so it's the one to leave
+        self.assertEqual(policy.put("new", "new"), ("cold", "cold"))
+        self.assertEqual((policy.stats.evictions, policy.stats.rejections), (1, 0))
+        self.assertEqual(len(policy), 3)
+
+    def testScanResistance(self):
+        # A hot set re-read between long one-off scans: LRU loses the hot set
+        # to every scan, ARC and TinyLFU keep it.
+        random.seed(3)
+        hot = [f"hot{i}" for i in range(20)]
+        trace = []
+        for round_ in range(30):
+            trace += [random.choice(hot) for _ in range(200)]
+            trace += [f"scan{round_}-{i}" for i in range(100)]
+        ratios = {}
+        for name in POLICIES:
+            policy = make_policy(name, 50)
+            for key in trace:
+                try:
+                    policy.get(key)
+                except KeyError:
+                    policy.put(key, key)
+            ratios[name] = policy.stats.hit_ratio
+        self.assertGreater(ratios["arc"], ratios["lru"])
+        self.assertGreater(ratios["tinylfu"], ratios["lru"])
@@ -0,0 +1,195 @@
+"""
+Compact binary dictionary format, read through mmap
+Jimmy Tran
+
+Layout (all integers little-endian):
+    header   MAGIC, entry count (u64)
+    index    count x u64 offset of each record, sorted by the record's word (UTF-8 bytes)
+    records  u16 word length, u16 part of speech length, u32 definition length,
+             u32 example length (NO_EXAMPLE if there's none), then the four UTF-8 strings
+
+The index is fixed width, so a lookup is a binary search straight over the
+mapped file: nothing is parsed at startup, and every process that opens the
+same file shares the same page cache memory.
+"""
+
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from collections.abc import Mapping
+
+from jsonstream import iter_entries
+
+MAGIC = b"DICTBIN1"
+HEADER = struct.Struct("<8sQ")
+OFFSET = struct.Struct("<Q")
+RECORD = struct.Struct("<HHII")
+NO_EXAMPLE = 0xFFFFFFFF
+FIELDS = ("word", "part_of_speech", "definition")
+# Largest length each RECORD field can hold; an example can't be NO_EXAMPLE bytes long
+LIMITS = (0xFFFF, 0xFFFF, 0xFFFFFFFF, NO_EXAMPLE - 1)
+
+
+def compile_dictionary(json_name, binary_name):
+    """Compiles dictionary.json into the binary format, returns the number of entries written"""
+    entries = {}
+    with open(json_name, "rb") as file:
+        for offset, length, o in iter_entries(file):
+            # Entries without the required fields are skipped, like LocalDictionary does
+            if isinstance(o, dict) and all(field in o for field in FIELDS):
+                entries[o["word"].encode("utf-8")] = o
+
+    records = []
+    for word in sorted(entries):
+        o = entries[word]
+        part_of_speech = o["part_of_speech"].encode("utf-8")
+        definition = o["definition"].encode("utf-8")
+        if o.get("example") is None:
+            example, example_length = b"", NO_EXAMPLE
+        else:
+            example = o["example"].encode("utf-8")
+            example_length = len(example)
+        lengths = (len(word), len(part_of_speech), len(definition), example_length)
+        for field, length, limit in zip(FIELDS + ("example",), lengths, LIMITS):
+            if length > limit and length != NO_EXAMPLE:
+                raise ValueError(f"The {field} of {o['word']!r} is {length} bytes long, at most {limit} fit")
+        records.append(RECORD.pack(*lengths) + word + part_of_speech + definition + example)
+
+    # A temporary file of its own, so processes compiling at the same time don't write over each other
+    fd, temp_name = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(binary_name) or ".")
+    try:
+        with open(fd, "wb") as file:
+            file.write(HEADER.pack(MAGIC, len(records)))
+            offset = HEADER.size + OFFSET.size * len(records)
+            for record in records:
+                file.write(OFFSET.pack(offset))
+                offset += len(record)
+            for record in records:
+                file.write(record)
+        # Readers either see the old file or the complete new one
+        os.replace(temp_name, binary_name)
+    except BaseException:
+        os.unlink(temp_name)
+        raise
+    return len(records)
+
+
+class CompiledDictionary(Mapping):
+    """
+    Read-only word -> entry mapping over a compiled dictionary file.
+    decode turns (word, part_of_speech, definition, example) into the value to
+    return; by default the tuple itself is returned.
+    """
+
+    def __init__(self, filename, decode=tuple):
+        self.filename = filename
+        self.decode = decode
+        with open(filename, "rb") as file:
+            self.mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            self.mm.close()
+            raise ValueError(f"{filename} is not a compiled dictionary")
+        # Slicing the view, unlike the mmap, doesn't copy the bytes out
+        self.view = memoryview(self.mm)
+
+    def record_offset(self, i):
+        return OFFSET.unpack_from(self.mm, HEADER.size + OFFSET.size * i)[0]
+
+    def word_view(self, i):
+        offset = self.record_offset(i)
+        word_length = RECORD.unpack_from(self.mm, offset)[0]
+        start = offset + RECORD.size
+        return self.view[start:start + word_length]
+
+    def word_at(self, i):
+        """The i-th word's bytes; bytes rather than a view, since the index is searched by comparing them"""
+        return bytes(self.word_view(i))
+
+    def record_at(self, i):
+        """View of the i-th record's bytes, as stored (records are written in index order)"""
+        start = self.record_offset(i)
+        end = self.record_offset(i + 1) if i + 1 < self.count else len(self.mm)
+        return self.view[start:end]
+
+    def changed_words(self, other):
+        """
+        Words added, removed or whose entry is different in the compiled
+        dictionary other, found by walking both indexes in order and comparing
+        the records' bytes, without decoding any of them.
+        """
+        changed = set()
+        i = j = 0
+        while i < self.count or j < other.count:
+            word = self.word_at(i) if i < self.count else None
+            other_word = other.word_at(j) if j < other.count else None
+            if other_word is None or (word is not None and word < other_word):
+                changed.add(word.decode("utf-8"))
+                i += 1
+            elif word is None or other_word < word:
+                changed.add(other_word.decode("utf-8"))
+                j += 1
+            else:
+                if self.record_at(i) != other.record_at(j):
+                    changed.add(word.decode("utf-8"))
+                i += 1
+                j += 1
+        return changed
+
+    def find(self, word):
+        """Index of word in the sorted index, raises KeyError if absent"""
+        if not isinstance(word, str):
+            raise KeyError(word)
+        target = word.encode("utf-8")
+        low, high = 0, self.count
+        while low < high:
+            mid = (low + high) // 2
+            if self.word_at(mid) < target:
+                low = mid + 1
+            else:
+                high = mid
+        if low < self.count and self.word_at(low) == target:
+            return low
+        raise KeyError(word)
+
+    def fields_at(self, i):
+        offset = self.record_offset(i)
+        lengths = RECORD.unpack_from(self.mm, offset)
+        start = offset + RECORD.size
+        fields = []
+        for length in lengths:
+            if length == NO_EXAMPLE:
+                fields.append(None)
+                continue
+            fields.append(str(self.view[start:start + length], "utf-8"))
+            start += length
+        return tuple(fields)
+
+    def __getitem__(self, word):
+        return self.decode(self.fields_at(self.find(word)))
+
+    def __contains__(self, word):
+        try:
+            self.find(word)
+            return True
+        except KeyError:
+            return False
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield str(self.word_view(i), "utf-8")
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        self.view.release()
+        self.mm.close()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        sys.exit("usage: python compileddict.py dictionary.json dictionary.bin")
+    print(f"Compiled {compile_dictionary(sys.argv[1], sys.argv[2])} entries into {sys.argv[2]}")
@@ -0,0 +1,66 @@
+"""
+Compact binary dictionary format
+Jimmy Tran
+Testing
+"""
+
+import json
+import os
+import tempfile
+import unittest
+from compileddict import *
+
+
+class CompiledDictionaryTest(unittest.TestCase):
+    ENTRIES = [{"word": "python", "part_of_speech": "noun", "definition": "a large snake"},
+               {"word": "ace", "part_of_speech": "noun", "definition": "a card", "example": "the ace of diamonds"},
+               {"word": "café", "part_of_speech": "noun", "definition": "日本 restaurant", "example": ""},
+               {"word": "broken", "definition": "no part of speech"}]
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.json_name = os.path.join(self.directory.name, "dictionary.json")
+        self.binary_name = os.path.join(self.directory.name, "dictionary.bin")
+        with open(self.json_name, "w", encoding="utf-8") as file:
+            json.dump({"entries": self.ENTRIES}, file, ensure_ascii=False)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def testRoundTrip(self):
+        self.assertEqual(compile_dictionary(self.json_name, self.binary_name), 3)
+        compiled = CompiledDictionary(self.binary_name)
+        self.assertEqual(len(compiled), 3)
+        self.assertEqual(list(compiled), ["ace", "café", "python"])
+        self.assertEqual(compiled["ace"], ("ace", "noun", "a card", "the ace of diamonds"))
+        self.assertEqual(compiled["python"], ("python", "noun", "a large snake", None))
+        self.assertEqual(compiled["café"][3], "")
+        for missing in ("broken", "aaa", "zzz", "", "acee", 42):
+            self.assertNotIn(missing, compiled)
+            self.assertRaises(KeyError, lambda: compiled[missing])
+        compiled.close()
+        self.assertEqual(sorted(os.listdir(self.directory.name)), ["dictionary.bin", "dictionary.json"])
+
+    def testChangedWords(self):
+        compile_dictionary(self.json_name, self.binary_name)
+        entries = [dict(self.ENTRIES[0], definition="a snake"), self.ENTRIES[1],
+                   {"word": "zebra", "part_of_speech": "noun", "definition": "a striped horse"}]
+        with open(self.json_name, "w", encoding="utf-8") as file:
+            json.dump({"entries": entries}, file, ensure_ascii=False)
+        other_name = os.path.join(self.directory.name, "other.bin")
+        compile_dictionary(self.json_name, other_name)
+        compiled, other = CompiledDictionary(self.binary_name), CompiledDictionary(other_name)
+        self.assertEqual(compiled.changed_words(other), {"python", "café", "zebra"})
+        self.assertEqual(other.changed_words(compiled), {"python", "café", "zebra"})
+        self.assertEqual(compiled.changed_words(compiled), set())
+        compiled.close()
+        other.close()
+
+    def testLongWord(self):
+        with open(self.json_name, "w", encoding="utf-8") as file:
+            json.dump({"entries": [{"word": "a" * 0x10000, "part_of_speech": "noun", "definition": "long"}]}, file)
+        self.assertRaises(ValueError, lambda: compile_dictionary(self.json_name, self.binary_name))
+        self.assertEqual(os.listdir(self.directory.name), ["dictionary.json"])
+
+    def testRejectsOtherFiles(self):
+        self.assertRaises(ValueError, lambda: CompiledDictionary(self.json_name))
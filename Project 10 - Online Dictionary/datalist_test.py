@@ -0,0 +1,185 @@
+"""
+Linked data lists
+Jimmy Tran
+Testing
+"""
+
+import random
+import unittest
+from datalist import *
+
+
+def contents(lst):
+    """Everything in lst, in order, through reset_current() / iterate()"""
+    lst.reset_current()
+    items = []
+    while True:
+        item = lst.iterate()
+        if item is None:
+            return items
+        items.append(item.data if isinstance(item, Node) else item)
+
+
+class DataListIteratorTest(unittest.TestCase):
+    def testNestedIteration(self):
+        for lst in (DataList(), ArrayDataList()):
+            for i in (3, 2, 1):
+                lst.add_to_head(i)
+            # The cursor iterate() uses isn't disturbed by for loops either
+            lst.reset_current()
+            lst.iterate()
+            pairs = [(a, b) for a in lst for b in lst]
+            if isinstance(lst, DataList):
+                pairs = [(a.data, b.data) for a, b in pairs]
+                self.assertEqual(lst.iterate().data, 2)
+            else:
+                self.assertEqual(lst.iterate(), 2)
+            self.assertEqual(pairs, [(a, b) for a in (1, 2, 3) for b in (1, 2, 3)])
+            self.assertEqual(list(type(lst)()), [])
+
+    def testChangeDetected(self):
+        for lst in (DataList(), ArrayDataList()):
+            for i in range(5):
+                lst.insert_sorted(i)
+            for change in (lambda: lst.add_to_head(9), lambda: lst.remove_from_head(), lambda: lst.remove(3),
+                           lambda: lst.insert_sorted(2)):
+                iterator = iter(lst)
+                next(iterator)
+                change()
+                self.assertRaises(RuntimeError, lambda: next(iterator))
+            # Failed removals don't change anything
+            iterator = iter(lst)
+            next(iterator)
+            lst.remove(42)
+            next(iterator)
+
+    def testChangeThenStop(self):
+        lst = DataList()
+        for i in range(5):
+            lst.add_to_head(i)
+        for node in lst:
+            if node.data == 2:
+                lst.remove(node.data)
+                break
+        self.assertEqual(contents(lst), [4, 3, 1, 0])
+
+
+class SortedDataListTest(unittest.TestCase):
+    def testMatchesDataList(self):
+        rng = random.Random(1)
+        linked, skipped = DataList(), SortedDataList()
+        for _ in range(3000):
+            operation = rng.random()
+            value = rng.randrange(100)
+            if operation < 0.5:
+                linked.insert_sorted(value)
+                skipped.insert_sorted(value)
+            elif operation < 0.9:
+                self.assertEqual(linked.remove(value), skipped.remove(value))
+            elif not linked.is_empty():
+                self.assertEqual(linked.remove_from_head(), skipped.remove_from_head())
+            self.assertEqual(value in skipped, value in contents(linked))
+        items = contents(linked)
+        self.assertEqual(contents(skipped), items)
+        self.assertEqual([node.data for node in skipped], items)
+        self.assertEqual(len(skipped), len(items))
+        self.assertEqual(str(skipped), str(linked))
+        # Every level is a sorted sublist of the one below it
+        for k in range(1, skipped.level):
+            level, node = [], skipped.head.skips[k - 1]
+            while node is not None:
+                level.append(node.data)
+                node = node.skips[k - 1]
+            self.assertEqual(level, sorted(level))
+            self.assertTrue(set(level) <= set(items))
+
+    def testIrange(self):
+        lst = SortedDataList()
+        for word in ["pear", "apple", "fig", "kiwi", "banana", "fig"]:
+            lst.insert_sorted(word)
+        self.assertEqual(list(lst.irange("b", "k")), ["banana", "fig", "fig"])
+        self.assertEqual(list(lst.irange("fig")), ["fig", "fig", "kiwi", "pear"])
+        self.assertEqual(list(lst.irange(stop="c")), ["apple", "banana"])
+        self.assertEqual(list(lst.irange("q")), [])
+        iterator = lst.irange()
+        next(iterator)
+        lst.insert_sorted("cherry")
+        self.assertRaises(RuntimeError, lambda: next(iterator))
+
+    def testEmptyAndUnsupported(self):
+        lst = SortedDataList()
+        self.assertIsNone(lst.remove_from_head())
+        self.assertFalse(lst.remove(1))
+        self.assertNotIn(1, lst)
+        self.assertRaises(TypeError, lambda: lst.add_to_head(1))
+        lst.insert_sorted(1)
+        self.assertRaises(TypeError, lambda: lst.remove_after(lst.head))
+        self.assertEqual(lst.remove_from_head(), 1)
+        self.assertTrue(lst.is_empty())
+        self.assertEqual(lst.level, 1)
+
+
+class ArrayDataListTest(unittest.TestCase):
+    def testHead(self):
+        lst = ArrayDataList(capacity=2)
+        self.assertTrue(lst.is_empty())
+        self.assertIsNone(lst.remove_from_head())
+        for i in range(5):
+            lst.add_to_head(i)
+        self.assertEqual(len(lst), 5)
+        self.assertEqual(contents(lst), [4, 3, 2, 1, 0])
+        self.assertEqual(lst.remove_from_head(), 4)
+        self.assertEqual(str(lst), "\n[START LIST]: 3 -> 2 -> 1 -> 0  [END LIST]\n")
+        self.assertIsNone(lst.iterate())
+        self.assertEqual(str(ArrayDataList()), "\n[ empty list ]\n")
+        self.assertRaises(ValueError, lambda: ArrayDataList(capacity=0))
+
+    def testMatchesDataList(self):
+        rng = random.Random(0)
+        linked, arrayed = DataList(), ArrayDataList(capacity=4)
+        most = 0
+        for _ in range(2000):
+            operation = rng.random()
+            value = rng.randrange(50)
+            if operation < 0.4:
+                linked.insert_sorted(value)
+                arrayed.insert_sorted(value)
+            elif operation < 0.6:
+                linked.add_to_head(value)
+                arrayed.add_to_head(value)
+            elif operation < 0.9:
+                self.assertEqual(linked.remove(value), arrayed.remove(value))
+            elif not linked.is_empty():
+                self.assertEqual(linked.remove_from_head(), arrayed.remove_from_head())
+            self.assertEqual(contents(arrayed), contents(linked))
+            most = max(most, len(arrayed))
+        # Slots are reused, so the arrays only grew with the most nodes there ever were at once
+        self.assertLessEqual(len(arrayed.data) - 1, 2 * most + 1)
+
+    def testRemoveAfterTail(self):
+        lst = ArrayDataList()
+        self.assertIsNone(lst.remove_after(0))
+        for i in range(3):
+            lst.add_to_head(i)
+        tail = 0
+        while lst.next[tail] != NIL:
+            tail = lst.next[tail]
+        state = (lst.free, lst.version)
+        self.assertIsNone(lst.remove_after(tail))
+        self.assertEqual((lst.free, lst.version), state)
+        self.assertEqual(len(lst), 3)
+        self.assertEqual(contents(lst), [2, 1, 0])
+
+    def testFreeListReuse(self):
+        lst = ArrayDataList(capacity=3)
+        for i in range(3):
+            lst.add_to_head(i)
+        for _ in range(1000):
+            lst.remove_from_head()
+            lst.add_to_head("x")
+        self.assertEqual(len(lst.data), 4)
+        self.assertEqual(len(lst), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
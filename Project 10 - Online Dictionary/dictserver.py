@@ -0,0 +1,214 @@
+"""
+Unix socket server sharing one loaded dictionary between processes
+Jimmy Tran
+
+Protocol (all integers little-endian), any number of requests per connection:
+    request   u16 word length, then the UTF-8 word
+    response  u8 status: FOUND, then a compileddict record (u16 word length,
+              u16 part of speech length, u32 definition length, u32 example
+              length or NO_EXAMPLE, then the four UTF-8 strings);
+              or NOT_FOUND / ERROR on its own
+Responses come back in request order, so clients can pipeline requests.
+"""
+
+import os
+import signal
+import socket
+import socketserver
+import struct
+import threading
+
+from compileddict import NO_EXAMPLE, RECORD
+
+REQUEST = struct.Struct("<H")
+MAX_WORD_LENGTH = 0xFFFF
+FOUND = b"\x00"
+NOT_FOUND = b"\x01"
+ERROR = b"\x02"
+# Requests sent by search_many before reading their responses, so neither side's socket buffer fills up
+PIPELINE_DEPTH = 256
+
+
+def encode_request(word):
+    word = word.encode("utf-8")
+    if len(word) > MAX_WORD_LENGTH:
+        # No such word could be in the dictionary, and the request couldn't say how long it is
+        raise KeyError(f"Words are at most {MAX_WORD_LENGTH} bytes, not {len(word)}")
+    return REQUEST.pack(len(word)) + word
+
+
+def read_exactly(file, size):
+    data = file.read(size)
+    if len(data) != size:
+        raise EOFError("Connection closed")
+    return data
+
+
+def read_request(file):
+    """The next word sent on file, or None once the client has hung up"""
+    header = file.read(REQUEST.size)
+    if not header:
+        return None
+    if len(header) != REQUEST.size:
+        raise EOFError("Connection closed")
+    return read_exactly(file, REQUEST.unpack(header)[0]).decode("utf-8")
+
+
+def encode_found(fields):
+    word, part_of_speech, definition, example = (None if field is None else field.encode("utf-8")
+                                                 for field in fields)
+    example_length = NO_EXAMPLE if example is None else len(example)
+    return FOUND + RECORD.pack(len(word), len(part_of_speech), len(definition), example_length) \
+        + word + part_of_speech + definition + (example or b"")
+
+
+def read_response(file):
+    """(word, part_of_speech, definition, example), or None if the server doesn't have the word"""
+    status = read_exactly(file, 1)
+    if status == NOT_FOUND:
+        return None
+    if status != FOUND:
+        raise KeyError("Error: the dictionary server couldn't look the word up")
+    fields = []
+    for length in RECORD.unpack(read_exactly(file, RECORD.size)):
+        if length == NO_EXAMPLE:
+            fields.append(None)
+        else:
+            fields.append(read_exactly(file, length).decode("utf-8"))
+    return tuple(fields)
+
+
+class DictionaryRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        search = self.server.search
+        while True:
+            try:
+                word = read_request(self.rfile)
+            except (EOFError, UnicodeDecodeError):
+                return
+            if word is None:
+                return
+            try:
+                response = encode_found(search(word))
+            except KeyError:
+                response = NOT_FOUND
+            except Exception:
+                response = ERROR
+            self.wfile.write(response)
+
+
+class DictionaryServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Answers lookups on a Unix socket at path, one thread per connection.
+    search(word) returns (word, part_of_speech, definition, example) or raises
+    KeyError.  With workers > 1, serve_forever() forks workers - 1 more
+    processes after the dictionary is loaded, all accepting on the same socket:
+    the loaded dictionary is shared copy-on-write instead of loaded per process.
+    """
+    daemon_threads = True
+
+    def __init__(self, path, search, workers=1):
+        if workers < 1:
+            raise ValueError("There should be at least 1 worker")
+        if os.path.exists(path):
+            # Left over from a server that didn't shut down cleanly
+            os.unlink(path)
+        super().__init__(path, DictionaryRequestHandler)
+        self.path = path
+        self.search = search
+        self.workers = workers
+        self.children = []
+        self.parent = True
+
+    def serve_forever(self, poll_interval=0.5):
+        for _ in range(self.workers - 1):
+            pid = os.fork()
+            if pid == 0:
+                self.parent = False
+                self.children = []
+                try:
+                    super().serve_forever(poll_interval)
+                finally:
+                    os._exit(0)
+            self.children.append(pid)
+        super().serve_forever(poll_interval)
+
+    def server_close(self):
+        super().server_close()
+        if self.parent:
+            for pid in self.children:
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                    os.waitpid(pid, 0)
+                except ChildProcessError:
+                    pass
+            self.children = []
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+
+class DictionaryClient:
+    """
+    Looks words up on a DictionaryServer over one connection (shared by threads).
+    decode turns (word, part_of_speech, definition, example) into the value to
+    return; words the server doesn't have raise not_found.
+    """
+
+    def __init__(self, path, decode=tuple, not_found=KeyError):
+        self.path = path
+        self.decode = decode
+        self.not_found = not_found
+        self.lock = threading.Lock()
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(path)
+        self.file = self.sock.makefile("rb")
+
+    def search(self, word):
+        try:
+            with self.lock:
+                self.sock.sendall(encode_request(word))
+                fields = read_response(self.file)
+        except (OSError, EOFError) as e:
+            raise KeyError(f"Error: {e}")
+        if fields is None:
+            raise self.not_found(word)
+        return self.decode(fields)
+
+    def search_many(self, words):
+        """
+        ({word: value} for the words in words the server has, [words the server
+        failed to look up]), pipelining the requests.  Any other word is one the
+        server said it doesn't have.
+        """
+        words = list(words)
+        found = {}
+        failed = []
+        try:
+            with self.lock:
+                for i in range(0, len(words), PIPELINE_DEPTH):
+                    batch = []
+                    requests = []
+                    for word in words[i:i + PIPELINE_DEPTH]:
+                        try:
+                            requests.append(encode_request(word))
+                        except KeyError:
+                            failed.append(word)
+                            continue
+                        batch.append(word)
+                    self.sock.sendall(b"".join(requests))
+                    for word in batch:
+                        try:
+                            fields = read_response(self.file)
+                        except KeyError:
+                            # The server failed on this word only; the rest of the batch is fine
+                            failed.append(word)
+                            continue
+                        if fields is not None:
+                            found[word] = self.decode(fields)
+        except (OSError, EOFError) as e:
+            raise KeyError(f"Error: {e}")
+        return found, failed
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
@@ -0,0 +1,91 @@
+"""
+Unix socket dictionary server
+Jimmy Tran
+Testing
+"""
+
+import os
+import tempfile
+import threading
+import unittest
+from dictserver import *
+
+ENTRIES = {"ace": ("ace", "noun", "a playing card", "the ace of diamonds"),
+           "python": ("python", "noun", "a large snake", None),
+           "café": ("café", "noun", "a small restaurant", None)}
+
+
+def search(word):
+    if word == "broken":
+        raise RuntimeError("something went wrong")
+    return ENTRIES[word]
+
+
+class DictionaryServerTest(unittest.TestCase):
+    def start(self, workers=1):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "dictionary.sock")
+        self.server = DictionaryServer(self.path, search, workers)
+        self.thread = threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05})
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+        self.assertFalse(os.path.exists(self.path))
+        self.directory.cleanup()
+
+    def testSearch(self):
+        self.start()
+        client = DictionaryClient(self.path)
+        self.assertEqual(client.search("ace"), ENTRIES["ace"])
+        self.assertEqual(client.search("python"), ENTRIES["python"])
+        self.assertEqual(client.search("café"), ENTRIES["café"])
+        self.assertRaises(KeyError, lambda: client.search("potato"))
+        self.assertRaises(KeyError, lambda: client.search("a" * (MAX_WORD_LENGTH + 1)))
+        with self.assertRaises(KeyError) as context:
+            client.search("broken")
+        self.assertIn("Error", str(context.exception))
+        # The connection is still usable after a miss or an error
+        self.assertEqual(client.search("ace"), ENTRIES["ace"])
+        client.close()
+
+    def testSearchMany(self):
+        self.start()
+        client = DictionaryClient(self.path, decode=lambda fields: fields[2], not_found=LookupError)
+        words = ["ace", "potato", "broken"] * PIPELINE_DEPTH + ["python"]
+        found, failed = client.search_many(words + ["a" * (MAX_WORD_LENGTH + 1)])
+        self.assertEqual(found, {"ace": "a playing card", "python": "a large snake"})
+        self.assertEqual(failed, ["broken"] * PIPELINE_DEPTH + ["a" * (MAX_WORD_LENGTH + 1)])
+        self.assertRaises(LookupError, lambda: client.search("potato"))
+        client.close()
+
+    def testConcurrentClients(self):
+        self.start()
+        errors = []
+
+        def worker():
+            client = DictionaryClient(self.path)
+            try:
+                for _ in range(200):
+                    self.assertEqual(client.search("python"), ENTRIES["python"])
+            except Exception as e:
+                errors.append(e)
+            client.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    @unittest.skipUnless(hasattr(os, "fork"), "pre-forking needs os.fork")
+    def testPreFork(self):
+        self.start(workers=3)
+        clients = [DictionaryClient(self.path) for _ in range(6)]
+        for client in clients:
+            self.assertEqual(client.search("ace"), ENTRIES["ace"])
+            client.close()
+        self.assertEqual(len(self.server.children), 2)
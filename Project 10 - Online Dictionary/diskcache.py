@@ -0,0 +1,107 @@
+"""
+Persistent SQLite-backed cache tier with TTL expiry
+Jimmy Tran
+"""
+
+import sqlite3
+import threading
+import time
+
+
+class DiskCache:
+    """
+    DiskCache stores rows of fields keyed by word in a SQLite file, so results
+    survive process restarts.  Rows older than ttl seconds are treated as
+    missing (and deleted lazily); ttl=None keeps rows forever.
+    """
+    FIELDS = ("word", "part_of_speech", "definition", "example")
+    # Words per SELECT in get_many, under SQLite's default limit of 999 parameters
+    BATCH_SIZE = 500
+
+    def __init__(self, filename="dictionary_cache.db", ttl=7 * 24 * 60 * 60, clock=time.time):
+        if ttl is not None and ttl <= 0:
+            raise ValueError("ttl should be positive or None")
+        self.filename = filename
+        self.ttl = ttl
+        self.clock = clock
+        # One connection shared by all threads, serialized by our own lock
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(filename, check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS entries ("
+                                    "word TEXT PRIMARY KEY, "
+                                    "part_of_speech TEXT, "
+                                    "definition TEXT, "
+                                    "example TEXT, "
+                                    "fetched_at REAL NOT NULL)")
+
+    def _is_expired(self, fetched_at):
+        return self.ttl is not None and self.clock() - fetched_at > self.ttl
+
+    def get(self, word):
+        """
+        Returns (fields, fetched_at) for word, fields being a tuple in FIELDS order.
+        Raises KeyError if word is absent or expired.
+        """
+        with self.lock:
+            row = self.connection.execute("SELECT word, part_of_speech, definition, example, fetched_at "
+                                          "FROM entries WHERE word = ?", (word,)).fetchone()
+            if row is None:
+                raise KeyError(f"Cannot find {word}")
+            if self._is_expired(row[-1]):
+                with self.connection:
+                    self.connection.execute("DELETE FROM entries WHERE word = ?", (word,))
+                raise KeyError(f"{word} has expired")
+        return row[:-1], row[-1]
+
+    def get_many(self, words):
+        """
+        Returns {word: (fields, fetched_at)} for the words in words that are present
+        and not expired, in as few queries as SQLite's parameter limit allows.
+        """
+        words = list(dict.fromkeys(words))
+        found = {}
+        expired = []
+        with self.lock:
+            for i in range(0, len(words), self.BATCH_SIZE):
+                batch = words[i:i + self.BATCH_SIZE]
+                rows = self.connection.execute("SELECT word, part_of_speech, definition, example, fetched_at "
+                                               f"FROM entries WHERE word IN ({', '.join('?' * len(batch))})",
+                                               batch).fetchall()
+                for row in rows:
+                    if self._is_expired(row[-1]):
+                        expired.append((row[0],))
+                    else:
+                        found[row[0]] = (row[:-1], row[-1])
+            if expired:
+                with self.connection:
+                    self.connection.executemany("DELETE FROM entries WHERE word = ?", expired)
+        return found
+
+    def put(self, word, part_of_speech, definition, example=None, fetched_at=None):
+        if fetched_at is None:
+            fetched_at = self.clock()
+        with self.lock, self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                                    (word, part_of_speech, definition, example, fetched_at))
+
+    def discard(self, word):
+        with self.lock, self.connection:
+            return self.connection.execute("DELETE FROM entries WHERE word = ?", (word,)).rowcount > 0
+
+    def purge_expired(self):
+        """Deletes every expired row, returns how many were deleted"""
+        if self.ttl is None:
+            return 0
+        with self.lock, self.connection:
+            return self.connection.execute("DELETE FROM entries WHERE fetched_at < ?",
+                                           (self.clock() - self.ttl,)).rowcount
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
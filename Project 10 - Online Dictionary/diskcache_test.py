@@ -0,0 +1,64 @@
+"""
+Persistent SQLite-backed cache tier
+Jimmy Tran
+Testing
+"""
+
+import os
+import tempfile
+import unittest
+from diskcache import *
+
+
+class DiskCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, "cache.db")
+        self.now = 1000.0
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def testSurvivesReopen(self):
+        cache = DiskCache(self.filename, ttl=None)
+        cache.put("ace", "noun", "a playing card", "the ace of diamonds")
+        cache.put("python", "noun", "a large snake")
+        cache.close()
+
+        cache = DiskCache(self.filename, ttl=None)
+        self.assertEqual(cache.get("ace")[0], ("ace", "noun", "a playing card", "the ace of diamonds"))
+        self.assertEqual(cache.get("python")[0], ("python", "noun", "a large snake", None))
+        self.assertRaises(KeyError, lambda: cache.get("potato"))
+        self.assertEqual(len(cache), 2)
+        self.assertTrue(cache.discard("ace"))
+        self.assertFalse(cache.discard("ace"))
+        cache.close()
+
+    def testExpiry(self):
+        cache = DiskCache(self.filename, ttl=60, clock=lambda: self.now)
+        cache.put("ace", "noun", "a playing card")
+        cache.put("fly", "verb", "move through the air", fetched_at=self.now - 30)
+        self.now += 45
+        self.assertEqual(cache.get("ace")[1], 1000.0)
+        self.assertRaises(KeyError, lambda: cache.get("fly"))
+        self.now += 30
+        self.assertEqual(cache.purge_expired(), 1)
+        self.assertEqual(len(cache), 0)
+        cache.close()
+        self.assertRaises(ValueError, lambda: DiskCache(self.filename, ttl=0))
+
+    def testGetMany(self):
+        cache = DiskCache(self.filename, ttl=60, clock=lambda: self.now)
+        cache.put("ace", "noun", "a playing card")
+        cache.put("fly", "verb", "move through the air", fetched_at=self.now - 90)
+        for i in range(DiskCache.BATCH_SIZE + 10):
+            cache.put(f"word{i}", "noun", f"definition {i}")
+        words = ["ace", "fly", "potato", "ace"] + [f"word{i}" for i in range(DiskCache.BATCH_SIZE + 10)]
+        found = cache.get_many(words)
+        self.assertEqual(len(found), DiskCache.BATCH_SIZE + 11)
+        self.assertEqual(found["ace"], (("ace", "noun", "a playing card", None), 1000.0))
+        self.assertNotIn("fly", found)
+        self.assertNotIn("potato", found)
+        # The expired row was deleted on the way
+        self.assertEqual(len(cache), DiskCache.BATCH_SIZE + 11)
+        cache.close()
@@ -0,0 +1,62 @@
+"""
+Columnar in-memory storage for dictionary entries
+Jimmy Tran
+"""
+
+from array import array
+from collections.abc import Mapping
+
+
+class EntryStore(Mapping):
+    """
+    Word -> entry mapping that keeps no object per entry: the fields live in
+    parallel columns indexed by the entry's position, and each distinct part of
+    speech is stored once, entries only holding a small id for it.
+    decode turns (word, part_of_speech, definition, example) into the value to
+    return; by default the tuple itself is returned.
+    """
+
+    def __init__(self, decode=tuple):
+        self.decode = decode
+        # word -> position in the columns; the word itself is only stored here
+        self.positions = {}
+        self.part_of_speech_ids = array("H")
+        self.definitions = []
+        self.examples = []
+        self.parts_of_speech = []
+        self.part_of_speech_index = {}
+
+    def add(self, word, part_of_speech, definition, example=None):
+        """Adds an entry, replacing the one already stored for word (so later duplicates win)"""
+        part_of_speech_id = self.part_of_speech_index.get(part_of_speech)
+        if part_of_speech_id is None:
+            part_of_speech_id = len(self.parts_of_speech)
+            self.parts_of_speech.append(part_of_speech)
+            self.part_of_speech_index[part_of_speech] = part_of_speech_id
+        i = self.positions.get(word)
+        if i is None:
+            self.positions[word] = len(self.definitions)
+            self.part_of_speech_ids.append(part_of_speech_id)
+            self.definitions.append(definition)
+            self.examples.append(example)
+        else:
+            self.part_of_speech_ids[i] = part_of_speech_id
+            self.definitions[i] = definition
+            self.examples[i] = example
+
+    def fields(self, word):
+        """(word, part_of_speech, definition, example), raises KeyError if word is absent"""
+        i = self.positions[word]
+        return word, self.parts_of_speech[self.part_of_speech_ids[i]], self.definitions[i], self.examples[i]
+
+    def __getitem__(self, word):
+        return self.decode(self.fields(word))
+
+    def __contains__(self, word):
+        return word in self.positions
+
+    def __iter__(self):
+        return iter(self.positions)
+
+    def __len__(self):
+        return len(self.positions)
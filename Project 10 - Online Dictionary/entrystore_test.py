@@ -0,0 +1,32 @@
+"""
+Columnar in-memory storage for dictionary entries
+Jimmy Tran
+Testing
+"""
+
+import unittest
+from entrystore import *
+
+
+class EntryStoreTest(unittest.TestCase):
+    def testAddLookup(self):
+        store = EntryStore()
+        store.add("ace", "noun", "a playing card", "the ace of diamonds")
+        store.add("python", "noun", "a large snake")
+        store.add("fly", "verb", "move through the air")
+        self.assertEqual(len(store), 3)
+        self.assertEqual(store["ace"], ("ace", "noun", "a playing card", "the ace of diamonds"))
+        self.assertEqual(store["python"], ("python", "noun", "a large snake", None))
+        self.assertIn("fly", store)
+        self.assertNotIn("potato", store)
+        self.assertRaises(KeyError, lambda: store["potato"])
+        self.assertEqual(list(store), ["ace", "python", "fly"])
+        # Each part of speech is only stored once
+        self.assertEqual(store.parts_of_speech, ["noun", "verb"])
+
+    def testLaterDuplicatesWin(self):
+        store = EntryStore(decode=lambda fields: "/".join(field or "" for field in fields))
+        store.add("fly", "noun", "an insect")
+        store.add("fly", "verb", "move through the air", "birds fly")
+        self.assertEqual(len(store), 1)
+        self.assertEqual(store["fly"], "fly/verb/move through the air/birds fly")
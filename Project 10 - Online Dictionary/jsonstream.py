@@ -0,0 +1,172 @@
+"""
+Incremental reader for the "entries" array of dictionary.json
+Jimmy Tran
+
+This is the canonical copy; Project 8 has its own copy of this file, which
+should be updated to match whenever this one changes.
+"""
+
+import codecs
+import json
+import re
+import threading
+from array import array
+from collections.abc import Mapping
+
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+def iter_entries(file, chunk_size=1 << 16):
+    """
+    Yields (offset, length, obj) for every element of the top-level "entries"
+    array of the JSON document in file (opened in binary mode), where offset and
+    length locate the element's bytes in the file.  Only about one chunk is held
+    in memory at a time, however big the file is.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    pos = 0
+    # buffer[0] is at byte offset base in the file; cursor_char/cursor_byte
+    # track one more position, so byte offsets are computed incrementally.
+    base = 0
+    cursor_char = 0
+    cursor_byte = 0
+    eof = False
+
+    def fill():
+        nonlocal buffer, pos, base, cursor_char, cursor_byte, eof
+        # Drop what we've consumed before growing the buffer
+        if pos:
+            consumed = len(buffer[cursor_char:pos].encode("utf-8"))
+            base += cursor_byte + consumed
+            buffer = buffer[pos:]
+            pos = cursor_char = cursor_byte = 0
+        chunk = file.read(chunk_size)
+        if not chunk:
+            eof = True
+            buffer += utf8.decode(b"", final=True)
+        else:
+            buffer += utf8.decode(chunk)
+
+    def skip_whitespace():
+        nonlocal pos
+        while True:
+            pos = WHITESPACE.match(buffer, pos).end()
+            if pos < len(buffer) or eof:
+                return
+            fill()
+
+    def expect(char):
+        nonlocal pos
+        skip_whitespace()
+        if pos >= len(buffer) or buffer[pos] != char:
+            raise ValueError(f"Malformed dictionary: expected {char!r} at byte {byte_offset(pos)}")
+        pos += 1
+
+    def decode_value():
+        nonlocal pos
+        while True:
+            # Make sure a small value can't be cut off by the end of the buffer
+            if not eof and len(buffer) - pos < chunk_size:
+                fill()
+                continue
+            try:
+                obj, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as e:
+                if eof:
+                    raise ValueError(f"Malformed dictionary: {e.msg} at byte {byte_offset(e.pos)}") from None
+                fill()
+                continue
+            start, pos = pos, end
+            return start, end, obj
+
+    def byte_offset(char_pos):
+        nonlocal cursor_char, cursor_byte
+        cursor_byte += len(buffer[cursor_char:char_pos].encode("utf-8"))
+        cursor_char = char_pos
+        return base + cursor_byte
+
+    expect("{")
+    skip_whitespace()
+    if pos < len(buffer) and buffer[pos] == "}":
+        return
+    while True:
+        skip_whitespace()
+        _, _, key = decode_value()
+        expect(":")
+        skip_whitespace()
+        if key != "entries":
+            decode_value()
+        else:
+            expect("[")
+            skip_whitespace()
+            if buffer[pos:pos + 1] == "]":
+                return
+            while True:
+                skip_whitespace()
+                start, end, obj = decode_value()
+                offset = byte_offset(start)
+                yield offset, byte_offset(end) - offset, obj
+                skip_whitespace()
+                if buffer[pos:pos + 1] == "]":
+                    return
+                expect(",")
+        skip_whitespace()
+        if buffer[pos:pos + 1] == "}":
+            return
+        expect(",")
+
+
+class OffsetIndex(Mapping):
+    """
+    Read-only word -> entry mapping that keeps only each entry's byte offset and
+    length in memory, and decodes the entry from the file when it's looked up.
+    decode turns the entry's JSON object (a dict) into the value to return.
+    Entries missing any of the required fields are left out, like the eager
+    loaders do; the first field is the key.
+    """
+
+    def __init__(self, filename, decode, required=("word",), chunk_size=1 << 16):
+        self.filename = filename
+        self.decode = decode
+        self.positions = {}
+        self.offsets = array("q")
+        self.lengths = array("l")
+        with open(filename, "rb") as file:
+            for offset, length, obj in iter_entries(file, chunk_size):
+                if not isinstance(obj, dict) or not all(field in obj for field in required):
+                    continue
+                # Later duplicates win, as they do when building a dict eagerly
+                if obj[required[0]] in self.positions:
+                    i = self.positions[obj[required[0]]]
+                    self.offsets[i] = offset
+                    self.lengths[i] = length
+                else:
+                    self.positions[obj[required[0]]] = len(self.offsets)
+                    self.offsets.append(offset)
+                    self.lengths.append(length)
+        self.lock = threading.Lock()
+        self.file = open(filename, "rb")
+
+    def raw(self, word):
+        """The entry's JSON bytes, as they appear in the file"""
+        i = self.positions[word]
+        with self.lock:
+            self.file.seek(self.offsets[i])
+            return self.file.read(self.lengths[i])
+
+    def __getitem__(self, word):
+        return self.decode(json.loads(self.raw(word)))
+
+    def __contains__(self, word):
+        return word in self.positions
+
+    def __iter__(self):
+        return iter(self.positions)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,48 @@
+"""
+Incremental reader for dictionary.json
+Jimmy Tran
+Testing
+"""
+
+import io
+import json
+import os
+import tempfile
+import unittest
+from jsonstream import *
+
+
+class IterEntriesTest(unittest.TestCase):
+    DOCUMENT = {"purpose": "tricky \"entries\": [ {", "entries": [
+        {"word": "café", "part_of_speech": "noun", "definition": "日本 ]} a small restaurant"},
+        {"word": "ace", "part_of_speech": "noun", "definition": "a card", "example": "\\"},
+        {"word": "nested", "extra": [1, {"a": [2]}]}], "todo": "nothing"}
+
+    def testOffsetsAtEveryChunkSize(self):
+        raw = json.dumps(self.DOCUMENT, ensure_ascii=False, indent=2).encode()
+        for chunk_size in (1, 2, 5, 64, 1 << 16):
+            entries = list(iter_entries(io.BytesIO(raw), chunk_size))
+            self.assertEqual([obj for offset, length, obj in entries], self.DOCUMENT["entries"])
+            for offset, length, obj in entries:
+                self.assertEqual(json.loads(raw[offset:offset + length]), obj)
+
+    def testEdgeCases(self):
+        self.assertEqual(list(iter_entries(io.BytesIO(b'{}'))), [])
+        self.assertEqual(list(iter_entries(io.BytesIO(b'{"entries": []}'))), [])
+        self.assertRaises(ValueError, lambda: list(iter_entries(io.BytesIO(b'{"entries": [{"a": 1},'))))
+        self.assertRaises(ValueError, lambda: list(iter_entries(io.BytesIO(b'["entries"]'))))
+
+
+class OffsetIndexTest(unittest.TestCase):
+    def testLookups(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "dictionary.json")
+            with open(filename, "w", encoding="utf-8") as file:
+                json.dump(IterEntriesTest.DOCUMENT, file, ensure_ascii=False)
+            index = OffsetIndex(filename, lambda o: o["definition"], ("word", "definition"))
+            self.assertEqual(len(index), 2)
+            self.assertEqual(sorted(index), ["ace", "café"])
+            self.assertEqual(index["café"], "日本 ]} a small restaurant")
+            self.assertNotIn("nested", index)
+            self.assertRaises(KeyError, lambda: index["potato"])
+            index.close()
@@ -0,0 +1,111 @@
+"""
+O(1) LRU cache: a key -> node hash index plus a doubly linked recency list
+Jimmy Tran
+"""
+
+
+class LRUNode:
+    """
+    Node of the doubly linked recency list - not designed for general clients.
+    """
+    __slots__ = ("key", "value", "prev", "next")
+
+    def __init__(self, key=None, value=None):
+        self.key = key
+        self.value = value
+        self.prev = None
+        self.next = None
+
+
+class LRUCache:
+    """
+    LRUCache maps keys to values and keeps them in recency order.
+    The most recently used node sits right after the header, the least recently
+    used one right before it, so get, put and evict never walk the list.
+    """
+
+    def __init__(self, capacity=1):
+        if capacity < 1:
+            raise ValueError("Capacity should be at least 1")
+        self.capacity = capacity
+        self.index = {}
+        # A single circular header node means we never have to special-case
+        # an empty list, or the first/last node.
+        self.head = LRUNode()
+        self.head.prev = self.head
+        self.head.next = self.head
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def __iter__(self):
+        """Yields keys from most to least recently used"""
+        node = self.head.next
+        while node is not self.head:
+            yield node.key
+            node = node.next
+
+    def _unlink(self, node):
+        node.prev.next = node.next
+        node.next.prev = node.prev
+
+    def _link_front(self, node):
+        node.prev = self.head
+        node.next = self.head.next
+        self.head.next.prev = node
+        self.head.next = node
+
+    def get(self, key):
+        """Returns the value for key and marks it most recently used, raises KeyError if absent"""
+        node = self.index[key]
+        if self.head.next is not node:
+            self._unlink(node)
+            self._link_front(node)
+        return node.value
+
+    def peek(self, key):
+        """Returns the value for key without touching its recency, raises KeyError if absent"""
+        return self.index[key].value
+
+    def put(self, key, value):
+        """
+        Inserts or updates key as the most recently used entry.
+        Returns the (key, value) pair evicted to make room, or None.
+        """
+        node = self.index.get(key)
+        if node is not None:
+            node.value = value
+            self._unlink(node)
+            self._link_front(node)
+            return None
+        node = LRUNode(key, value)
+        self.index[key] = node
+        self._link_front(node)
+        if len(self.index) > self.capacity:
+            return self.pop_lru()
+        return None
+
+    def pop_lru(self):
+        """Removes and returns the least recently used (key, value), raises KeyError if empty"""
+        node = self.head.prev
+        if node is self.head:
+            raise KeyError("pop_lru(): cache is empty")
+        self._unlink(node)
+        del self.index[node.key]
+        return node.key, node.value
+
+    def discard(self, key):
+        """Removes key if present, returns True if it was"""
+        node = self.index.pop(key, None)
+        if node is None:
+            return False
+        self._unlink(node)
+        return True
+
+    def clear(self):
+        self.index.clear()
+        self.head.prev = self.head
+        self.head.next = self.head
@@ -0,0 +1,45 @@
+"""
+O(1) LRU cache
+Jimmy Tran
+Testing
+"""
+
+import unittest
+from lrucache import *
+
+
+class LRUCacheTest(unittest.TestCase):
+    def testCapacity(self):
+        self.assertRaises(ValueError, lambda: LRUCache(0))
+
+    def testGetPromotes(self):
+        cache = LRUCache(3)
+        for key in "abc":
+            self.assertIsNone(cache.put(key, key.upper()))
+        self.assertListEqual(list(cache), ["c", "b", "a"])
+        self.assertEqual(cache.get("a"), "A")
+        self.assertListEqual(list(cache), ["a", "c", "b"])
+        self.assertRaises(KeyError, lambda: cache.get("z"))
+
+    def testEviction(self):
+        cache = LRUCache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        self.assertEqual(cache.put("c", 3), ("b", 2))
+        self.assertNotIn("b", cache)
+        self.assertEqual(len(cache), 2)
+        # Updating an existing key never evicts
+        self.assertIsNone(cache.put("a", 10))
+        self.assertEqual(cache.peek("a"), 10)
+
+    def testDiscardAndClear(self):
+        cache = LRUCache(2)
+        cache.put("a", 1)
+        self.assertTrue(cache.discard("a"))
+        self.assertFalse(cache.discard("a"))
+        self.assertRaises(KeyError, cache.pop_lru)
+        cache.put("b", 2)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertListEqual(list(cache), [])
@@ -0,0 +1,131 @@
+"""
+Latency histograms, counters and exporters for dictionary lookups
+Jimmy Tran
+"""
+
+import json
+import math
+import threading
+from bisect import bisect_left
+
+
+def latency_buckets(smallest=1e-6, largest=100.0, per_doubling=2):
+    """Upper bounds (in seconds) of log-spaced buckets, per_doubling of them for each factor of 2"""
+    count = math.ceil(math.log2(largest / smallest) * per_doubling)
+    return tuple(smallest * 2 ** (i / per_doubling) for i in range(count + 1))
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram, the same shape Prometheus uses: observing a value
+    is a binary search and an increment, however many values were observed.
+    Quantiles are estimated by interpolating inside the bucket they fall in,
+    so they're accurate to within a bucket's width (about 41% by default).
+    """
+
+    def __init__(self, bounds=None):
+        self.bounds = bounds or latency_buckets()
+        # counts[i] is the number of values in (bounds[i - 1], bounds[i]]; the last one is everything above
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value, count=1):
+        self.counts[bisect_left(self.bounds, value)] += count
+        self.count += count
+        self.sum += value * count
+
+    def quantile(self, q):
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                upper = self.bounds[i] if i < len(self.bounds) else lower
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.bounds[-1]
+
+    def summary(self):
+        return {"count": self.count,
+                "sum": self.sum,
+                "p50": self.quantile(0.50),
+                "p95": self.quantile(0.95),
+                "p99": self.quantile(0.99)}
+
+
+class Metrics:
+    """
+    Per-source lookup latency histograms and named counters, plus gauges: named
+    functions read only when the metrics are exported (cache sizes, hit ratios),
+    so keeping them current costs nothing on the lookup path.
+    """
+
+    def __init__(self, bounds=None):
+        self.bounds = bounds or latency_buckets()
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.counters = {}
+        self.gauges = {}
+
+    def observe(self, source, seconds, count=1):
+        """Records count lookups answered by source, each taking seconds"""
+        with self.lock:
+            histogram = self.latencies.get(source)
+            if histogram is None:
+                histogram = self.latencies[source] = Histogram(self.bounds)
+            histogram.observe(seconds, count)
+
+    def increment(self, name, count=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + count
+
+    def add_gauge(self, name, func):
+        self.gauges[name] = func
+
+    def snapshot(self):
+        """Everything as plain data: latency summaries by source, counters and gauges"""
+        with self.lock:
+            latencies = {str(source): histogram.summary() for source, histogram in self.latencies.items()}
+            counters = dict(self.counters)
+        return {"latency_seconds": latencies,
+                "counters": counters,
+                "gauges": {name: func() for name, func in self.gauges.items()}}
+
+    def export(self, exporter="prometheus"):
+        """The metrics as text, exporter being the name of one of the EXPORTERS"""
+        if exporter not in EXPORTERS:
+            raise ValueError(f"Unknown metrics exporter {exporter}, pick one of {', '.join(EXPORTERS)}")
+        return EXPORTERS[exporter](self)
+
+
+def export_json(metrics):
+    return json.dumps(metrics.snapshot(), indent=2, sort_keys=True)
+
+
+def export_prometheus(metrics, prefix="dictionary"):
+    """Prometheus text exposition format"""
+    lines = [f"# HELP {prefix}_lookup_seconds Lookup latency by the source that answered it",
+             f"# TYPE {prefix}_lookup_seconds histogram"]
+    with metrics.lock:
+        for source, histogram in sorted((str(source), histogram) for source, histogram in metrics.latencies.items()):
+            cumulative = 0
+            for bound, count in zip(histogram.bounds, histogram.counts):
+                cumulative += count
+                lines.append(f'{prefix}_lookup_seconds_bucket{{source="{source}",le="{bound:.6g}"}} {cumulative}')
+            lines.append(f'{prefix}_lookup_seconds_bucket{{source="{source}",le="+Inf"}} {histogram.count}')
+            lines.append(f'{prefix}_lookup_seconds_sum{{source="{source}"}} {histogram.sum!r}')
+            lines.append(f'{prefix}_lookup_seconds_count{{source="{source}"}} {histogram.count}')
+        counters = sorted(metrics.counters.items())
+    for name, value in counters:
+        lines.append(f"# TYPE {prefix}_{name}_total counter")
+        lines.append(f"{prefix}_{name}_total {value}")
+    for name, func in sorted(metrics.gauges.items()):
+        lines.append(f"# TYPE {prefix}_{name} gauge")
+        lines.append(f"{prefix}_{name} {func()!r}")
+    return "\n".join(lines) + "\n"
+
+
+EXPORTERS = {"json": export_json, "prometheus": export_prometheus}
@@ -0,0 +1,61 @@
+"""
+Latency histograms, counters and exporters
+Jimmy Tran
+Testing
+"""
+
+import json
+import unittest
+from metrics import *
+
+
+class HistogramTest(unittest.TestCase):
+    def testQuantiles(self):
+        histogram = Histogram()
+        for i in range(1, 1001):
+            histogram.observe(i / 1000)
+        self.assertEqual(histogram.count, 1000)
+        self.assertAlmostEqual(histogram.sum, 500.5)
+        # Within a bucket's width of the exact answer
+        for q in (0.5, 0.95, 0.99):
+            self.assertLess(abs(histogram.quantile(q) / q - 1), 0.42)
+        self.assertEqual(Histogram().quantile(0.5), 0.0)
+
+    def testBulkObserve(self):
+        histogram = Histogram(bounds=(1, 2, 4))
+        histogram.observe(1.5, count=10)
+        histogram.observe(100)
+        self.assertEqual(histogram.counts, [0, 10, 0, 1])
+        self.assertEqual(histogram.summary()["count"], 11)
+        self.assertEqual(histogram.quantile(0.99), 4)
+
+
+class MetricsTest(unittest.TestCase):
+    def setUp(self):
+        self.metrics = Metrics()
+        self.metrics.observe("CACHE", 0.00001)
+        self.metrics.observe("CACHE", 0.00002)
+        self.metrics.observe("OXFORD_ONLINE", 0.2)
+        self.metrics.increment("upstream_errors")
+        self.metrics.increment("upstream_errors", 2)
+        self.metrics.add_gauge("hit_ratio", lambda: 0.5)
+
+    def testSnapshot(self):
+        snapshot = self.metrics.snapshot()
+        self.assertEqual(snapshot["latency_seconds"]["CACHE"]["count"], 2)
+        self.assertEqual(snapshot["latency_seconds"]["OXFORD_ONLINE"]["count"], 1)
+        self.assertEqual(snapshot["counters"], {"upstream_errors": 3})
+        self.assertEqual(snapshot["gauges"], {"hit_ratio": 0.5})
+        self.assertEqual(json.loads(self.metrics.export("json")), snapshot)
+
+    def testPrometheus(self):
+        lines = self.metrics.export("prometheus").splitlines()
+        self.assertIn("# TYPE dictionary_lookup_seconds histogram", lines)
+        self.assertIn('dictionary_lookup_seconds_bucket{source="CACHE",le="+Inf"} 2', lines)
+        self.assertIn('dictionary_lookup_seconds_count{source="OXFORD_ONLINE"} 1', lines)
+        self.assertIn("dictionary_upstream_errors_total 3", lines)
+        self.assertIn("dictionary_hit_ratio 0.5", lines)
+        buckets = [int(line.split()[-1]) for line in lines
+                   if line.startswith('dictionary_lookup_seconds_bucket{source="CACHE"')]
+        self.assertEqual(buckets, sorted(buckets))
+        self.assertRaises(ValueError, lambda: self.metrics.export("xml"))
@@ -0,0 +1,64 @@
+"""
+Bounded, expiring cache of words known not to exist
+Jimmy Tran
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class NegativeCache:
+    """
+    Remembers up to capacity words that upstream said don't exist, each for ttl
+    seconds, so repeated lookups of the same garbage word don't cost an upstream
+    call every time.  The oldest word is forgotten first when it's full.
+    """
+
+    def __init__(self, capacity=10000, ttl=5 * 60, clock=time.monotonic):
+        if capacity < 1:
+            raise ValueError("Capacity should be at least 1")
+        if ttl <= 0:
+            raise ValueError("ttl should be positive")
+        self.capacity = capacity
+        self.ttl = ttl
+        self.clock = clock
+        self.lock = threading.Lock()
+        # word -> time it expires, oldest first
+        self.expiries = OrderedDict()
+        self.hits = 0
+        self.additions = 0
+
+    def __contains__(self, word):
+        """True if word is known not to exist.  Each True answer is an upstream call saved."""
+        with self.lock:
+            expiry = self.expiries.get(word)
+            if expiry is None:
+                return False
+            if expiry <= self.clock():
+                del self.expiries[word]
+                return False
+            self.hits += 1
+            return True
+
+    def __len__(self):
+        return len(self.expiries)
+
+    def add(self, word):
+        with self.lock:
+            self.expiries.pop(word, None)
+            self.expiries[word] = self.clock() + self.ttl
+            self.additions += 1
+            while len(self.expiries) > self.capacity:
+                self.expiries.popitem(last=False)
+
+    def discard(self, word):
+        with self.lock:
+            return self.expiries.pop(word, None) is not None
+
+    def clear(self):
+        with self.lock:
+            self.expiries.clear()
+
+    def stats(self):
+        return {"size": len(self.expiries), "additions": self.additions, "upstream_calls_saved": self.hits}
@@ -0,0 +1,34 @@
+"""
+Negative cache
+Jimmy Tran
+Testing
+"""
+
+import unittest
+from negativecache import *
+
+
+class NegativeCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.cache = NegativeCache(capacity=2, ttl=10, clock=lambda: self.now)
+
+    def testExpiry(self):
+        self.cache.add("asdf")
+        self.assertIn("asdf", self.cache)
+        self.now = 9.9
+        self.assertIn("asdf", self.cache)
+        self.now = 10
+        self.assertNotIn("asdf", self.cache)
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(self.cache.stats(), {"size": 0, "additions": 1, "upstream_calls_saved": 2})
+
+    def testBounded(self):
+        for word in ("a", "b", "c"):
+            self.cache.add(word)
+        self.assertNotIn("a", self.cache)
+        self.assertIn("b", self.cache)
+        self.assertTrue(self.cache.discard("b"))
+        self.assertFalse(self.cache.discard("b"))
+        self.assertRaises(ValueError, lambda: NegativeCache(capacity=0))
+        self.assertRaises(ValueError, lambda: NegativeCache(ttl=0))
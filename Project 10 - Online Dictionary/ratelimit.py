@@ -0,0 +1,155 @@
+"""
+Client-side rate limiting and adaptive concurrency
+Jimmy Tran
+"""
+
+import asyncio
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Shapes requests to rate per second on average, allowing bursts of up to
+    burst requests.  Tokens are handed out by reservation: the bucket may go
+    into debt, and whoever takes a token it doesn't have waits until it has
+    been earned, so waiters are served in order without polling.
+    """
+
+    def __init__(self, rate, burst=None, clock=time.monotonic):
+        if rate <= 0:
+            raise ValueError("rate should be positive")
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        if self.burst < 1:
+            raise ValueError("burst should be at least 1")
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.tokens = self.burst
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, tokens=1):
+        """Takes tokens, and returns how many seconds to wait before using them"""
+        with self.lock:
+            self._refill()
+            self.tokens -= tokens
+            return max(0.0, -self.tokens / self.rate)
+
+    def try_acquire(self, tokens=1):
+        """Takes tokens if they're available right now, returns whether it did"""
+        with self.lock:
+            self._refill()
+            if self.tokens < tokens:
+                return False
+            self.tokens -= tokens
+            return True
+
+    def acquire(self, tokens=1):
+        delay = self.reserve(tokens)
+        if delay:
+            time.sleep(delay)
+
+    async def acquire_async(self, tokens=1):
+        delay = self.reserve(tokens)
+        if delay:
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds):
+        """
+        Hands out no new tokens for the next seconds (e.g. the server's Retry-After).
+        Pauses overlap rather than add up, so many requests throttled at once
+        only cost one Retry-After between them.
+        """
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.tokens, -seconds * self.rate)
+
+
+class AIMD:
+    """
+    Additive increase, multiplicative decrease of a concurrency limit, like TCP
+    congestion control: every successful request raises the limit by
+    increase / limit (about increase per limit requests), every throttled one
+    multiplies it by decrease, never going outside [min_limit, max_limit].
+    Like TCP, the limit is cut at most once per congestion window: acquire()
+    returns the number of cuts so far, and a request that is throttled after
+    a cut made since it started doesn't cut again, so a burst of 429s to
+    requests that were all in flight together only halves the limit once.
+    """
+
+    def __init__(self, max_limit, min_limit=1, initial=None, increase=1.0, decrease=0.5):
+        if not 1 <= min_limit <= max_limit:
+            raise ValueError("Limits should satisfy 1 <= min_limit <= max_limit")
+        if not 0 < decrease < 1:
+            raise ValueError("decrease should be between 0 and 1")
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.limit = float(initial if initial is not None else max_limit)
+        self.increase = increase
+        self.decrease = decrease
+        self.in_flight = 0
+        self.throttled = 0
+        self.decreases = 0
+
+    def _adjust(self, throttled, started=None):
+        """started is the number of decreases when the request began, None if unknown"""
+        if throttled:
+            self.throttled += 1
+            if started is None or started >= self.decreases:
+                self.limit = max(self.min_limit, self.limit * self.decrease)
+                self.decreases += 1
+        else:
+            self.limit = min(self.max_limit, self.limit + self.increase / self.limit)
+
+    def _has_room(self):
+        return self.in_flight < int(self.limit)
+
+
+class AIMDLimiter(AIMD):
+    """Blocks threads in acquire() while limit requests are already in flight"""
+
+    def __init__(self, max_limit, min_limit=1, initial=None, increase=1.0, decrease=0.5):
+        super().__init__(max_limit, min_limit, initial, increase, decrease)
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        """Waits for room, returns the ticket to hand back to release()"""
+        with self.condition:
+            self.condition.wait_for(self._has_room)
+            self.in_flight += 1
+            return self.decreases
+
+    def release(self, throttled=False, started=None):
+        """
+        Ends a request acquire() let through; throttled says whether the server
+        pushed back, started is what acquire() returned
+        """
+        with self.condition:
+            self.in_flight -= 1
+            self._adjust(throttled, started)
+            self.condition.notify_all()
+
+
+class AsyncAIMDLimiter(AIMD):
+    """asyncio variant of AIMDLimiter, for coroutines on one event loop"""
+
+    def __init__(self, max_limit, min_limit=1, initial=None, increase=1.0, decrease=0.5):
+        super().__init__(max_limit, min_limit, initial, increase, decrease)
+        self.condition = asyncio.Condition()
+
+    async def acquire(self):
+        async with self.condition:
+            await self.condition.wait_for(self._has_room)
+            self.in_flight += 1
+            return self.decreases
+
+    async def release(self, throttled=False, started=None):
+        async with self.condition:
+            self.in_flight -= 1
+            self._adjust(throttled, started)
+            self.condition.notify_all()
@@ -0,0 +1,102 @@
+"""
+Client-side rate limiting and adaptive concurrency
+Jimmy Tran
+Testing
+"""
+
+import asyncio
+import threading
+import unittest
+from ratelimit import *
+
+
+class TokenBucketTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.bucket = TokenBucket(10, burst=2, clock=lambda: self.now)
+
+    def testReservations(self):
+        # The burst goes out at once, then one token every 0.1s, in order
+        self.assertEqual([self.bucket.reserve() for _ in range(4)], [0.0, 0.0, 0.1, 0.2])
+        self.assertFalse(self.bucket.try_acquire())
+        self.now += 0.25
+        self.assertFalse(self.bucket.try_acquire())
+        self.now += 0.1
+        self.assertTrue(self.bucket.try_acquire())
+        # Never refills beyond the burst
+        self.now += 100
+        self.assertEqual([self.bucket.reserve() for _ in range(3)], [0.0, 0.0, 0.1])
+
+    def testPause(self):
+        self.bucket.pause(1.0)
+        self.bucket.pause(0.5)
+        self.assertAlmostEqual(self.bucket.reserve(), 1.1)
+        self.bucket.pause(0.5)
+        self.assertAlmostEqual(self.bucket.reserve(), 1.2)
+        self.assertRaises(ValueError, lambda: TokenBucket(0))
+        self.assertRaises(ValueError, lambda: TokenBucket(10, burst=0.5))
+
+
+class AIMDTest(unittest.TestCase):
+    def testAdjust(self):
+        aimd = AIMD(8, initial=4)
+        aimd._adjust(False)
+        self.assertEqual(aimd.limit, 4.25)
+        aimd._adjust(True)
+        aimd._adjust(True)
+        aimd._adjust(True)
+        self.assertEqual(aimd.limit, 1)
+        self.assertEqual(aimd.throttled, 3)
+        for _ in range(100):
+            aimd._adjust(False)
+        self.assertEqual(aimd.limit, 8)
+        self.assertRaises(ValueError, lambda: AIMD(2, min_limit=3))
+
+    def testOneDecreasePerWindow(self):
+        limiter = AIMDLimiter(16)
+        tickets = [limiter.acquire() for _ in range(8)]
+        # All eight were in flight before the first 429 cut the limit, so only that one counts
+        for ticket in tickets:
+            limiter.release(throttled=True, started=ticket)
+        self.assertEqual((limiter.limit, limiter.throttled, limiter.decreases), (8, 8, 1))
+        # A request started after the cut is a new window
+        limiter.release(throttled=True, started=limiter.acquire())
+        self.assertEqual(limiter.limit, 4)
+
+    def testLimiterBlocks(self):
+        limiter = AIMDLimiter(2)
+        limiter.acquire()
+        limiter.acquire()
+        entered = threading.Event()
+
+        def third():
+            limiter.acquire()
+            entered.set()
+
+        thread = threading.Thread(target=third)
+        thread.start()
+        self.assertFalse(entered.wait(0.1))
+        # A 429 halves the limit to 1, so one release isn't enough to make room
+        limiter.release(throttled=True)
+        self.assertFalse(entered.wait(0.1))
+        limiter.release()
+        self.assertTrue(entered.wait(1))
+        thread.join()
+        self.assertEqual(limiter.in_flight, 1)
+
+
+class AsyncAIMDLimiterTest(unittest.IsolatedAsyncioTestCase):
+    async def testLimitsConcurrency(self):
+        limiter = AsyncAIMDLimiter(3)
+        peak = 0
+
+        async def request():
+            nonlocal peak
+            await limiter.acquire()
+            peak = max(peak, limiter.in_flight)
+            await asyncio.sleep(0.01)
+            await limiter.release()
+
+        await asyncio.gather(*(request() for _ in range(20)))
+        self.assertEqual(peak, 3)
+        self.assertEqual(limiter.in_flight, 0)
@@ -0,0 +1,81 @@
+"""
+Single-flight request coalescing
+Jimmy Tran
+"""
+
+import asyncio
+import threading
+
+
+class Call:
+    """One in-flight call, and the result or exception its waiters will get"""
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    SingleFlight makes sure only one call per key runs at a time: the first
+    caller for a key (the leader) runs the function, and every caller that
+    asks for the same key while it runs waits and shares its outcome.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key, func, *args, **kwargs):
+        """Returns func(*args, **kwargs), or the result of the identical call already in flight for key"""
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = Call()
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+
+
+class AsyncSingleFlight:
+    """asyncio version of SingleFlight, for coroutines running on one event loop"""
+
+    def __init__(self):
+        self.calls = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key, func, *args, **kwargs):
+        """Returns await func(*args, **kwargs), or the result of the identical call already in flight for key"""
+        future = self.calls.get(key)
+        if future is not None:
+            self.coalesced += 1
+            # shield, so one waiter being cancelled doesn't cancel the others
+            return await asyncio.shield(future)
+        self.leaders += 1
+        future = self.calls[key] = asyncio.ensure_future(func(*args, **kwargs))
+        future.add_done_callback(lambda f: self.forget(key, f))
+        return await asyncio.shield(future)
+
+    def forget(self, key, future):
+        if self.calls.get(key) is future:
+            del self.calls[key]
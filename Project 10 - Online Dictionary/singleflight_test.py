@@ -0,0 +1,78 @@
+"""
+Single-flight request coalescing
+Jimmy Tran
+Testing
+"""
+
+import asyncio
+import threading
+import time
+import unittest
+from singleflight import *
+
+
+class SingleFlightTest(unittest.TestCase):
+    def run_threads(self, target, count):
+        barrier = threading.Barrier(count)
+        results = []
+
+        def worker():
+            barrier.wait()
+            try:
+                results.append(target())
+            except Exception as e:
+                results.append(e)
+
+        threads = [threading.Thread(target=worker) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def testCoalesces(self):
+        flight = SingleFlight()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            time.sleep(0.1)
+            return "ace"
+
+        results = self.run_threads(lambda: flight.do("ace", slow), 8)
+        self.assertEqual(results, ["ace"] * 8)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(flight.leaders, 1)
+        self.assertEqual(flight.coalesced, 7)
+        self.assertEqual(flight.calls, {})
+
+    def testSharesErrors(self):
+        flight = SingleFlight()
+
+        def fail():
+            time.sleep(0.1)
+            raise KeyError("Status Code: 404")
+
+        results = self.run_threads(lambda: flight.do("potato", fail), 4)
+        self.assertTrue(all(isinstance(result, KeyError) for result in results))
+        self.assertEqual(flight.leaders, 1)
+        # Once the call is over, the next caller runs the function again
+        self.assertEqual(flight.do("potato", lambda: "found"), "found")
+
+
+class AsyncSingleFlightTest(unittest.IsolatedAsyncioTestCase):
+    async def testCoalesces(self):
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def slow(word):
+            calls.append(word)
+            await asyncio.sleep(0.05)
+            return word.upper()
+
+        results = await asyncio.gather(*(flight.do("ace", slow, "ace") for _ in range(5)),
+                                       flight.do("fly", slow, "fly"))
+        self.assertEqual(results, ["ACE"] * 5 + ["FLY"])
+        self.assertEqual(calls, ["ace", "fly"])
+        self.assertEqual(flight.coalesced, 4)
+        self.assertEqual(flight.calls, {})
@@ -0,0 +1,154 @@
+"""
+Local stand-in for the Oxford Dictionaries API, for tests and benchmarks
+Jimmy Tran
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ratelimit import TokenBucket
+
+
+def oxford_json(word, part_of_speech, definition, example=None):
+    """Builds the subset of an Oxford API v2 entries response that OxfordDictionary reads"""
+    sense = {"definitions": [definition]}
+    if example is not None:
+        sense["examples"] = [{"text": example}]
+    return {"id": word,
+            "results": [{"lexicalEntries": [{"lexicalCategory": {"id": part_of_speech},
+                                             "entries": [{"senses": [sense]}]}]}]}
+
+
+def made_up_fields(word):
+    return "noun", f"definition of {word}", None
+
+
+class StubOxfordHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep the connection alive between requests
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without this, Nagle plus
+    # delayed ACKs add ~40ms to every response on a kept-alive connection.
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.stub.lock:
+            self.server.stub.connections += 1
+
+    def do_GET(self):
+        stub = self.server.stub
+        with stub.lock:
+            stub.requests += 1
+            status = stub.statuses.pop(0) if stub.statuses else None
+        if status is None and stub.quota is not None and not stub.quota.try_acquire():
+            with stub.lock:
+                stub.throttled += 1
+            status = 429
+        if stub.latency:
+            time.sleep(stub.latency)
+        word = self.path.rstrip("/").rsplit("/", 1)[-1]
+        fields = stub.lookup(word)
+        if status is None:
+            status = 200 if fields else 404
+        elif status == 200 and not fields:
+            # A 200 queued up for a word the stub doesn't know still needs an entry to send
+            fields = made_up_fields(word)
+        body = json.dumps(oxford_json(word, *fields) if status == 200 else {"error": "not found"}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if status == 429:
+            self.send_header("Retry-After", str(stub.retry_after))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubOxfordServer:
+    """
+    Serves Oxford-shaped JSON on localhost from a background thread.
+    entries maps word -> (part_of_speech, definition, example); with entries=None
+    every word is found with a made-up definition.  latency (seconds) is added
+    to every response, and statuses is a queue of status codes (e.g. 429) to
+    answer the next requests with, before going back to normal.
+    With a quota (requests per second, in bursts of up to burst), requests
+    over it are answered 429, with a Retry-After of retry_after seconds.
+    """
+
+    def __init__(self, entries=None, latency=0.0, statuses=(), port=0, quota=None, burst=None, retry_after=0):
+        self.entries = entries
+        self.latency = latency
+        self.statuses = list(statuses)
+        self.quota = TokenBucket(quota, burst) if quota is not None else None
+        self.retry_after = retry_after
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.throttled = 0
+        self.connections = 0
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), StubOxfordHandler)
+        self.server.daemon_threads = True
+        self.server.stub = self
+        self.thread = None
+
+    @property
+    def url(self):
+        """Base url to pass to OxfordDictionary"""
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/api/v2/entries/"
+
+    def lookup(self, word):
+        if self.entries is None:
+            return made_up_fields(word)
+        return self.entries.get(word)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+class StubDictionary:
+    """
+    In-process stand-in for OxfordDictionary, counting how often it's asked.
+    Given words, it finds only those and raises WordNotFoundError (a 404) for
+    the rest; given none, it finds every word.  Either way it sleeps latency
+    seconds first, to mimic the network round trip.
+    """
+
+    def __init__(self, *words, latency=0.0, entry_class=None):
+        from OnlineDictionary import DictionaryEntry, WordNotFoundError
+        self.entry_class = entry_class if entry_class is not None else DictionaryEntry
+        self.not_found = WordNotFoundError
+        self.entries = {word: self.make_entry(word) for word in words} or None
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.calls = 0
+
+    def make_entry(self, word):
+        return self.entry_class(word, "noun", f"definition of {word}")
+
+    def search(self, word):
+        with self.lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.entries is None:
+            return self.make_entry(word)
+        try:
+            return self.entries[word]
+        except KeyError:
+            raise self.not_found("Status Code: 404") from None
@@ -0,0 +1,170 @@
+"""
+SymSpell deletion index for fuzzy "did you mean" lookups
+Jimmy Tran
+"""
+
+from collections import deque
+
+
+def edit_distance(a, b, max_distance):
+    """
+    Optimal string alignment distance (Levenshtein plus adjacent transpositions)
+    between a and b, or max_distance + 1 if it's over max_distance.
+    Uses Hyyro's bit-vector algorithm: one column of the DP table is a pair of
+    ints whose bits are the vertical +1/-1 deltas, so each character of b costs
+    a handful of integer operations instead of a Python loop over a.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    if not a:
+        return len(b)
+    pattern_masks = {}
+    bit = 1
+    for c in a:
+        pattern_masks[c] = pattern_masks.get(c, 0) | bit
+        bit <<= 1
+    full = bit - 1
+    last = bit >> 1
+    vp = full
+    vn = 0
+    d0 = 0
+    pm_previous = 0
+    score = len(a)
+    remaining = len(b)
+    for c in b:
+        pm = pattern_masks.get(c, 0)
+        transposition = (((~d0) & pm) << 1) & pm_previous
+        d0 = ((((pm & vp) + vp) ^ vp) | pm | vn | transposition) & full
+        hp = (vn | ~(d0 | vp)) & full
+        hn = d0 & vp
+        if hp & last:
+            score += 1
+        elif hn & last:
+            score -= 1
+        remaining -= 1
+        # Even if every remaining character matched, we'd still be too far
+        if score - remaining > max_distance:
+            return max_distance + 1
+        hp = ((hp << 1) | 1) & full
+        hn = (hn << 1) & full
+        vp = (hn | ~(d0 | hp)) & full
+        vn = d0 & hp
+        pm_previous = pm
+    return score if score <= max_distance else max_distance + 1
+
+
+class SymSpell:
+    """
+    Every word is indexed under all the strings obtained by deleting up to
+    max_distance characters from its first prefix_length characters.  Two words
+    within edit distance d share such a delete, so a lookup only has to generate
+    the deletes of its input and verify the handful of words they point to,
+    instead of comparing against the whole lexicon.
+    """
+
+    def __init__(self, max_distance=2, prefix_length=7):
+        if max_distance < 0:
+            raise ValueError("max_distance should be at least 0")
+        if prefix_length <= max_distance:
+            raise ValueError("prefix_length should be greater than max_distance")
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.words = set()
+        # delete -> word, or list of words when several share it (saves a list per delete)
+        self.deletes = {}
+
+    @classmethod
+    def from_words(cls, words, max_distance=2, prefix_length=7):
+        index = cls(max_distance, prefix_length)
+        for word in words:
+            index.add(word)
+        return index
+
+    def __len__(self):
+        return len(self.words)
+
+    def __contains__(self, word):
+        return word in self.words
+
+    def edits(self, word, max_distance):
+        """word and every string made by deleting up to max_distance characters from it"""
+        found = {word}
+        frontier = [word]
+        for _ in range(max_distance):
+            next_frontier = []
+            for candidate in frontier:
+                for i in range(len(candidate)):
+                    delete = candidate[:i] + candidate[i + 1:]
+                    if delete not in found:
+                        found.add(delete)
+                        next_frontier.append(delete)
+            frontier = next_frontier
+        return found
+
+    def add(self, word):
+        if word in self.words:
+            return
+        self.words.add(word)
+        deletes = self.deletes
+        for delete in self.edits(word[:self.prefix_length], self.max_distance):
+            words = deletes.get(delete)
+            if words is None:
+                deletes[delete] = word
+            elif isinstance(words, list):
+                words.append(word)
+            else:
+                deletes[delete] = [words, word]
+
+    def discard(self, word):
+        if word not in self.words:
+            return False
+        self.words.remove(word)
+        deletes = self.deletes
+        for delete in self.edits(word[:self.prefix_length], self.max_distance):
+            words = deletes.get(delete)
+            if words == word:
+                del deletes[delete]
+            elif isinstance(words, list):
+                words.remove(word)
+                if len(words) == 1:
+                    deletes[delete] = words[0]
+        return True
+
+    def lookup(self, word, max_distance=None, k=5):
+        """
+        Up to k (suggestion, distance) pairs within max_distance of word,
+        closest first, ties broken alphabetically.
+        """
+        if max_distance is None or max_distance > self.max_distance:
+            max_distance = self.max_distance
+        results = {}
+        if word in self.words:
+            results[word] = 0
+        input_prefix = word[:self.prefix_length]
+        length = len(word)
+        candidates = deque([input_prefix])
+        seen = {input_prefix}
+        while candidates:
+            candidate = candidates.popleft()
+            prefix_delta = len(input_prefix) - len(candidate)
+            if prefix_delta > max_distance:
+                # Candidates come out fewest deletions first, so none of the rest can be close enough
+                break
+            matches = self.deletes.get(candidate)
+            if matches is not None:
+                for suggestion in (matches if isinstance(matches, list) else (matches,)):
+                    if suggestion in results or abs(len(suggestion) - length) > max_distance:
+                        continue
+                    distance = edit_distance(word, suggestion, max_distance)
+                    if distance <= max_distance:
+                        results[suggestion] = distance
+                if len(results) >= k:
+                    # Once we have k suggestions, only ones at least as close as the k-th can matter
+                    max_distance = sorted(results.values())[k - 1]
+            if prefix_delta < max_distance:
+                for i in range(len(candidate)):
+                    delete = candidate[:i] + candidate[i + 1:]
+                    if delete not in seen:
+                        seen.add(delete)
+                        candidates.append(delete)
+        return sorted(results.items(), key=lambda item: (item[1], item[0]))[:k]
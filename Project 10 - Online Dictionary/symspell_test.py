@@ -0,0 +1,65 @@
+"""
+SymSpell deletion index
+Jimmy Tran
+Testing
+"""
+
+import random
+import unittest
+from symspell import *
+
+
+def naive_distance(a, b):
+    """Textbook optimal string alignment DP, to check edit_distance against"""
+    d = [[i + j if i * j == 0 else 0 for j in range(len(b) + 1)] for i in range(len(a) + 1)]
+    for i in range(1, len(a) + 1):
+        for j in range(1, len(b) + 1):
+            d[i][j] = min(d[i - 1][j] + 1, d[i][j - 1] + 1, d[i - 1][j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                d[i][j] = min(d[i][j], d[i - 2][j - 2] + 1)
+    return d[len(a)][len(b)]
+
+
+class EditDistanceTest(unittest.TestCase):
+    def testKnownPairs(self):
+        self.assertEqual(edit_distance("python", "python", 2), 0)
+        self.assertEqual(edit_distance("pyhton", "python", 2), 1)
+        self.assertEqual(edit_distance("jolly", "holy", 2), 2)
+        self.assertEqual(edit_distance("", "ace", 3), 3)
+        self.assertEqual(edit_distance("facetious", "fly", 2), 3)
+
+    def testMatchesNaive(self):
+        rng = random.Random(5)
+        for _ in range(3000):
+            a = "".join(rng.choice("abc") for _ in range(rng.randint(0, 8)))
+            b = "".join(rng.choice("abc") for _ in range(rng.randint(0, 8)))
+            max_distance = rng.randint(0, 9)
+            expected = min(naive_distance(a, b), max_distance + 1)
+            self.assertEqual(edit_distance(a, b, max_distance), expected, (a, b, max_distance))
+
+
+class SymSpellTest(unittest.TestCase):
+    def testLookup(self):
+        index = SymSpell.from_words(["python", "jolly", "holly", "fly", "foothill", "facetious"])
+        self.assertEqual(index.lookup("pyhton"), [("python", 1)])
+        self.assertEqual(index.lookup("jolly"), [("jolly", 0), ("holly", 1)])
+        self.assertEqual(index.lookup("jolly", k=1), [("jolly", 0)])
+        self.assertEqual(index.lookup("hlly", max_distance=1), [("holly", 1)])
+        self.assertEqual(index.lookup("zzzzzz"), [])
+        self.assertTrue(index.discard("holly"))
+        self.assertFalse(index.discard("holly"))
+        self.assertEqual(index.lookup("hlly"), [("fly", 2), ("jolly", 2)])
+        self.assertRaises(ValueError, lambda: SymSpell(max_distance=2, prefix_length=2))
+
+    def testMatchesBruteForce(self):
+        rng = random.Random(2)
+        words = {"".join(rng.choice("abcd") for _ in range(rng.randint(1, 9))) for _ in range(300)}
+        index = SymSpell.from_words(words, max_distance=2, prefix_length=4)
+        for _ in range(200):
+            word = "".join(rng.choice("abcde") for _ in range(rng.randint(0, 10)))
+            for max_distance in (0, 1, 2):
+                for k in (1, 3, 1000):
+                    found = [(w, edit_distance(word, w, max_distance)) for w in words]
+                    expected = sorted((pair for pair in found if pair[1] <= max_distance),
+                                      key=lambda pair: (pair[1], pair[0]))[:k]
+                    self.assertEqual(index.lookup(word, max_distance, k), expected)
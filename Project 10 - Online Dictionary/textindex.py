@@ -0,0 +1,167 @@
+"""
+Inverted index over definitions and examples, ranked with BM25
+Jimmy Tran
+"""
+
+import heapq
+import json
+import math
+import os
+import re
+import tempfile
+
+TOKEN = re.compile(r"\w+")
+OPERATORS = ("and", "or")
+
+
+def tokenize(text):
+    """Lowercased words of text, in order"""
+    return TOKEN.findall(text.lower()) if text else []
+
+
+def entry_terms(entry):
+    """The terms a dictionary entry is indexed under: the words of its definition and example"""
+    return tokenize(entry.definition) + tokenize(entry.example)
+
+
+class InvertedIndex:
+    """
+    term -> {word: how many times term appears in word's entry}.  An AND query
+    intersects the posting lists (the shortest one first), an OR query merges
+    them; either way only entries containing a query term are ever scored,
+    rather than every entry in the dictionary.  Results are ranked with Okapi
+    BM25: rare terms count for more than common ones, repeating a term has
+    diminishing returns (k1), and long entries are penalised (b).
+    """
+
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}
+        # word -> number of terms in its entry, for BM25's length normalisation
+        self.lengths = {}
+        self.total_length = 0
+        # word -> k1 * (1 - b + b * length / average length), BM25's length normalisation, which
+        # only changes when entries do; computed on the first search after a change
+        self.norms = None
+
+    @classmethod
+    def from_entries(cls, entries, k1=1.2, b=0.75):
+        index = cls(k1, b)
+        for entry in entries:
+            index.add(entry.word, entry_terms(entry))
+        return index
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def __contains__(self, word):
+        return word in self.lengths
+
+    def add(self, word, terms):
+        """Indexes word's entry under terms, replacing what it was indexed under before"""
+        self.discard(word)
+        counts = {}
+        for term in terms:
+            counts[term] = counts.get(term, 0) + 1
+        postings = self.postings
+        for term, count in counts.items():
+            posting = postings.get(term)
+            if posting is None:
+                posting = postings[term] = {}
+            posting[word] = count
+        self.lengths[word] = len(terms)
+        self.total_length += len(terms)
+        self.norms = None
+
+    def discard(self, word, terms=None):
+        """
+        Removes word from the index.  terms, if known, are the ones it was
+        indexed under; otherwise every posting list has to be checked for it.
+        """
+        if word not in self.lengths:
+            return False
+        self.total_length -= self.lengths.pop(word)
+        self.norms = None
+        postings = self.postings
+        for term in (set(terms) if terms is not None else list(postings)):
+            posting = postings.get(term)
+            if posting is not None and posting.pop(word, None) is not None and not posting:
+                del postings[term]
+        return True
+
+    def matches(self, terms, operator="and"):
+        """Words whose entries contain all (and) or any (or) of terms"""
+        if operator not in OPERATORS:
+            raise ValueError(f"Unknown operator {operator}, pick one of {', '.join(OPERATORS)}")
+        postings = [self.postings.get(term, {}) for term in set(terms)]
+        if not postings:
+            return set()
+        if operator == "or":
+            return set().union(*postings)
+        postings.sort(key=len)
+        found = set(postings[0])
+        for posting in postings[1:]:
+            if not found:
+                break
+            found.intersection_update(posting.keys())
+        return found
+
+    def search(self, query, operator="and", limit=10):
+        """Up to limit (word, score) pairs whose entries match query, best first, ties broken alphabetically"""
+        terms = set(tokenize(query))
+        words = self.matches(terms, operator)
+        if not words or limit <= 0:
+            return []
+        count = len(self.lengths)
+        k1 = self.k1
+        norms = self.norms
+        if norms is None:
+            b = self.b
+            scale = b * count / self.total_length if self.total_length else 0.0
+            norms = self.norms = {word: k1 * (1 - b + scale * length) for word, length in self.lengths.items()}
+        scores = dict.fromkeys(words, 0.0)
+        for term in terms:
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            weight = math.log(1 + (count - len(posting) + 0.5) / (len(posting) + 0.5)) * (k1 + 1)
+            # An OR query's posting lists are subsets of the matches, an AND query's supersets
+            if len(posting) <= len(words):
+                for word, tf in posting.items():
+                    scores[word] += weight * tf / (tf + norms[word])
+            else:
+                for word in words:
+                    tf = posting[word]
+                    scores[word] += weight * tf / (tf + norms[word])
+        ranked = heapq.nsmallest(limit, ((-score, word) for word, score in scores.items()))
+        return [(word, -score) for score, word in ranked]
+
+    def save(self, filename):
+        """Writes the index as JSON: the words once, and each posting list as indices into them"""
+        words = list(self.lengths)
+        ids = {word: i for i, word in enumerate(words)}
+        postings = {term: [item for word, tf in posting.items() for item in (ids[word], tf)]
+                    for term, posting in self.postings.items()}
+        # A temporary file of its own, so processes saving at the same time don't write over each other
+        fd, temp_name = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(filename) or ".")
+        try:
+            with open(fd, "w", encoding="utf-8") as file:
+                json.dump({"k1": self.k1, "b": self.b, "words": words, "lengths": list(self.lengths.values()),
+                           "postings": postings}, file, ensure_ascii=False, separators=(",", ":"))
+            os.replace(temp_name, filename)
+        except BaseException:
+            os.unlink(temp_name)
+            raise
+
+    @classmethod
+    def load(cls, filename):
+        with open(filename, encoding="utf-8") as file:
+            data = json.load(file)
+        index = cls(data["k1"], data["b"])
+        words = data["words"]
+        index.lengths = dict(zip(words, data["lengths"]))
+        index.total_length = sum(data["lengths"])
+        for term, flat in data["postings"].items():
+            index.postings[term] = {words[i]: tf for i, tf in zip(flat[::2], flat[1::2])}
+        return index
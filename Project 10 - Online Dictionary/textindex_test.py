@@ -0,0 +1,86 @@
+"""
+Inverted index with BM25 ranking
+Jimmy Tran
+Testing
+"""
+
+import os
+import random
+import tempfile
+import unittest
+from collections import namedtuple
+from textindex import *
+
+Entry = namedtuple("Entry", "word definition example")
+
+
+class InvertedIndexTest(unittest.TestCase):
+    ENTRIES = [Entry("python", "a large snake that kills prey by constriction", None),
+               Entry("cobra", "a venomous snake", "the cobra spread its hood"),
+               Entry("adder", "a small venomous snake, snake of Europe", None),
+               Entry("ace", "a playing card with a single spot", "life had started dealing him aces again"),
+               Entry("jolly", "full of high spirits", "Santa is a jolly figure")]
+
+    def testTokenize(self):
+        self.assertEqual(tokenize("Non-venomous, don't"), ["non", "venomous", "don", "t"])
+        self.assertEqual(tokenize(None), [])
+        self.assertEqual(entry_terms(self.ENTRIES[1]), ["a", "venomous", "snake", "the", "cobra", "spread",
+                                                        "its", "hood"])
+
+    def testSearch(self):
+        index = InvertedIndex.from_entries(self.ENTRIES)
+        self.assertEqual(len(index), 5)
+        self.assertEqual(index.matches(["snake", "venomous"]), {"cobra", "adder"})
+        self.assertEqual(index.matches(["snake", "card"], "or"), {"python", "cobra", "adder", "ace"})
+        self.assertEqual(index.matches(["snake", "card"]), set())
+        self.assertEqual(index.matches(["potato"], "or"), set())
+        self.assertEqual(index.matches([]), set())
+        # adder says snake twice in a short entry, python once in a long one
+        self.assertEqual([word for word, score in index.search("Snake")], ["adder", "cobra", "python"])
+        self.assertEqual([word for word, score in index.search("snake", limit=1)], ["adder"])
+        # The rarer term counts for more
+        self.assertEqual([word for word, score in index.search("venomous hood", "or")], ["cobra", "adder"])
+        self.assertEqual(index.search("jolly figure")[0][0], "jolly")
+        self.assertEqual(index.search("potato"), [])
+        self.assertRaises(ValueError, lambda: index.search("snake", "xor"))
+
+    def testAddDiscard(self):
+        index = InvertedIndex.from_entries(self.ENTRIES)
+        self.assertTrue(index.discard("adder", entry_terms(self.ENTRIES[2])))
+        self.assertFalse(index.discard("adder"))
+        self.assertNotIn("adder", index)
+        self.assertEqual(index.matches(["snake"]), {"python", "cobra"})
+        index.add("cobra", tokenize("a hooded serpent"))
+        self.assertEqual(index.matches(["snake"]), {"python"})
+        self.assertEqual(index.matches(["serpent"]), {"cobra"})
+        self.assertNotIn("venomous", index.postings)
+        self.assertEqual(index.total_length, sum(index.lengths.values()))
+
+    def testMatchesLinearScan(self):
+        rng = random.Random(0)
+        vocabulary = [f"term{i}" for i in range(30)]
+        entries = [Entry(f"word{i}", " ".join(rng.choices(vocabulary, k=rng.randint(1, 10))), None)
+                   for i in range(300)]
+        index = InvertedIndex.from_entries(entries)
+        for _ in range(50):
+            terms = rng.sample(vocabulary, rng.randint(1, 3))
+            self.assertEqual(index.matches(terms),
+                             {e.word for e in entries if all(t in entry_terms(e) for t in terms)})
+            self.assertEqual(index.matches(terms, "or"),
+                             {e.word for e in entries if any(t in entry_terms(e) for t in terms)})
+
+    def testSaveLoad(self):
+        index = InvertedIndex.from_entries(self.ENTRIES, k1=1.5, b=0.5)
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "dictionary.fulltext")
+            index.save(filename)
+            loaded = InvertedIndex.load(filename)
+            self.assertEqual(os.listdir(directory), ["dictionary.fulltext"])
+        self.assertEqual((loaded.k1, loaded.b), (1.5, 0.5))
+        self.assertEqual(loaded.postings, index.postings)
+        self.assertEqual(loaded.lengths, index.lengths)
+        self.assertEqual(loaded.search("venomous snake", "or"), index.search("venomous snake", "or"))
+
+
+if __name__ == '__main__':
+    unittest.main()
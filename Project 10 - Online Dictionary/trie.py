@@ -0,0 +1,221 @@
+"""
+Compressed (radix) trie for prefix / autocomplete search
+Jimmy Tran
+"""
+
+import json
+import os
+import tempfile
+from bisect import bisect_left
+
+
+class TrieNode:
+    """
+    Node of a Trie - not designed for general clients.
+    Edges are labelled with whole substrings, kept sorted so the words under
+    a node come out in lexicographic order.
+    """
+    __slots__ = ("labels", "children", "terminal")
+
+    def __init__(self, terminal=False):
+        self.labels = []
+        self.children = []
+        self.terminal = terminal
+
+    def child_index(self, char):
+        """Index of the edge starting with char, or -1"""
+        i = bisect_left(self.labels, char)
+        if i < len(self.labels) and self.labels[i][0] == char:
+            return i
+        return -1
+
+
+def common_prefix_length(a, b):
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+class Trie:
+    """
+    Trie of words supporting search_prefix(prefix, limit).
+    Chains of single-child nodes are merged into one edge, which keeps the
+    node count close to the number of words.
+    """
+
+    def __init__(self):
+        self.root = TrieNode()
+        self.count = 0
+
+    @classmethod
+    def from_words(cls, words):
+        trie = cls()
+        for word in words:
+            trie.insert(word)
+        return trie
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, word):
+        node, rest = self.walk(word)
+        return node is not None and rest == "" and node.terminal
+
+    def insert(self, word):
+        node = self.root
+        while True:
+            if not word:
+                if not node.terminal:
+                    node.terminal = True
+                    self.count += 1
+                return
+            i = node.child_index(word[0])
+            if i < 0:
+                j = bisect_left(node.labels, word)
+                node.labels.insert(j, word)
+                node.children.insert(j, TrieNode(terminal=True))
+                self.count += 1
+                return
+            label = node.labels[i]
+            shared = common_prefix_length(label, word)
+            if shared < len(label):
+                # Split the edge: label becomes label[:shared] -> middle -> label[shared:]
+                middle = TrieNode()
+                middle.labels.append(label[shared:])
+                middle.children.append(node.children[i])
+                node.labels[i] = label[:shared]
+                node.children[i] = middle
+            node = node.children[i]
+            word = word[shared:]
+
+    def discard(self, word):
+        """
+        Removes word, returns whether it was there.  The trie is left as if word
+        had never been inserted: a leaf left without words is dropped, and a node
+        left with no word and a single edge is merged into the edge above it.
+        """
+        # (node, index of the edge taken) for each step down from the root
+        path = []
+        node = self.root
+        rest = word
+        while rest:
+            i = node.child_index(rest[0])
+            if i < 0 or not rest.startswith(node.labels[i]):
+                return False
+            path.append((node, i))
+            rest = rest[len(node.labels[i]):]
+            node = node.children[i]
+        if not node.terminal:
+            return False
+        node.terminal = False
+        self.count -= 1
+        if not path:
+            return True
+        parent, i = path[-1]
+        if not node.children:
+            del parent.labels[i]
+            del parent.children[i]
+            # Dropping the leaf can leave its parent a wordless pass-through node
+            if len(path) > 1 and not parent.terminal and len(parent.children) == 1:
+                self.merge(*path[-2])
+        elif len(node.children) == 1:
+            self.merge(parent, i)
+        return True
+
+    @staticmethod
+    def merge(parent, i):
+        """Joins parent's i-th edge with the single edge below it"""
+        child = parent.children[i]
+        parent.labels[i] += child.labels[0]
+        parent.children[i] = child.children[0]
+
+    def walk(self, prefix):
+        """
+        Follows prefix down from the root.  Returns (node, rest): node is the first
+        node whose path covers prefix, rest is the part of that node's path beyond
+        prefix.  Returns (None, None) if no word starts with prefix.
+        """
+        node = self.root
+        while prefix:
+            i = node.child_index(prefix[0])
+            if i < 0:
+                return None, None
+            label = node.labels[i]
+            if len(prefix) <= len(label):
+                if not label.startswith(prefix):
+                    return None, None
+                return node.children[i], label[len(prefix):]
+            if not prefix.startswith(label):
+                return None, None
+            node = node.children[i]
+            prefix = prefix[len(label):]
+        return node, ""
+
+    def search_prefix(self, prefix, limit=10):
+        """Up to limit words starting with prefix, in lexicographic order"""
+        node, rest = self.walk(prefix)
+        if node is None or limit <= 0:
+            return []
+        results = []
+        # Depth first, children pushed in reverse so the smallest comes off first
+        stack = [(node, prefix + rest)]
+        while stack:
+            node, path = stack.pop()
+            if node.terminal:
+                results.append(path)
+                if len(results) >= limit:
+                    break
+            for label, child in zip(reversed(node.labels), reversed(node.children)):
+                stack.append((child, path + label))
+        return results
+
+    def save(self, filename):
+        """
+        Writes the trie as a flat preorder list: for each node its terminal flag
+        and child count, followed by each edge label and that child's own entries.
+        """
+        flat = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            flat.append(int(node.terminal))
+            flat.append(len(node.children))
+            # Reversed, so children come off the stack (and get written) in order
+            for label, child in zip(reversed(node.labels), reversed(node.children)):
+                stack.append(child)
+                stack.append(label)
+            while stack and isinstance(stack[-1], str):
+                flat.append(stack.pop())
+        # A temporary file of its own, so processes saving at the same time don't write over each other
+        fd, temp_name = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(filename) or ".")
+        try:
+            with open(fd, "w", encoding="utf-8") as file:
+                json.dump({"count": self.count, "nodes": flat}, file, ensure_ascii=False, separators=(",", ":"))
+            os.replace(temp_name, filename)
+        except BaseException:
+            os.unlink(temp_name)
+            raise
+
+    @classmethod
+    def load(cls, filename):
+        with open(filename, encoding="utf-8") as file:
+            data = json.load(file)
+        trie = cls()
+        trie.count = data["count"]
+        flat = iter(data["nodes"])
+        # Each stack item is a node still waiting for some of its children
+        trie.root.terminal = bool(next(flat))
+        stack = [(trie.root, next(flat))]
+        while stack:
+            parent, remaining = stack[-1]
+            if len(parent.children) == remaining:
+                stack.pop()
+                continue
+            label = next(flat)
+            child = TrieNode(terminal=bool(next(flat)))
+            parent.labels.append(label)
+            parent.children.append(child)
+            stack.append((child, next(flat)))
+        return trie
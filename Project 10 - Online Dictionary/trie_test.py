@@ -0,0 +1,81 @@
+"""
+Compressed trie
+Jimmy Tran
+Testing
+"""
+
+import os
+import random
+import tempfile
+import unittest
+from trie import *
+
+
+def node_count(trie):
+    count = 0
+    stack = [trie.root]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.children)
+    return count
+
+
+class TrieTest(unittest.TestCase):
+    WORDS = ["ace", "aces", "acetone", "act", "a", "fly", "flying", "foothill", "facetious", "café", "b"]
+
+    def testSearchPrefix(self):
+        trie = Trie.from_words(self.WORDS)
+        self.assertEqual(len(trie), len(self.WORDS))
+        self.assertEqual(trie.search_prefix("ac"), ["ace", "aces", "acetone", "act"])
+        self.assertEqual(trie.search_prefix("ace", limit=2), ["ace", "aces"])
+        self.assertEqual(trie.search_prefix("acet"), ["acetone"])
+        self.assertEqual(trie.search_prefix("fl"), ["fly", "flying"])
+        self.assertEqual(trie.search_prefix("caf"), ["café"])
+        self.assertEqual(trie.search_prefix("acx"), [])
+        self.assertEqual(trie.search_prefix("acetones"), [])
+        self.assertEqual(trie.search_prefix("", limit=3), ["a", "ace", "aces"])
+        self.assertEqual(trie.search_prefix("a", limit=0), [])
+        self.assertIn("ace", trie)
+        self.assertNotIn("acet", trie)
+        trie.insert("ace")
+        self.assertEqual(len(trie), len(self.WORDS))
+
+    def testMatchesSortedScan(self):
+        rng = random.Random(1)
+        words = {"".join(rng.choice("abc") for _ in range(rng.randint(1, 6))) for _ in range(500)}
+        trie = Trie.from_words(words)
+        ordered = sorted(words)
+        for prefix in ["", "a", "ab", "abc", "cc", "bab", "cccccc"]:
+            expected = [word for word in ordered if word.startswith(prefix)][:7]
+            self.assertEqual(trie.search_prefix(prefix, 7), expected, prefix)
+
+    def testDiscard(self):
+        rng = random.Random(2)
+        words = {"".join(rng.choice("abc") for _ in range(rng.randint(1, 6))) for _ in range(500)}
+        trie = Trie.from_words(words)
+        for word in rng.sample(sorted(words), len(words) // 2):
+            self.assertTrue(trie.discard(word))
+            self.assertFalse(trie.discard(word))
+            words.remove(word)
+        self.assertFalse(trie.discard("abcabcabc"))
+        self.assertEqual(len(trie), len(words))
+        self.assertEqual(trie.search_prefix("", 1000), sorted(words))
+        for prefix in ["a", "ab", "bca"]:
+            self.assertEqual(trie.search_prefix(prefix, 1000), sorted(w for w in words if w.startswith(prefix)))
+        # Nothing is left behind: the same shape as a trie built from the remaining words
+        self.assertEqual(node_count(trie), node_count(Trie.from_words(words)))
+        for word in list(words):
+            trie.discard(word)
+        self.assertEqual((node_count(trie), trie.root.terminal), (1, False))
+
+    def testSaveLoad(self):
+        trie = Trie.from_words(self.WORDS)
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "dictionary.trie")
+            trie.save(filename)
+            loaded = Trie.load(filename)
+            self.assertEqual(os.listdir(directory), ["dictionary.trie"])
+        self.assertEqual(len(loaded), len(trie))
+        self.assertEqual(loaded.search_prefix("", 100), sorted(self.WORDS))
+        self.assertEqual(Trie().search_prefix("a"), [])
@@ -5,6 +5,7 @@ Jimmy Tran
 
 from datalist import *
 from enum import Enum
+from jsonstream import OffsetIndex, iter_entries
 import json
 
 
@@ -22,25 +23,46 @@ class DictionaryEntry:
                f"Example       : {self.example}"
 
 
+class LoadMode(Enum):
+    EAGER = 0           # json.load the whole file
+    STREAM = 1          # parse the entries one at a time
+    OFFSET_INDEX = 2    # only keep word -> byte offset, decode entries on demand
+
+
 class LocalDictionary:
-    def __init__(self, dictionary_json_name="dictionary.json"):
-        self.dictionary = {}
+    def __init__(self, dictionary_json_name="dictionary.json", mode=LoadMode.EAGER):
         filename = dictionary_json_name
+        if not isinstance(mode, LoadMode):
+            raise ValueError(f"Unknown load mode {mode}")
+        if mode == LoadMode.OFFSET_INDEX:
+            self.dictionary = OffsetIndex(filename, self.entry_decoder, ("word", "part_of_speech", "definition"))
+            return
+        self.dictionary = {}
+        if mode == LoadMode.STREAM:
+            with open(filename, "rb") as json_file:
+                for offset, length, thingy in iter_entries(json_file):
+                    entry = self.entry_decoder(thingy)
+                    self.dictionary[entry.word] = entry
+            return
         with open(filename) as json_file:
             data = json.load(json_file, object_hook=self.my_decoder)
             for entry in data:
                 self.dictionary[entry.word] = entry
 
+    @staticmethod
+    def entry_decoder(entry):
+        a = DictionaryEntry(entry["word"], entry["part_of_speech"], entry["definition"])
+        if "example" in entry:
+            a.example = entry["example"]
+        return a
+
     @staticmethod
     def my_decoder(thingy):
         if "entries" in thingy:
             mega_list = []
             d = thingy["entries"]
             for entry in d:
-                a = DictionaryEntry(entry["word"], entry["part_of_speech"], entry["definition"])
-                if "example" in entry:
-                    a.example = entry["example"]
-                mega_list.append(a)
+                mega_list.append(LocalDictionary.entry_decoder(entry))
 
             return mega_list
         return thingy
@@ -64,30 +86,27 @@ class DictionaryEntryCache(DataList):
     def add(self, entry):
         if not isinstance(entry, DictionaryEntry):
             raise TypeError("The entry should be of type Dictionary Entry")
+        last_kept = self.head
         count = 0
-        self.reset_current()
-        while self.current is not None:
-            self.iterate()
+        for node in self:
             count += 1
-        self.reset_current()
-        if count >= self.capacity:
-            for _ in range(self.capacity - 1):
-                self.iterate()
-            self.current.next = None
+            if count < self.capacity:
+                last_kept = node
+            else:
+                # The cache is full, so drop everything after the first capacity - 1 entries
+                while last_kept.next:
+                    self.remove_after(last_kept)
+                break
         self.add_to_head(entry)
 
     def search(self, word):
-        self.reset_current()
-        while True:
-            node = self.iterate()
-            if not node:
-                raise KeyError("Word not in here")
-            elif node.data.word == word:
+        for node in self:
+            if node.data.word == word:
                 temp = node.data
                 self.remove(node.data)
                 self.add(temp)
-                self.reset_current()
                 return self.head.next
+        raise KeyError("Word not in here")
 
 
 class DictionarySource(Enum):
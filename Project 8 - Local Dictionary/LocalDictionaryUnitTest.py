@@ -26,6 +26,19 @@ class LocalDictionaryTestCase(unittest.TestCase):
         self.assertEqual(local_dict.search("jolly").definition, "full of high spirits")
         self.assertRaises(KeyError, lambda: local_dict.search("potato"))
 
+    def testLoadModes(self):
+        eager = LocalDictionary()
+        for mode in (LoadMode.STREAM, LoadMode.OFFSET_INDEX):
+            local_dict = LocalDictionary(mode=mode)
+            self.assertEqual(len(local_dict.dictionary), len(eager.dictionary))
+            for word in eager.dictionary:
+                self.assertEqual(str(local_dict.search(word)), str(eager.search(word)))
+            self.assertRaises(KeyError, lambda: local_dict.search("potato"))
+            if mode == LoadMode.OFFSET_INDEX:
+                local_dict.dictionary.close()
+        self.assertRaises(ValueError, lambda: LocalDictionary(mode="offset_index"))
+        self.assertRaises(ValueError, lambda: LocalDictionary(mode=2))
+
 class DictionaryEntryCacheTestCase(unittest.TestCase):
     def testAdd(self):
         local_dict = LocalDictionary()
@@ -1,5 +1,9 @@
 # datalist.py to be used for LocalDictionary
 
+import random
+from array import array
+
+
 class Node:
     """
     Node class for a LinkedList - not designed for general clients.
@@ -34,12 +38,22 @@ class LinkedList:
     def __init__(self):
         # an empty list will have one "header" node at the front
         self.head = Node()
+        # Bumped by every change made through the list, so iterators can tell it changed under them
+        self.version = 0
+
+    def insert_after(self, node, new_node):
+        node.insert_after(new_node)
+        self.version += 1
+
+    def remove_after(self, node):
+        self.version += 1
+        return node.remove_after()
 
     def add_to_head(self, new_node):
-        self.head.insert_after(new_node)
+        self.insert_after(self.head, new_node)
 
     def remove_from_head(self):
-        return self.head.remove_after()
+        return self.remove_after(self.head)
 
     def is_empty(self):
         return self.head.next == None
@@ -62,6 +76,21 @@ class LinkedList:
         ret_str = ret_str[:-LEN_SEPARATOR] + "  [END LIST]\n"
         return ret_str
 
+    def __iter__(self):
+        """
+        Independent traversal of the nodes: any number can run at once, unlike
+        reset_current() / iterate(), which share one cursor.  Changing the list
+        through its methods and then carrying on iterating raises RuntimeError;
+        changing it and stopping (break, return) is fine.
+        """
+        version = self.version
+        node = self.head.next
+        while node is not None:
+            yield node
+            if self.version != version:
+                raise RuntimeError("LinkedList changed during iteration")
+            node = node.next
+
     def reset_current(self):
         self.current = self.head
 
@@ -104,13 +133,272 @@ class DataList(LinkedList):
             if data <= temp.next.data:
                 break
             temp = temp.next
-        temp.insert_after(DataNode(data))
+        self.insert_after(temp, DataNode(data))
 
     def remove(self, data):
         temp = self.head
         while temp.next:
             if temp.next.data == data:
-                temp.remove_after()
+                self.remove_after(temp)
                 return True
             temp = temp.next
         return False
+
+
+class SkipNode(DataNode):
+    """
+    DataNode of a SortedDataList - not designed for general clients.
+    next is the node after it, as in any DataList; skips[k - 1] is the next
+    node that's also on level k of the skip list, for this node's other levels.
+    """
+    def __init__(self, data, level):
+        super().__init__(data)
+        self.skips = [None] * (level - 1)
+
+
+class SortedDataList(DataList):
+    """
+    DataList that's always sorted, backed by a skip list: each node is also on
+    levels 1, 2, ... with probability P, P ** 2, ..., and each level links its
+    nodes in order, so a search drops down from the sparse top level, skipping
+    most of the list.  insert_sorted, remove and membership (in) are O(log n)
+    on average instead of O(n), and the bottom level is an ordinary DataList
+    chain, so iterate(), for loops and str() work as they do for DataList.
+    add_to_head would break the order, so it isn't supported.
+    """
+    MAX_LEVEL = 32
+    P = 0.25
+
+    def __init__(self):
+        super().__init__()
+        self.head = SkipNode(None, self.MAX_LEVEL)
+        # Number of levels in use, bottom one included
+        self.level = 1
+        self.count = 0
+
+    def random_level(self):
+        level = 1
+        while level < self.MAX_LEVEL and random.random() < self.P:
+            level += 1
+        return level
+
+    def predecessors(self, data):
+        """For each level, the last node on it whose data is less than data (the header if there's none)"""
+        update = [self.head] * self.level
+        node = self.head
+        for k in range(self.level - 1, 0, -1):
+            skip = node.skips[k - 1]
+            while skip is not None and skip.data < data:
+                node = skip
+                skip = node.skips[k - 1]
+            update[k] = node
+        following = node.next
+        while following is not None and following.data < data:
+            node = following
+            following = node.next
+        update[0] = node
+        return update
+
+    def add_to_head(self, data):
+        raise TypeError("A SortedDataList keeps its items in order, use insert_sorted()")
+
+    def insert_after(self, node, new_node):
+        raise TypeError("A SortedDataList keeps its items in order, use insert_sorted()")
+
+    def remove_after(self, node):
+        raise TypeError("Use remove() or remove_from_head() to take items out of a SortedDataList")
+
+    def insert_sorted(self, data):
+        update = self.predecessors(data)
+        level = self.random_level()
+        if level > self.level:
+            update.extend([self.head] * (level - self.level))
+            self.level = level
+        new_node = SkipNode(data, level)
+        new_node.next = update[0].next
+        update[0].next = new_node
+        for k in range(1, level):
+            new_node.skips[k - 1] = update[k].skips[k - 1]
+            update[k].skips[k - 1] = new_node
+        self.count += 1
+        self.version += 1
+
+    def unlink(self, node, update):
+        """Takes node out of every level, update being predecessors(node.data)"""
+        update[0].next = node.next
+        node.next = None
+        for k in range(1, len(node.skips) + 1):
+            update[k].skips[k - 1] = node.skips[k - 1]
+        while self.level > 1 and self.head.skips[self.level - 2] is None:
+            self.level -= 1
+        self.count -= 1
+        self.version += 1
+
+    def remove(self, data):
+        update = self.predecessors(data)
+        node = update[0].next
+        if node is None or node.data != data:
+            return False
+        self.unlink(node, update)
+        return True
+
+    def remove_from_head(self):
+        """Removes and returns the smallest item, None if the list is empty"""
+        node = self.head.next
+        if node is None:
+            return None
+        # The header comes before the first node on every level
+        self.unlink(node, [self.head] * (len(node.skips) + 1))
+        return node.data
+
+    def __contains__(self, data):
+        node = self.predecessors(data)[0].next
+        return node is not None and node.data == data
+
+    def __len__(self):
+        return self.count
+
+    def irange(self, start=None, stop=None):
+        """Items x with start <= x < stop, in order; None leaves that end open"""
+        version = self.version
+        node = self.head.next if start is None else self.predecessors(start)[0].next
+        while node is not None and (stop is None or node.data < stop):
+            yield node.data
+            if self.version != version:
+                raise RuntimeError("SortedDataList changed during iteration")
+            node = node.next
+
+
+NIL = -1
+
+
+class ArrayDataList:
+    """
+    DataList with the same add_to_head, remove_from_head, insert_sorted, remove,
+    reset_current and iterate interface, but no object per node: node i is slot
+    i of two parallel arrays, the index of the next node and the data.  Slot 0
+    is the header.  Removed slots go on a free list, threaded through the same
+    next array, and are reused by the next insert; the arrays double when the
+    free list runs out.  Since there are no node objects, iterate() returns
+    each data item (None at the end of the list) rather than its node.
+    """
+
+    def __init__(self, capacity=16):
+        if capacity < 1:
+            raise ValueError("Capacity should be at least 1")
+        self.next = array("l", [NIL])
+        self.data = [None]
+        self.free = NIL
+        self.count = 0
+        self.version = 0
+        self.grow(capacity)
+        self.current = 0
+
+    def grow(self, extra):
+        """Adds extra free slots"""
+        start = len(self.data)
+        self.next.extend(range(start + 1, start + extra))
+        self.next.append(self.free)
+        self.data.extend([None] * extra)
+        self.free = start
+
+    def allocate(self, data):
+        if self.free == NIL:
+            self.grow(len(self.data))
+        i = self.free
+        self.free = self.next[i]
+        self.data[i] = data
+        self.count += 1
+        return i
+
+    def release(self, i):
+        self.data[i] = None
+        self.next[i] = self.free
+        self.free = i
+        self.count -= 1
+
+    def insert_after(self, previous, data):
+        i = self.allocate(data)
+        self.next[i] = self.next[previous]
+        self.next[previous] = i
+        self.version += 1
+
+    def remove_after(self, previous):
+        i = self.next[previous]
+        if i == NIL:
+            # Nothing after previous, like LinkedList.remove_after on the last node
+            return None
+        self.next[previous] = self.next[i]
+        data = self.data[i]
+        self.release(i)
+        self.version += 1
+        return data
+
+    def add_to_head(self, data):
+        self.insert_after(0, data)
+
+    def remove_from_head(self):
+        return self.remove_after(0)
+
+    def insert_sorted(self, data):
+        next_ = self.next
+        items = self.data
+        previous = 0
+        i = next_[0]
+        while i != NIL and not data <= items[i]:
+            previous = i
+            i = next_[i]
+        self.insert_after(previous, data)
+
+    def remove(self, data):
+        next_ = self.next
+        items = self.data
+        previous = 0
+        i = next_[0]
+        while i != NIL:
+            if items[i] == data:
+                self.remove_after(previous)
+                return True
+            previous = i
+            i = next_[i]
+        return False
+
+    def is_empty(self):
+        return self.next[0] == NIL
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        """The data items, in order, with the same change check as LinkedList's iterators"""
+        version = self.version
+        next_ = self.next
+        items = self.data
+        i = next_[0]
+        while i != NIL:
+            yield items[i]
+            if self.version != version:
+                raise RuntimeError("ArrayDataList changed during iteration")
+            i = next_[i]
+
+    def reset_current(self):
+        self.current = 0
+
+    def iterate(self):
+        # Protect against the case client keeps calling iterate() even when reaching the end
+        if self.current == NIL:
+            return None
+        self.current = self.next[self.current]
+        if self.current == NIL:
+            return None
+        return self.data[self.current]
+
+    def __str__(self):
+        if self.is_empty():
+            return "\n[ empty list ]\n"
+        items = []
+        i = self.next[0]
+        while i != NIL:
+            items.append(str(self.data[i]))
+            i = self.next[i]
+        return "\n[START LIST]: " + " -> ".join(items) + "  [END LIST]\n"